@@ -1,7 +1,18 @@
 from flask import Flask, render_template, request, abort, redirect, url_for, session, jsonify, flash
-from flask_mysqldb import MySQL
-from flask import send_from_directory
-from gpt2 import generate_response
+from db_pool import PooledMySQL
+from flask import send_from_directory, send_file, Response, stream_with_context
+from gpt2 import generate_response, stream_response, model_manager, response_cache, catalog_index, semantic_index, rating_store, book_text_index, highlight_snippet, job_queue
+from book_text import start_indexer
+from book_ratings import update_summary, remove_user_reviews
+from suggest_index import SuggestIndex
+from dashboard_counters import DashboardCounters, start_reconciler
+from dashboard_events import StatsBroadcaster
+from pagination import fetch_page, LISTS
+from book_import import BookImporter, detect_format
+from book_export import EXPORTS, FORMATS, export_rows, export_filename
+from file_delivery import PdfLocator, book_file_path, send_book_file
+from blob_store import BlobStore, UploadRequest, key_digest, is_key
+from cover_thumbnails import CoverThumbnails, FORMATS as COVER_FORMATS, cover_source, width_bucket
 import MySQLdb.cursors
 import re
 import os
@@ -9,6 +20,9 @@ import uuid
 from waitress import serve  # Import waitress
 from datetime import datetime
 import logging
+import json
+import threading
+from collections import OrderedDict
 
 app = Flask(__name__)
 
@@ -18,7 +32,168 @@ app.config['MYSQL_USER'] = 'root'
 app.config['MYSQL_PASSWORD'] = ''
 app.config['MYSQL_DB'] = 'library-system'
 
-mysql = MySQL(app)
+# Connection pool shared by every request and the chatbot's database lookups
+app.config['MYSQL_POOL_SIZE'] = int(os.environ.get('SMARTSHELF_DB_POOL_SIZE', '10'))
+app.config['MYSQL_POOL_TIMEOUT'] = 5  # Seconds a request waits for a free connection
+app.config['MYSQL_POOL_PRE_PING'] = 30  # Ping connections idle longer than this
+app.config['MYSQL_POOL_RECYCLE'] = 3600
+
+mysql = PooledMySQL(app)
+
+# Typeahead suggestions for books, authors and users
+suggest_index = SuggestIndex(max_age=600)
+
+# Dashboard totals kept current by the book and issue routes; recounted every
+# five minutes to correct drift from writes made outside the app
+dashboard_counters = DashboardCounters()
+
+
+@job_queue.task('feedback')
+def save_feedback(payload):
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("INSERT INTO feedback (message) VALUES (%s)", (payload['message'],))
+        mysql.connection.commit()
+    finally:
+        cursor.close()
+
+
+@job_queue.task('embed_book', max_attempts=3, lease=600)
+def embed_book(payload):
+    # Embedding runs the model on the CPU: too slow for the save request
+    semantic_index.refresh_book(mysql, payload['bookid'])
+
+
+def reindex_book(bookid):
+    """
+    Re-extracts a saved book's PDF text in the background, then re-embeds
+    it: the indexer queues embed_book once the text is in, so the book is
+    embedded once, with its text. Without the indexer it is embedded now.
+    """
+    if book_text_index.running:
+        book_text_index.enqueue(bookid)
+    else:
+        job_queue.enqueue('embed_book', {'bookid': int(bookid)})
+
+
+# Pushes every change to open dashboards (SSE, or long-poll as a fallback).
+# Each open stream or long-poll holds a server thread (waitress has 4 by
+# default), so only SMARTSHELF_DASHBOARD_WAITERS of them wait at a time
+dashboard_broadcaster = StatsBroadcaster(max_waiters=int(os.environ.get('SMARTSHELF_DASHBOARD_WAITERS', 2)))
+dashboard_counters.add_listener(dashboard_broadcaster.publish)
+
+# Longest a long-poll request is held open waiting for a change
+DASHBOARD_LONG_POLL_SECONDS = 25
+# When every waiting slot is taken, clients poll again after this many seconds
+DASHBOARD_BUSY_RETRY_SECONDS = 5
+
+# Book id / ISBN -> PDF for /download_pdf. Set SMARTSHELF_FILE_OFFLOAD to
+# x-accel-redirect (nginx) or x-sendfile (Apache) to let the front-end server send the files
+pdf_locator = PdfLocator(max_entries=10000)
+app.config['BOOK_FILE_OFFLOAD'] = os.environ.get('SMARTSHELF_FILE_OFFLOAD') or None
+
+# Uploaded PDFs and covers are stored once per content under static/books/cas,
+# hashed while the request body is written to disk
+blob_store = BlobStore()
+app.request_class = UploadRequest
+STORED_FILE_MAX_AGE = 365 * 24 * 3600
+
+# Resized covers for /covers, rendered on first request and kept on disk
+cover_thumbnails = CoverThumbnails(max_bytes=int(os.environ.get('SMARTSHELF_THUMBNAIL_CACHE_MB', '256')) * 1024 * 1024)
+COVER_MAX_AGE = 24 * 3600  # Covers not in the blob store can be replaced under the same name
+
+# Bulk book imports run in the background; their uploads and error files live here
+IMPORT_DIR = os.path.join('cache', 'imports')
+MAX_IMPORT_JOBS = 20  # Most recent jobs whose progress is kept
+import_jobs = OrderedDict()
+
+
+init_lock = threading.Lock()
+initialized = False
+
+
+def init_app():
+    """
+    Starts the work that runs beside the requests. Importing this module
+    starts nothing, so the debug reloader's watcher process, spawned
+    inference workers and tests stay idle; the serving process calls this
+    at startup (see __main__), or on its first request otherwise.
+    """
+    global initialized
+    with init_lock:
+        if initialized:
+            return
+        initialized = True
+
+    # Opens a few database connections ahead of the first requests
+    mysql.start_prefill()
+
+    # Load GPT-2 in the background so the first requests are not blocked on it
+    model_manager.warm_up()
+
+    # Recounts the dashboard totals every five minutes
+    start_reconciler(app, mysql, dashboard_counters, interval=300)
+
+    # Extracts the text of uploaded PDFs in the background for /search?scope=content
+    # and the "books mentioning ..." chat answers; re-checks the catalog every ten minutes
+    start_indexer(app, mysql, book_text_index, interval=600)
+
+    # Runs queued jobs on a few worker threads; jobs left from a previous run resume
+    job_queue.start(app)
+
+
+@app.before_request
+def start_background_work():
+    # For servers that import the app without running __main__ (flask run, waitress-serve)
+    if not initialized:
+        init_app()
+
+
+@app.after_request
+def cache_stored_files(response):
+    # A stored file's URL is its content hash, so it never changes
+    if request.path.startswith('/static/books/cas/') and response.status_code in (200, 206, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STORED_FILE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def store_book_files(cursor, bookid=None):
+    """
+    Puts the request's pdf and picture uploads in the blob store, in the
+    caller's transaction. A field without a new upload keeps the book's file.
+    Returns:
+        tuple: (pdf_path, picture) to save, and the replaced keys to
+            collect once the transaction is committed
+    """
+    blob_store.ensure_table(mysql)
+    current = {}
+    if bookid:
+        cursor.execute('SELECT pdf_path, picture FROM book WHERE bookid = %s FOR UPDATE', (bookid,))
+        current = cursor.fetchone() or {}
+    values, replaced = [], []
+    for field, column in (('pdf', 'pdf_path'), ('picture', 'picture')):
+        upload = request.files.get(field)
+        old = current.get(column)
+        if upload and upload.filename:
+            values.append(blob_store.put(cursor, upload))
+            if old:
+                blob_store.release(cursor, old)
+                replaced.append(old)
+        else:
+            values.append(old)
+    return values[0], values[1], replaced
+
+
+def first_page(name):
+    """
+    First page of a list for an HTML page, sorted as the request's sort and
+    direction query parameters ask. Later pages come from /api/list/<name>.
+    """
+    return fetch_page(mysql, name, request.args.get('sort'), request.args.get('direction'),
+                      limit=request.args.get('limit', type=int))
 
 @app.route("/")
 def home():
@@ -50,13 +225,16 @@ def reviews():
                 flash("Invalid rating value.", "error")
                 return redirect(url_for('reviews'))
 
-            # Check if user has already reviewed this book
             cursor = mysql.connection.cursor()
+            rating_store.ensure_loaded(mysql)  # Creates book_rating on first use
+
+            # Check if user has already reviewed this book (locked until commit)
             cursor.execute(
-                "SELECT id FROM reviews WHERE user_id = %s AND book_id = %s",
+                "SELECT id, rating FROM reviews WHERE user_id = %s AND book_id = %s FOR UPDATE",
                 (user_id, book_id)
             )
             existing_review = cursor.fetchone()
+            old_rating = existing_review[1] if existing_review else None
 
             if existing_review:
                 # Update existing review
@@ -75,7 +253,11 @@ def reviews():
                     (user_id, book_id, review, rating)
                 )
 
+            # The book's rating summary commits with the review
+            update_summary(cursor, book_id, old_rating, rating)
             mysql.connection.commit()
+            rating_store.rating_changed(book_id, old_rating, rating)
+            response_cache.invalidate(['book_details'])
             flash("Review submitted successfully!", "success")
             return redirect(url_for('reviews'))
 
@@ -88,41 +270,16 @@ def reviews():
         finally:
             cursor.close()
 
-    # GET request handling
+    # GET request handling: newest reviews first, more are loaded on demand
+    # (the book picker gets its titles from /api/suggest)
     try:
-        cursor = mysql.connection.cursor()
-        
-        # Fetch books
-        cursor.execute(
-            "SELECT bookid, name FROM book ORDER BY name"
-        )
-        books = cursor.fetchall()
-
-        # Fetch reviews with user details and book information
-        cursor.execute("""
-            SELECT 
-                r.review,
-                r.rating,
-                r.created_on,
-                u.first_name,
-                b.name as book_name
-            FROM reviews r
-            JOIN user u ON r.user_id = u.id
-            JOIN book b ON r.book_id = b.bookid
-            ORDER BY r.created_on DESC
-        """)
-        reviews = cursor.fetchall()
-
-        return render_template('reviews.html', books=books, reviews=reviews)
+        page = first_page('reviews')
+        return render_template('reviews.html', reviews=page['items'], page=page)
 
     except Exception as e:
         app.logger.error(f"Error fetching review data: {str(e)}")
         flash("Unable to load reviews at this time.", "error")
-        return render_template('reviews.html', books=[], reviews=[])
-
-    finally:
-        if cursor:
-            cursor.close()
+        return render_template('reviews.html', reviews=[], page=None)
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -165,6 +322,32 @@ def chat():
         print(f"Error in chat route: {str(e)}")
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.get_json()
+    user_message = data.get('message') if data else None
+
+    if not user_message:
+        return jsonify({"error": "No message provided!"}), 400
+
+    def events():
+        # Server-sent events: 'token' while GPT-2 is generating, then one 'done' with the final text
+        try:
+            for event, text in stream_response(user_message, mysql):
+                payload = {"token": text} if event == 'token' else {"response": text}
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            print(f"Error in chat stream: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'An error occurred'})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/chat-status')
+def chat_status():
+    return jsonify(dict(model_manager.status(), semantic_search=semantic_index.status(),
+                        content_search=book_text_index.status()))
+
 @app.route('/search', methods=['POST'])
 def search_books():
     print("Search route accessed")  # Debugging line
@@ -175,25 +358,42 @@ def search_books():
     if not query:
         return jsonify({"error": "Query parameter is missing"}), 400
 
-    # Create a cursor to interact with the database
-    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    # mode=semantic matches on meaning instead of words
+    mode = request.args.get('mode', data.get('mode', 'keyword'))
+    if mode == 'semantic' and not semantic_index.is_available():
+        return jsonify({"error": "Semantic search is not installed on this server"}), 503
 
     try:
-        # Execute the query to join book with author and publisher
-        cursor.execute("""
-            SELECT book.bookid, book.name, book.isbn, book.no_of_copy, book.status, 
-                   author.name, publisher.name
-            FROM book
-            JOIN author ON book.authorid = author.authorid
-            JOIN publisher ON book.publisherid = publisher.publisherid
-            WHERE book.name LIKE %s
-        """, ('%' + query + '%',))
-
-        # Fetch the results
-        results = cursor.fetchall()
-
-        # Debugging line: print the results to see what is returned
-        print("Results from DB:", results)
+        limit = min(max(int(data.get('limit', 20)), 1), 50)
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be a number"}), 400
+
+    # scope=content searches inside the books' PDFs and returns the matching pages
+    if request.args.get('scope', data.get('scope')) == 'content':
+        return search_book_content(query, limit)
+
+    try:
+        if mode == 'semantic':
+            semantic_index.ensure_loaded(mysql)
+            matches = semantic_index.search(query, k=limit)
+        else:
+            # Ranked lookup over title, author, category, publisher and ISBN
+            catalog_index.ensure_loaded(mysql)
+            matches = catalog_index.search(query, limit=limit)
+
+        # Keep the column names the old LIKE query returned
+        results = [{
+            'bookid': book['bookid'],
+            'name': book['name'],
+            'isbn': book['isbn'],
+            'no_of_copy': book['no_of_copy'],
+            'status': book['status'],
+            'author.name': book['author_name'],
+            'publisher.name': book['publisher_name'],
+            'category': book['genre_name'],
+            'picture': book['picture'],
+            'score': book['score']
+        } for book in matches]
 
         # If no results, return a specific message
         if not results:
@@ -203,12 +403,104 @@ def search_books():
         # Log the error
         print(f"Error occurred: {str(e)}")
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
-    finally:
-        cursor.close()
 
     return jsonify(results)  # Return the results here
 
 
+def search_book_content(query, limit):
+    if not book_text_index.is_available():
+        return jsonify({"error": "PDF text search is not installed on this server"}), 503
+    try:
+        matches = book_text_index.search(query, limit=limit)
+        catalog_index.ensure_loaded(mysql)
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+    results = []
+    for match in matches:
+        book = catalog_index.docs.get(match['bookid'])
+        if book is None:
+            continue  # Deleted since it was indexed
+        results.append({
+            'bookid': book['bookid'],
+            'name': book['name'],
+            'isbn': book['isbn'],
+            'no_of_copy': book['no_of_copy'],
+            'status': book['status'],
+            'author.name': book['author_name'],
+            'publisher.name': book['publisher_name'],
+            'category': book['genre_name'],
+            'picture': book['picture'],
+            'score': match['score'],
+            'pages': [{'page': page['page'], 'snippet': highlight_snippet(page['snippet'])}
+                      for page in match['pages']]
+        })
+    if not results:
+        return jsonify({"message": "No books found matching the query"}), 404
+    return jsonify(results)
+
+
+@app.route('/api/suggest')
+def suggest():
+    prefix = request.args.get('q', '')
+    kinds = [kind for kind in request.args.get('type', 'book,author').split(',') if kind in ('book', 'author', 'user')]
+    # User names and emails are only suggested to admins
+    if 'user' in kinds and not ('loggedin' in session and session['role'] == 'admin'):
+        kinds.remove('user')
+    if not kinds:
+        return jsonify([])
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 20)
+
+    suggest_index.ensure_loaded(mysql)
+    return jsonify(suggest_index.suggest(prefix, kinds, limit))
+
+
+@app.route('/api/books/<int:bookid>/rating')
+def book_rating(bookid):
+    rating_store.ensure_loaded(mysql)
+    return jsonify({'success': True, 'rating': rating_store.get(bookid)})
+
+
+@app.route('/api/books/top-rated')
+def top_rated_books():
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    min_reviews = max(request.args.get('min_reviews', 1, type=int), 1)
+
+    rating_store.ensure_loaded(mysql)
+    catalog_index.ensure_loaded(mysql)
+    books = []
+    for summary in rating_store.top_rated(limit, min_reviews):
+        book = catalog_index.docs.get(summary['book_id'], {})
+        books.append(dict(summary, name=book.get('name'), author_name=book.get('author_name')))
+    return jsonify({'success': True, 'books': books})
+
+
+@app.route('/api/list/<name>')
+def list_page(name):
+    """
+    One page of a list (books, users, issue_books, categories, authors,
+    publishers, queries or reviews). Query parameters: sort, direction,
+    limit and after (the next_cursor of the previous page); format=html
+    returns the rendered rows instead of items.
+    """
+    if name not in LISTS:
+        return jsonify({'success': False, 'error': 'Unknown list'}), 404
+    access = LISTS[name].access
+    if access != 'public' and not ('loggedin' in session and (access == 'user' or session['role'] == 'admin')):
+        return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+
+    try:
+        page = fetch_page(mysql, name, request.args.get('sort'), request.args.get('direction'),
+                          request.args.get('after'), request.args.get('limit', type=int))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    if request.args.get('format') == 'html':
+        page['html'] = render_template(f'rows/{name}.html', rows=page.pop('items'))
+    return jsonify({'success': True, **page})
+
+
 @app.route("/login", methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
@@ -274,17 +566,16 @@ def query():
         else:
             # If the method is GET, fetch the queries from the database and display them
             try:
-                cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-                cursor.execute("SELECT * FROM queries")  # Get all queries
-                queries = cursor.fetchall()  # Fetch all rows
-                cursor.close()
+                page = first_page('queries')  # Newest queries first
+                queries = page['items']
             except MySQLdb.Error as e:
                 # Handle database errors when fetching queries
                 flash(f"An error occurred while fetching queries: {e}", "error")
+                page = None
                 queries = []  # In case of an error, pass an empty list
 
             # Render the template with existing queries
-            return render_template("query.html", queries=queries)  # Pass queries to the template
+            return render_template("query.html", queries=queries, page=page)  # Pass queries to the template
             
     else:
         # If the user is not logged in, redirect them to the login page
@@ -312,51 +603,95 @@ def dashboard():
 def get_dashboard_stats():
     if 'loggedin' in session and session['role'] == 'admin':
         try:
-            cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-            
-            # Get total books
-            cursor.execute("SELECT COUNT(*) as total FROM book")
-            total_books = cursor.fetchone()['total']
-            
-            # Get available books (not issued)
-            cursor.execute("SELECT COUNT(*) as available FROM book WHERE bookid NOT IN (SELECT bookid FROM issued_book WHERE status = 'issued')")
-            available_books = cursor.fetchone()['available']
-            
-            # Get currently issued books
-            cursor.execute("SELECT COUNT(*) as issued FROM issued_book WHERE status = 'issued'")
-            issued_books = cursor.fetchone()['issued']
-            
-            # Get returned books
-            cursor.execute("SELECT COUNT(*) as returned FROM issued_book WHERE status = 'returned'")
-            returned_books = cursor.fetchone()['returned']
-            
-            cursor.close()
-            mysql.connection.commit()
-            
-            return jsonify({
-                'success': True,
-                'stats': {
-                    'total_books': total_books,
-                    'available_books': available_books,
-                    'issued_books': issued_books,
-                    'returned_books': returned_books
-                }
-            })
-            
+            dashboard_counters.ensure_loaded(mysql)
+            dashboard_broadcaster.publish(dashboard_counters.stats())
         except Exception as e:
             logging.error(f"Database error: {str(e)}")
             return jsonify({'success': False, 'error': 'Database error occurred'})
+
+        # Long-poll: with a matching ETag and ?wait=N, hold the request until
+        # the stats change or N seconds pass
+        version, stats = dashboard_broadcaster.wait(None, 0)
+        if request.headers.get('If-None-Match') == f'"{version}"':
+            wait = min(request.args.get('wait', 0, type=float), DASHBOARD_LONG_POLL_SECONDS)
+            headers = {'ETag': f'"{version}"', 'Cache-Control': 'no-cache'}
+            if wait > 0:
+                if dashboard_broadcaster.try_hold():
+                    try:
+                        version, stats = dashboard_broadcaster.wait(version, wait)
+                    finally:
+                        dashboard_broadcaster.release()
+                else:
+                    # No thread to spare: answer now and have the client come back later
+                    headers['Retry-After'] = str(DASHBOARD_BUSY_RETRY_SECONDS)
+            if request.headers.get('If-None-Match') == f'"{version}"':
+                return Response(status=304, headers=headers)
+
+        response = jsonify({
+            'success': True,
+            'stats': stats
+        })
+        response.headers['ETag'] = f'"{version}"'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
             
     return jsonify({'success': False, 'error': 'Unauthorized access'})
 
+@app.route("/api/db-pool")
+def db_pool_stats():
+    if 'loggedin' in session and session['role'] == 'admin':
+        return jsonify(mysql.pool.stats())
+    return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+
+@app.route("/api/jobs")
+def job_stats():
+    if 'loggedin' in session and session['role'] == 'admin':
+        return jsonify(job_queue.stats())
+    return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+
+@app.route("/api/jobs/<int:job_id>")
+def job_status(job_id):
+    if 'loggedin' in session and session['role'] == 'admin':
+        job = job_queue.status(job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Unknown job'}), 404
+        return jsonify(dict(job, success=True))
+    return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+
+@app.route("/api/covers")
+def cover_stats():
+    if 'loggedin' in session and session['role'] == 'admin':
+        return jsonify(cover_thumbnails.stats())
+    return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+
+@app.route("/api/dashboard-stream")
+def dashboard_stream():
+    if 'loggedin' in session and session['role'] == 'admin':
+        try:
+            dashboard_counters.ensure_loaded(mysql)
+            dashboard_broadcaster.publish(dashboard_counters.stats())
+        except Exception as e:
+            logging.error(f"Database error: {str(e)}")
+            return jsonify({'success': False, 'error': 'Database error occurred'}), 503
+
+        # Too many open streams: the client falls back to (rate-limited) long-polling
+        if not dashboard_broadcaster.try_hold():
+            return jsonify({'success': False, 'error': 'Too many open dashboard streams'}), 503, \
+                {'Retry-After': str(DASHBOARD_BUSY_RETRY_SECONDS)}
+
+        # Server-sent events: 'stats' once, then a 'delta' whenever a count changes
+        response = Response(dashboard_broadcaster.stream(), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        response.call_on_close(dashboard_broadcaster.release)  # Runs when the client disconnects
+        return response
+    return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+
     
 @app.route("/users", methods =['GET', 'POST'])
 def users():
     if 'loggedin' in session and session['role'] == 'admin':
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('SELECT * FROM user')
-        users = cursor.fetchall()    
-        return render_template("users.html", users = users)
+        page = first_page('users')
+        return render_template("users.html", users = page['items'], page = page)
     return redirect(url_for('home'))
 
 @app.route("/save_user", methods =['GET', 'POST'])
@@ -380,6 +715,8 @@ def save_user():
                 password = request.form['password'] 
                 cursor.execute('INSERT INTO user (`first_name`, `last_name`, `email`, `password`, `role`) VALUES (%s, %s, %s, %s, %s)', (first_name, last_name, email, password, role))
                 mysql.connection.commit()   
+                userId = cursor.lastrowid
+            suggest_index.refresh(mysql, 'user', userId)
 
             return redirect(url_for('users'))        
         elif request.method == 'POST':
@@ -504,13 +841,28 @@ def reset_password(token):
     
 @app.route("/delete_user", methods =['GET'])
 def delete_user():
-    if 'loggedin' in session:
+    if 'loggedin' in session and session['role'] == 'admin':
         deleteUserId = request.args.get('userid')
+        rating_store.ensure_loaded(mysql)
         cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute('DELETE FROM user WHERE userid = % s', (deleteUserId, ))
-        mysql.connection.commit()   
+        try:
+            # The user's reviews go with them; their ratings leave the summaries in the same transaction
+            deleted_reviews = remove_user_reviews(cursor, deleteUserId)
+            cursor.execute('DELETE FROM user WHERE id = %s', (deleteUserId, ))
+            mysql.connection.commit()
+        except Exception as e:
+            mysql.connection.rollback()
+            app.logger.error(f"Error deleting user {deleteUserId}: {str(e)}")
+            return redirect(url_for('users'))
+        finally:
+            cursor.close()
+        for book_id, rating in deleted_reviews:
+            rating_store.rating_changed(book_id, rating, None)
+        if deleted_reviews:
+            response_cache.invalidate(['book_details'])
+        suggest_index.remove('user', deleteUserId)
         return redirect(url_for('users'))
-    return redirect(url_for('login'))
+    return redirect(url_for('home'))
   
 @app.route('/logout')
 def logout():
@@ -545,6 +897,7 @@ def register():
             cursor.execute('INSERT INTO user (first_name, last_name, email, password, role) VALUES (%s, %s, %s, %s, %s)', 
                            (first_name, last_name, email, password, 'user'))
             mysql.connection.commit()
+            suggest_index.refresh(mysql, 'user', cursor.lastrowid)
             message = 'You have successfully registered!'
 
     elif request.method == 'POST':
@@ -555,20 +908,9 @@ def register():
 @app.route("/books", methods=['GET', 'POST'])
 def books():
     if 'loggedin' in session and session['role'] == 'admin':
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Fetch books with their details, including the picture
-        cursor.execute(''' 
-            SELECT b.bookid, b.name, b.authorid, b.categoryid, b.status, b.isbn, b.added_on, b.updated_on, 
-                   a.name as author_name, c.name as category_name, p.name as publisher_name, b.pdf_path, b.picture
-            FROM book b
-            LEFT JOIN author a ON b.authorid = a.authorid
-            LEFT JOIN category c ON b.categoryid = c.categoryid
-            LEFT JOIN publisher p ON b.publisherid = p.publisherid
-        ''')
-        books = cursor.fetchall()  # Fetch all books with the necessary details
-        
-        return render_template("books.html", books=books)
+        # First page of books with their details, including the picture
+        page = first_page('books')
+        return render_template("books.html", books=page['items'], page=page)
     return redirect(url_for('home'))
 
 @app.route("/save_book", methods=['GET', 'POST'])
@@ -585,23 +927,13 @@ def save_book():
             isbn = request.form['isbn']
             publisherid = request.form['publisherid']
 
-            # Handle the PDF upload
-            pdf_file = request.files.get('pdf')
-            pdf_file_path = None
-            if pdf_file:
-                pdf_file_path = os.path.join('static', 'books', pdf_file.filename)
-                pdf_file.save(pdf_file_path)
-
-            # Handle the picture upload
-            picture_file = request.files.get('picture')
-            picture_file_path = None
-            if picture_file:
-                picture_file_path = os.path.join('static', 'books', picture_file.filename)
-                picture_file.save(picture_file_path)
-
             action = request.form.get('action', 'addBook')
+            updating = action == 'updateBook' and bookid  # Update only if action is updateBook and bookid is provided
+
+            # Store the PDF and picture uploads (an update keeps files not re-uploaded)
+            pdf_file_path, picture_file_path, replaced = store_book_files(cursor, bookid if updating else None)
 
-            if action == 'updateBook' and bookid:  # Update only if action is updateBook and bookid is provided
+            if updating:
                 cursor.execute(''' 
                     UPDATE book 
                     SET name = %s, authorid = %s, categoryid = %s, status = %s, isbn = %s, pdf_path = %s, picture = %s, publisherid = %s, updated_on = NOW()
@@ -614,7 +946,17 @@ def save_book():
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
                 ''', (name, authorid, categoryid, status, isbn, pdf_file_path, picture_file_path, publisherid))
                 mysql.connection.commit()
-
+                bookid = cursor.lastrowid
+
+            blob_store.collect(mysql, replaced)
+            response_cache.invalidate_catalog()
+            catalog_index.refresh_book(mysql, bookid)
+            pdf_locator.forget_book(bookid)
+            reindex_book(bookid)
+            suggest_index.refresh(mysql, 'book', bookid)
+            suggest_index.refresh(mysql, 'author', authorid)
+            if not updating:
+                dashboard_counters.book_added(bookid)
             return redirect(url_for('books'))
 
         elif request.method == 'POST':
@@ -663,24 +1005,6 @@ def edit_book():
             publisherid = request.form.get('publisherid')
             no_of_copy = request.form['no_of_copy']
             
-            # Handle PDF file
-            pdf_file = request.files.get('pdf')
-            pdf_path = books.get('pdf_path') if books else None  # Keep existing if no new file
-            if pdf_file and pdf_file.filename:
-                # Store only filename
-                pdf_path = pdf_file.filename
-                # Save file with full path
-                pdf_file.save(os.path.join('static', 'books', pdf_file.filename))
-            
-            # Handle picture file
-            picture_file = request.files.get('picture')
-            picture_path = books.get('picture') if books else None  # Keep existing if no new file
-            if picture_file and picture_file.filename:
-                # Store only filename
-                picture_path = picture_file.filename
-                # Save file with full path
-                picture_file.save(os.path.join('static', 'books', picture_file.filename))
-            
             # Handle new author if provided
             if request.form.get('new_author'):
                 cursor.execute('INSERT INTO author (name) VALUES (%s)', (request.form['new_author'],))
@@ -698,7 +1022,11 @@ def edit_book():
                 cursor.execute('INSERT INTO publisher (name) VALUES (%s)', (request.form['new_publisher'],))
                 mysql.connection.commit()
                 publisherid = cursor.lastrowid
-            
+
+            # Store the PDF and picture uploads (existing files are kept if none is uploaded)
+            pdf_path, picture_path, replaced = store_book_files(cursor, bookid)
+
+            added = not bookid
             if bookid:
                 cursor.execute('''
                     UPDATE book
@@ -715,8 +1043,18 @@ def edit_book():
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
                 ''', (name, authorid, categoryid, status, isbn, pdf_path, 
                       picture_path, publisherid, no_of_copy))
-            
+                bookid = cursor.lastrowid
+
             mysql.connection.commit()
+            blob_store.collect(mysql, replaced)
+            response_cache.invalidate_catalog()
+            catalog_index.refresh_book(mysql, bookid)
+            pdf_locator.forget_book(bookid)
+            reindex_book(bookid)
+            suggest_index.refresh(mysql, 'book', bookid)
+            suggest_index.refresh(mysql, 'author', authorid)
+            if added:
+                dashboard_counters.book_added(bookid)
             return redirect(url_for('books'))
         
         return render_template("edit_books.html", books=books, authors=authors, 
@@ -730,47 +1068,187 @@ def delete_book():
     if 'loggedin' in session and session['role'] == 'admin':
         bookid = request.args.get('bookid')
         cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        blob_store.ensure_table(mysql)
+        cursor.execute('SELECT pdf_path, picture FROM book WHERE bookid = %s FOR UPDATE', (bookid,))
+        files = cursor.fetchone() or {}
         cursor.execute('DELETE FROM book WHERE bookid = %s', (bookid,))
+        released = [key for key in files.values() if key]
+        for key in released:
+            blob_store.release(cursor, key)
         mysql.connection.commit()
+        blob_store.collect(mysql, released)
+        response_cache.invalidate_catalog()
+        catalog_index.remove_book(bookid)
+        pdf_locator.forget_book(bookid)
+        book_text_index.enqueue(bookid)  # Drops its pages from the content index
+        semantic_index.remove_book(bookid)
+        suggest_index.remove('book', bookid)
+        dashboard_counters.book_removed(bookid)
+        rating_store.remove_book(bookid)
         return redirect(url_for('books'))
     return redirect(url_for('home'))
 
 
+def run_book_import(job_id, upload_path, fmt):
+    job = import_jobs[job_id]
+    try:
+        with app.app_context():
+            importer = BookImporter(mysql.connection, on_progress=job['progress'].update)
+            with open(upload_path, 'rb') as stream, open(job['errors'], 'w', newline='', encoding='utf-8') as error_file:
+                importer.run(stream, fmt, error_file)
+            # Imported books reach the search indexes and counters on their next use
+            response_cache.invalidate_catalog()
+            catalog_index.mark_stale()
+            semantic_index.mark_stale()
+            suggest_index.mark_stale()
+            dashboard_counters.reconcile(mysql)
+    except Exception as e:
+        logging.error(f"Book import {job_id} failed: {str(e)}")
+        job['progress'].update({'done': True, 'error': str(e)})
+    finally:
+        os.remove(upload_path)
+
+
+@app.route('/api/import/books', methods=['POST'])
+def import_books():
+    """
+    Starts a bulk import of the uploaded CSV, JSON array or JSON Lines file
+    ('file'; 'format' is csv or json, by default from the file name).
+    """
+    if not ('loggedin' in session and session['role'] == 'admin'):
+        return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    if fmt not in ('csv', 'json'):
+        return jsonify({'success': False, 'error': 'Format must be csv or json'}), 400
+
+    job_id = uuid.uuid4().hex
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    upload_path = os.path.join(IMPORT_DIR, f"{job_id}.upload")
+    upload.save(upload_path)
+
+    while len(import_jobs) >= MAX_IMPORT_JOBS:
+        _, old_job = import_jobs.popitem(last=False)
+        if os.path.exists(old_job['errors']):
+            os.remove(old_job['errors'])
+    import_jobs[job_id] = {
+        'filename': upload.filename,
+        'errors': os.path.join(IMPORT_DIR, f"{job_id}.errors.csv"),
+        'progress': {'rows_read': 0, 'imported': 0, 'skipped': 0, 'failed': 0, 'done': False, 'error': None}
+    }
+    threading.Thread(target=run_book_import, args=(job_id, upload_path, fmt),
+                     name=f"book-import-{job_id[:8]}", daemon=True).start()
+    return jsonify({'success': True, 'job_id': job_id,
+                    'status_url': url_for('import_status', job_id=job_id)}), 202
+
+
+@app.route('/api/import/books/<job_id>')
+def import_status(job_id):
+    if not ('loggedin' in session and session['role'] == 'admin'):
+        return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown import'}), 404
+    progress = dict(job['progress'])
+    if progress['done'] and (progress['skipped'] or progress['failed']):
+        progress['errors_url'] = url_for('import_errors', job_id=job_id)
+    return jsonify({'success': True, 'filename': job['filename'], 'progress': progress})
+
+
+@app.route('/api/import/books/<job_id>/errors')
+def import_errors(job_id):
+    if not ('loggedin' in session and session['role'] == 'admin'):
+        return redirect(url_for('home'))
+    job = import_jobs.get(job_id)
+    if job is None or not os.path.exists(job['errors']):
+        abort(404)
+    return send_from_directory(IMPORT_DIR, os.path.basename(job['errors']), as_attachment=True,
+                               download_name='import_errors.csv')
+
+
+@app.route('/api/export/<name>')
+def export_data(name):
+    """
+    Streams books, loans, reviews or users as a download. Query parameters:
+    format (csv, json or jsonl) and gzip=1.
+    """
+    if not ('loggedin' in session and session['role'] == 'admin'):
+        return jsonify({'success': False, 'error': 'Unauthorized access'}), 401
+    if name not in EXPORTS:
+        return jsonify({'success': False, 'error': 'Unknown export'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'error': 'Format must be csv, json or jsonl'}), 400
+    compress = request.args.get('gzip') in ('1', 'true', 'yes')
+
+    def generate():
+        # A connection of its own: it is busy with the unbuffered result until the download ends
+        connection = mysql.pool.checkout()
+        finished = False
+        try:
+            yield from export_rows(connection, name, fmt, compress)
+            finished = True
+        finally:
+            if finished:
+                mysql.pool.checkin(connection)
+            else:
+                mysql.pool.discard(connection)  # Client went away mid-result
+
+    filename = export_filename(name, fmt, compress, datetime.now())
+    return Response(generate(), mimetype='application/gzip' if compress else FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                             'X-Accel-Buffering': 'no'})
+
+
 @app.route('/download_pdf/<identifier>')
 def download_pdf(identifier):
-    cur = mysql.connection.cursor()
-    
-    # Try to fetch by bookid first
-    cur.execute("SELECT pdf_path FROM book WHERE bookid = %s", (identifier,))
-    result = cur.fetchone()
-    
-    if not result or not result[0]:
-        # If not found, try searching by ISBN
-        cur.execute("SELECT pdf_path FROM book WHERE isbn = %s", (identifier,))
-        result = cur.fetchone()
-    
-    if not result or not result[0]:
+    # Looks up by bookid first, then by ISBN (remembered after the first download)
+    pdf_path, name = pdf_locator.resolve(mysql, identifier)
+    path = book_file_path(pdf_path)
+    if path is None:
         abort(404)  # Return 404 if file doesn't exist
-    
-    pdf_path = result[0].strip()
-    return send_from_directory('static/books', pdf_path, as_attachment=True)
+    mysql.release()  # The rest of the response needs no database
+
+    try:
+        # ?inline=1 opens the PDF in the browser's viewer
+        # Stored files are named by their hash: offer the book's name instead
+        return send_book_file(path, as_attachment=not request.args.get('inline'),
+                              offload=app.config['BOOK_FILE_OFFLOAD'],
+                              download_name=f"{name}.pdf" if key_digest(pdf_path) else None,
+                              etag=key_digest(pdf_path))
+    except FileNotFoundError:
+        abort(404)
+
+
+@app.route('/covers/<path:picture>')
+def cover(picture):
+    # ?w= is the width the page shows the cover at (times the pixel ratio)
+    width = width_bucket(request.args.get('w', 128, type=int))
+    fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    try:
+        path = cover_thumbnails.variant(cover_source(picture), width, fmt)
+    except OSError:
+        abort(404)  # Missing or not an image
+
+    stored = is_key(picture)
+    response = send_file(path, mimetype=COVER_FORMATS[fmt][2], conditional=True,
+                         max_age=STORED_FILE_MAX_AGE if stored else COVER_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = stored or None
+    response.vary.add('Accept')
+    return response
 
 
 # Manage Issue Book (Admin Only)
 @app.route("/list_issue_book", methods=['GET', 'POST'])
 def list_issue_book():
     if 'loggedin' in session and session['role'] == 'admin':
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT issued_book.issuebookid, issued_book.issue_date_time, issued_book.expected_return_date, issued_book.return_date_time, issued_book.status, book.name AS book_name, book.isbn, user.first_name, user.last_name FROM issued_book LEFT JOIN book ON book.bookid = issued_book.bookid LEFT JOIN user ON user.id = issued_book.userid")
-        issue_books = cursor.fetchall()
+        page = first_page('issue_books')  # Latest issues first
 
-        cursor.execute("SELECT bookid, name FROM book")
-        books = cursor.fetchall()
-
-        cursor.execute("SELECT id, first_name, last_name FROM user")
-        users = cursor.fetchall()
-
-        return render_template("issue_book.html", issue_books=issue_books, books=books, users=users)
+        # Book and user pickers load their options from /api/suggest
+        return render_template("issue_book.html", issue_books=page['items'], page=page)
     return redirect(url_for('home'))
 
 
@@ -791,12 +1269,20 @@ def save_issue_book():
 
             if action == 'updateIssueBook':
                 issuebookid = request.form['issueBookId']
+                cursor.execute('SELECT bookid, status FROM issued_book WHERE issuebookid = %s', (issuebookid,))
+                previous = cursor.fetchone()
                 cursor.execute('UPDATE issued_book SET bookid = %s, userid = %s, expected_return_date = %s, return_date_time = %s, status = %s WHERE issuebookid = %s', (bookId, userId, expected_return_date, return_date, status, issuebookid))
                 mysql.connection.commit()
+                if previous:
+                    dashboard_counters.issue_changed((previous['bookid'], previous['status']), (bookId, status))
             else:
                 cursor.execute('INSERT INTO issued_book (`bookid`, `userid`, `expected_return_date`, `return_date_time`, `status`) VALUES (%s, %s, %s, %s, %s)', (bookId, userId, expected_return_date, return_date, status))
                 mysql.connection.commit()
+                suggest_index.bump('book', bookId)
+                suggest_index.bump('user', userId)
+                dashboard_counters.issue_changed(new=(bookId, status))
 
+            response_cache.invalidate_catalog()
             return redirect(url_for('list_issue_book'))
         return redirect(url_for('list_issue_book'))
     return redirect(url_for('home'))
@@ -810,13 +1296,8 @@ def edit_issue_book():
         cursor.execute('SELECT issued_book.issuebookid, issued_book.issue_date_time, issued_book.expected_return_date, issued_book.return_date_time, issued_book.bookid, issued_book.userid, issued_book.status, book.name AS book_name, book.isbn, user.first_name, user.last_name FROM issued_book LEFT JOIN book ON book.bookid = issued_book.bookid LEFT JOIN user ON user.id = issued_book.userid WHERE issued_book.issuebookid = %s', (issuebookid,))
         issue_books = cursor.fetchall()
 
-        cursor.execute("SELECT bookid, name FROM book")
-        books = cursor.fetchall()
-
-        cursor.execute("SELECT id, first_name, last_name FROM user")
-        users = cursor.fetchall()
-
-        return render_template("edit_issue_book.html", issue_books=issue_books, books=books, users=users)
+        # Book and user pickers load their options from /api/suggest
+        return render_template("edit_issue_book.html", issue_books=issue_books)
     return redirect(url_for('home'))
 
 
@@ -825,8 +1306,13 @@ def delete_issue_book():
     if 'loggedin' in session and session['role'] == 'admin':
         issuebookid = request.args.get('issuebookid')
         cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute('SELECT bookid, status FROM issued_book WHERE issuebookid = %s', (issuebookid,))
+        previous = cursor.fetchone()
         cursor.execute('DELETE FROM issued_book WHERE issuebookid = %s', (issuebookid,))
         mysql.connection.commit()
+        if previous:
+            dashboard_counters.issue_changed(old=(previous['bookid'], previous['status']))
+        response_cache.invalidate_catalog()
         return redirect(url_for('list_issue_book'))
     return redirect(url_for('home'))
 
@@ -834,10 +1320,8 @@ def delete_issue_book():
 @app.route("/category", methods=['GET', 'POST'])
 def category():
     if 'loggedin' in session and session['role'] == 'admin':        
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT categoryid, name, status FROM category")
-        categories = cursor.fetchall()    
-        return render_template("category.html", categories=categories, addCategoryForm=0)
+        page = first_page('categories')
+        return render_template("category.html", categories=page['items'], page=page, addCategoryForm=0)
     return redirect(url_for('home'))
 
 @app.route("/saveCategory", methods=['GET', 'POST'])
@@ -853,6 +1337,8 @@ def saveCategory():
                 categoryId = request.form['categoryid'] 
                 cursor.execute('UPDATE category SET name = %s, status = %s WHERE categoryid = %s', (name, status, categoryId))
                 mysql.connection.commit()        
+                catalog_index.mark_stale()  # Renames change indexed book fields
+                semantic_index.mark_stale()
             else: 
                 cursor.execute('INSERT INTO category (`name`, `status`) VALUES (%s, %s)', (name, status))
                 mysql.connection.commit()        
@@ -879,16 +1365,16 @@ def delete_category():
         cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
         cursor.execute('DELETE FROM category WHERE categoryid = %s', (categoryid,))
         mysql.connection.commit()   
+        catalog_index.mark_stale()
+        semantic_index.mark_stale()
         return redirect(url_for('category'))
     return redirect(url_for('home'))
 # Manage Author   
 @app.route("/author", methods=['GET', 'POST'])
 def author():
     if 'loggedin' in session and session['role'] == 'admin':
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT authorid, name, status FROM author")
-        authors = cursor.fetchall()    
-        return render_template("author.html", authors=authors)
+        page = first_page('authors')
+        return render_template("author.html", authors=page['items'], page=page)
     return redirect(url_for('home'))
 
 @app.route("/saveAuthor", methods=['GET', 'POST'])
@@ -904,9 +1390,13 @@ def saveAuthor():
                 authorId = request.form['authorid'] 
                 cursor.execute('UPDATE author SET name = %s, status = %s WHERE authorid = %s', (name, status, authorId))
                 mysql.connection.commit()        
+                catalog_index.mark_stale()  # Renames change indexed book fields
+                semantic_index.mark_stale()
             else: 
                 cursor.execute('INSERT INTO author (`name`, `status`) VALUES (%s, %s)', (name, status))
                 mysql.connection.commit()        
+                authorId = cursor.lastrowid
+            suggest_index.refresh(mysql, 'author', authorId)
             return redirect(url_for('author'))        
         elif request.method == 'POST':
             msg = 'Please fill out the form !'        
@@ -930,6 +1420,9 @@ def delete_author():
         cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
         cursor.execute('DELETE FROM author WHERE authorid = %s', (authorid,))
         mysql.connection.commit()   
+        catalog_index.mark_stale()
+        semantic_index.mark_stale()
+        suggest_index.remove('author', authorid)
         return redirect(url_for('author'))
     return redirect(url_for('home'))
 
@@ -937,10 +1430,8 @@ def delete_author():
 @app.route("/publisher", methods=['GET', 'POST'])
 def publisher():
     if 'loggedin' in session and session['role'] == 'admin':
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT publisherid, name, status FROM publisher")
-        publishers = cursor.fetchall()    
-        return render_template("publisher.html", publishers=publishers)
+        page = first_page('publishers')
+        return render_template("publisher.html", publishers=page['items'], page=page)
     return redirect(url_for('home'))
 
 @app.route("/savePublisher", methods=['GET', 'POST'])
@@ -956,6 +1447,8 @@ def savePublisher():
                 publisherid = request.form['publisherid'] 
                 cursor.execute('UPDATE publisher SET name = %s, status = %s WHERE publisherid = %s', (name, status, publisherid))
                 mysql.connection.commit()        
+                catalog_index.mark_stale()  # Renames change indexed book fields
+                semantic_index.mark_stale()
             else: 
                 cursor.execute('INSERT INTO publisher (`name`, `status`) VALUES (%s, %s)', (name, status))
                 mysql.connection.commit()        
@@ -982,9 +1475,14 @@ def delete_publisher():
         cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
         cursor.execute('DELETE FROM publisher WHERE publisherid = %s', (publisherid,))
         mysql.connection.commit()   
+        catalog_index.mark_stale()
+        semantic_index.mark_stale()
         return redirect(url_for('publisher'))
     return redirect(url_for('home'))
     
 if __name__ == "__main__":
+    # The reloader runs this file twice; only the child it marks with WERKZEUG_RUN_MAIN serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init_app()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,294 @@
+"""
+Content-addressed storage for book PDFs and covers. A file is kept once
+under its SHA-256 (static/books/cas/ab/abcd....pdf) however many books use
+it, and the key is what book.pdf_path / book.picture hold. stored_file
+counts the books referring to each key; a file is deleted when the last
+one lets go. Uploads are hashed while werkzeug writes them to disk, so
+saving one is a hard link, not another copy.
+
+Existing files are moved into the store, and files left behind by failed
+uploads removed, with
+
+    python blob_store.py migrate
+    python blob_store.py sweep
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import Request
+
+from file_delivery import BOOKS_DIR, book_file_path
+
+STORE_DIR = os.path.join(BOOKS_DIR, 'cas')
+TMP_DIR = os.path.join(STORE_DIR, 'tmp')
+CHUNK_SIZE = 64 * 1024
+
+# Stored files are served by the web server (X-Sendfile / X-Accel-Redirect), so
+# they are readable by everyone, not 0600 like a temporary file
+FILE_MODE = 0o644
+
+# sweep leaves younger files alone: their upload's transaction may not have committed yet
+SWEEP_MIN_AGE = 3600
+
+# Keys look like cas/ab/<64 hex digits>.pdf
+KEY_PATTERN = re.compile(r'^cas/[0-9a-f]{2}/([0-9a-f]{64})(\.[a-z0-9]{1,8})?$')
+
+STORED_FILE_TABLE = """
+    CREATE TABLE IF NOT EXISTS `stored_file` (
+      `file_key` varchar(100) NOT NULL,
+      `size` bigint(20) UNSIGNED NOT NULL,
+      `refcount` int(11) NOT NULL DEFAULT 0,
+      `created_on` datetime NOT NULL DEFAULT current_timestamp(),
+      PRIMARY KEY (`file_key`)
+    ) ENGINE=InnoDB
+"""
+
+
+def is_key(value):
+    return bool(value) and KEY_PATTERN.match(value) is not None
+
+
+def key_digest(value):
+    """Returns the SHA-256 hex digest inside a key, or None for other paths."""
+    match = KEY_PATTERN.match(value or '')
+    return match.group(1) if match else None
+
+
+def _extension(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    return extension if re.fullmatch(r'\.[a-z0-9]{1,8}', extension) else ''
+
+
+class HashingFile:
+    """
+    Temporary upload file that hashes everything written to it. Used by
+    UploadRequest so multipart parsing and hashing happen in one pass.
+    """
+
+    def __init__(self):
+        os.makedirs(TMP_DIR, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=TMP_DIR, prefix='upload-')
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        return iter(self.file)
+
+
+class UploadRequest(Request):
+    """Request class that spools uploaded files into HashingFile objects."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingFile()
+
+
+class BlobStore:
+
+    def __init__(self):
+        self._table_ready = False
+
+    def ensure_table(self, mysql):
+        if not self._table_ready:
+            cursor = mysql.connection.cursor()
+            try:
+                cursor.execute(STORED_FILE_TABLE)
+            finally:
+                cursor.close()
+            self._table_ready = True
+
+    def path(self, key):
+        return os.path.join(BOOKS_DIR, *key.split('/'))
+
+    def put(self, cursor, upload):
+        """
+        Stores an uploaded file (once per distinct content) and counts one
+        more reference to it, in the caller's transaction. The reference is
+        taken before the file is placed, so a concurrent collect() of the
+        same key waits for this transaction instead of deleting the file.
+        Args:
+            cursor: Cursor inside the transaction that saves the book
+            upload (FileStorage): File from request.files
+        Returns:
+            str: Key to store in pdf_path / picture
+        """
+        stream = upload.stream
+        if not isinstance(stream, HashingFile):
+            # Not spooled by UploadRequest: copy it into a hashing temp file first
+            spooled = HashingFile()
+            shutil.copyfileobj(stream, spooled, CHUNK_SIZE)
+            stream = spooled
+        stream.flush()
+        digest = stream.sha256.hexdigest()
+        key = f"cas/{digest[:2]}/{digest}{_extension(upload.filename)}"
+
+        cursor.execute("""
+            INSERT INTO stored_file (file_key, size, refcount) VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE refcount = refcount + 1
+        """, (key, stream.size))
+
+        path = self.path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(stream.name, FILE_MODE)  # The link shares the temp file's mode
+            try:
+                os.link(stream.name, path)  # Same filesystem: no second copy
+            except FileExistsError:
+                pass  # Stored by a concurrent upload of the same content
+            except OSError:
+                partial = f"{path}.{os.getpid()}.partial"
+                shutil.copyfile(stream.name, partial)
+                os.replace(partial, path)
+        return key
+
+    def release(self, cursor, key):
+        """
+        Drops one reference to a key in the caller's transaction (no-op for
+        paths stored before the blob store). Call collect() after commit.
+        """
+        if is_key(key):
+            cursor.execute("UPDATE stored_file SET refcount = refcount - 1 WHERE file_key = %s", (key,))
+
+    def collect(self, mysql, keys):
+        """
+        Deletes the files of keys nobody refers to any more.
+        """
+        keys = [key for key in set(keys) if is_key(key)]
+        if not keys:
+            return
+        cursor = mysql.connection.cursor()
+        try:
+            for key in keys:
+                # The row lock keeps a concurrent put() of the same key waiting until the file is gone
+                cursor.execute("DELETE FROM stored_file WHERE file_key = %s AND refcount <= 0", (key,))
+                if cursor.rowcount:
+                    try:
+                        os.remove(self.path(key))
+                    except FileNotFoundError:
+                        pass
+            mysql.connection.commit()
+        finally:
+            cursor.close()
+
+    def migrate(self, connection, delete_originals=False):
+        """
+        Moves the files of every book into the store and rewrites pdf_path
+        and picture as keys, so identical files are kept once.
+        Returns:
+            dict: books updated, files stored, bytes freed, missing files
+        """
+        summary = {'books': 0, 'stored': 0, 'bytes_freed': 0, 'missing': []}
+        cursor = connection.cursor(MySQLdb.cursors.DictCursor)
+        cursor.execute(STORED_FILE_TABLE)
+        cursor.execute("SELECT bookid, pdf_path, picture FROM book")
+        books = cursor.fetchall()
+        originals = set()
+        for book in books:
+            updates = {}
+            for column in ('pdf_path', 'picture'):
+                value = (book[column] or '').strip()
+                if not value or is_key(value):
+                    continue
+                path = book_file_path(value)
+                if path is None or not os.path.isfile(path):
+                    summary['missing'].append(value)
+                    continue
+                with open(path, 'rb') as f:
+                    upload = _LocalFile(f, os.path.basename(path))
+                    key = self.put(cursor, upload)
+                updates[column] = key
+                originals.add(path)
+            if updates:
+                assignments = ', '.join(f"{column} = %s" for column in updates)
+                cursor.execute(f"UPDATE book SET {assignments} WHERE bookid = %s",
+                               list(updates.values()) + [book['bookid']])
+                connection.commit()
+                summary['books'] += 1
+        cursor.execute("SELECT COUNT(*) AS files FROM stored_file")
+        summary['stored'] = cursor.fetchone()['files']
+        cursor.close()
+        if delete_originals:
+            for path in originals:
+                summary['bytes_freed'] += os.path.getsize(path)
+                os.remove(path)
+        return summary
+
+
+    def sweep(self, connection, min_age=SWEEP_MIN_AGE):
+        """
+        Deletes stored files with no stored_file row (left by uploads whose
+        transaction rolled back) and stale temporary uploads.
+        Returns:
+            int: Files deleted
+        """
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT file_key FROM stored_file")
+            known = {key for (key,) in cursor.fetchall()}
+        finally:
+            cursor.close()
+        cutoff = time.time() - min_age
+        deleted = 0
+        for directory, _, filenames in os.walk(STORE_DIR):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                key = os.path.relpath(path, BOOKS_DIR).replace(os.sep, '/')
+                if key in known or os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                deleted += 1
+        return deleted
+
+
+class _LocalFile:
+    # Minimal FileStorage stand-in for files already on disk
+    def __init__(self, stream, filename):
+        self.stream = stream
+        self.filename = filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed book file storage")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate = subparsers.add_parser('migrate', help="Move existing book files into the store")
+    migrate.add_argument('--delete-originals', action='store_true',
+                         help="Remove the old copies once every book points at the store")
+    subparsers.add_parser('sweep', help="Delete stored files no book refers to")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--db', default='library-system')
+    args = parser.parse_args()
+
+    connection = MySQLdb.connect(host=args.host, user=args.user, passwd=args.password, db=args.db,
+                                 charset='utf8mb4', use_unicode=True)
+    try:
+        if args.command == 'sweep':
+            print(f"Deleted {BlobStore().sweep(connection)} unreferenced files")
+            return
+        summary = BlobStore().migrate(connection, delete_originals=args.delete_originals)
+    finally:
+        connection.close()
+    print(f"Updated {summary['books']} books; {summary['stored']} distinct files in the store")
+    if summary['bytes_freed']:
+        print(f"Freed {summary['bytes_freed']} bytes")
+    for value in summary['missing']:
+        print(f"Missing file, left as is: {value}")
+
+
+if __name__ == "__main__":
+    main()
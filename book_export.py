@@ -0,0 +1,154 @@
+"""
+Streaming exports of books, loans (issued_book), reviews and users as CSV,
+JSON or JSON Lines, optionally gzipped. Rows are read through an
+unbuffered server-side cursor and encoded a batch at a time, so memory
+stays flat however large the table is and the first bytes go out at once.
+
+    python book_export.py books --format csv --gzip -o books.csv.gz
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+
+import MySQLdb
+import MySQLdb.cursors
+
+# Book columns use the names book_import.py reads, so an export re-imports as is
+EXPORTS = {
+    'books': """
+        SELECT b.bookid, b.name, a.name AS author, c.name AS category, p.name AS publisher, b.isbn,
+               b.no_of_copy, b.status, b.picture, b.pdf_path, b.added_on, b.updated_on
+        FROM book b
+        LEFT JOIN author a ON b.authorid = a.authorid
+        LEFT JOIN category c ON b.categoryid = c.categoryid
+        LEFT JOIN publisher p ON b.publisherid = p.publisherid
+        ORDER BY b.bookid
+    """,
+    'loans': """
+        SELECT i.issuebookid, i.bookid, b.name AS book_name, b.isbn, i.userid, u.email,
+               i.issue_date_time, i.expected_return_date, i.return_date_time, i.status
+        FROM issued_book i
+        LEFT JOIN book b ON b.bookid = i.bookid
+        LEFT JOIN user u ON u.id = i.userid
+        ORDER BY i.issuebookid
+    """,
+    'reviews': """
+        SELECT r.id, r.book_id, b.name AS book_name, r.user_id, r.rating, r.review, r.created_on
+        FROM reviews r
+        LEFT JOIN book b ON b.bookid = r.book_id
+        ORDER BY r.id
+    """,
+    'users': """
+        SELECT id, first_name, last_name, email, role
+        FROM user
+        ORDER BY id
+    """
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'jsonl': 'application/x-ndjson'
+}
+
+BATCH_SIZE = 1000
+
+# Seconds the server waits on a slow reader before dropping an unbuffered result
+NET_WRITE_TIMEOUT = 600
+
+
+def _encode_batch(rows, columns, fmt, first):
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    lines = [json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) for row in rows]
+    if fmt == 'jsonl':
+        return '\n'.join(lines) + '\n'
+    return ('' if first else ',\n') + ',\n'.join(lines)
+
+
+def export_rows(connection, name, fmt='csv', compress=False, batch_size=BATCH_SIZE):
+    """
+    Yields one export as encoded chunks. The connection is busy with the
+    unbuffered result until the generator finishes; if it is closed early
+    the connection is left mid-result and should be closed, not reused.
+    Args:
+        connection: MySQLdb connection
+        name (str): Key of EXPORTS
+        fmt (str): 'csv', 'json' (one array) or 'jsonl'
+        compress (bool): gzip the output
+        batch_size (int): Rows fetched and encoded per chunk
+    Yields:
+        bytes: Output chunks
+    """
+    encoder = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits 31: gzip container
+
+    def emit(text):
+        data = text.encode('utf-8')
+        return encoder.compress(data) if encoder else data
+
+    cursor = connection.cursor(MySQLdb.cursors.SSCursor)
+    finished = False
+    try:
+        cursor.execute(f"SET SESSION net_write_timeout = {NET_WRITE_TIMEOUT}")
+        cursor.execute(EXPORTS[name])
+        columns = [column[0] for column in cursor.description]
+        if fmt == 'csv':
+            yield emit(_encode_batch([columns], columns, fmt, True))
+        elif fmt == 'json':
+            yield emit('[\n')
+        first = True
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            chunk = emit(_encode_batch(rows, columns, fmt, first))
+            first = False
+            if chunk:  # gzip may hold small batches back
+                yield chunk
+        tail = emit('\n]\n') if fmt == 'json' else b''
+        if encoder:
+            tail += encoder.flush()
+        if tail:
+            yield tail
+        finished = True
+    finally:
+        # Closing the cursor early would read the rest of the result first
+        if finished:
+            cursor.close()
+
+
+def export_filename(name, fmt, compress, date):
+    return f"{name}-{date:%Y%m%d}.{fmt}" + ('.gz' if compress else '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export library data as CSV or JSON")
+    parser.add_argument('name', choices=list(EXPORTS))
+    parser.add_argument('--format', choices=list(FORMATS), default='csv')
+    parser.add_argument('--gzip', action='store_true', help="Compress the output")
+    parser.add_argument('-o', '--output', default='-', help="File to write ('-' for stdout)")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--db', default='library-system')
+    args = parser.parse_args()
+
+    connection = MySQLdb.connect(host=args.host, user=args.user, passwd=args.password, db=args.db,
+                                 charset='utf8mb4', use_unicode=True)
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in export_rows(connection, args.name, args.format, args.gzip):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
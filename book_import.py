@@ -0,0 +1,369 @@
+"""
+Bulk catalog import from CSV, JSON arrays or JSON Lines. The file is parsed
+as a stream, authors/categories/publishers are resolved (or created)
+through in-memory lookups, books already in the catalog are skipped by
+ISBN, and rows are written with executemany in one transaction per batch.
+Rows that cannot be imported are written to a CSV error file.
+
+    python book_import.py catalog.csv --errors import_errors.csv
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+import MySQLdb
+import MySQLdb.cursors
+
+# Accepted column names for each book field, first match wins
+COLUMN_ALIASES = {
+    'name': ['name', 'title'],
+    'author': ['author', 'author_name'],
+    'category': ['category', 'genre', 'category_name', 'genre_name'],
+    'publisher': ['publisher', 'publisher_name'],
+    'isbn': ['isbn'],
+    'no_of_copy': ['no_of_copy', 'copies'],
+    'status': ['status'],
+    'picture': ['picture'],
+    'pdf_path': ['pdf_path']
+}
+
+# Lookup tables: table -> (id column, longest name)
+LOOKUP_TABLES = {
+    'author': ('authorid', 200),
+    'category': ('categoryid', 200),
+    'publisher': ('publisherid', 255)
+}
+
+INSERT_BOOK = """
+    INSERT INTO book (name, authorid, categoryid, publisherid, isbn, no_of_copy, status, picture, pdf_path,
+                      added_on, updated_on)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+"""
+
+DEFAULT_BATCH_SIZE = 1000
+JSON_CHUNK_CHARS = 64 * 1024
+
+
+class RowError(Exception):
+    """A row that cannot be imported; the message goes to the error file."""
+
+
+def normalize_isbn(isbn):
+    return (isbn or '').replace('-', '').replace(' ', '').upper()
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.json', '.jsonl', '.ndjson'):
+        return 'json'
+    return 'csv'
+
+
+def _iter_json(text):
+    """
+    Yields objects from a JSON array or JSON Lines text stream without
+    reading it all: objects are decoded one at a time from a small buffer.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        # Skip whitespace and the array's brackets and commas
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                return
+            buffer = text.read(JSON_CHUNK_CHARS)
+            position = 0
+            eof = not buffer
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # The object may continue in the next chunk
+            more = '' if eof else text.read(JSON_CHUNK_CHARS)
+            if not more:
+                raise ValueError(f"Invalid JSON near: {buffer[position:position + 80]!r}")
+            buffer = buffer[position:] + more
+            position = 0
+            continue
+        yield value
+        position = end
+
+
+def iter_records(stream, fmt):
+    """
+    Args:
+        stream: Binary file object
+        fmt (str): 'csv' or 'json' (array or JSON Lines)
+    Yields:
+        tuple: (record number, dict of column -> value)
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    records = csv.DictReader(text) if fmt == 'csv' else _iter_json(text)
+    for number, record in enumerate(records, start=1):
+        yield number, record
+
+
+def _field(record, field):
+    for column in COLUMN_ALIASES[field]:
+        value = record.get(column)
+        if value not in (None, ''):
+            return str(value).strip()
+    return ''
+
+
+def parse_record(record):
+    """
+    Returns:
+        dict: Book fields, validated against the book table
+    Raises:
+        RowError: A required field is missing or a value is invalid
+    """
+    if not isinstance(record, dict):
+        raise RowError("Row is not an object")
+    book = {field: _field(record, field) for field in COLUMN_ALIASES}
+    for field in ('name', 'author', 'category', 'publisher', 'isbn'):
+        if not book[field]:
+            raise RowError(f"Missing {field}")
+    for table, (_, max_length) in LOOKUP_TABLES.items():
+        if len(book[table]) > max_length:
+            raise RowError(f"{table.capitalize()} name is longer than {max_length} characters")
+    if len(book['isbn']) > 30:
+        raise RowError("ISBN is longer than 30 characters")
+
+    try:
+        book['no_of_copy'] = int(book['no_of_copy'] or 1)
+    except ValueError:
+        raise RowError(f"Invalid no_of_copy: {book['no_of_copy']!r}")
+    if book['no_of_copy'] < 0:
+        raise RowError("no_of_copy cannot be negative")
+
+    status = (book['status'] or 'Enable').capitalize()
+    if status not in ('Enable', 'Disable'):
+        raise RowError(f"Invalid status: {book['status']!r}")
+    book['status'] = status
+    return book
+
+
+class LookupCache:
+    """
+    Name -> id for one of author/category/publisher, loaded once. Names
+    missing from the table are created in bulk, one statement per batch.
+    """
+
+    def __init__(self, connection, table):
+        self.connection = connection
+        self.table = table
+        self.id_column = LOOKUP_TABLES[table][0]
+        self.ids = {}
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SELECT {self.id_column}, name FROM {table}")
+            for row_id, name in cursor.fetchall():
+                self.ids.setdefault(name.strip().casefold(), row_id)
+        finally:
+            cursor.close()
+
+    def resolve(self, cursor, names):
+        """
+        Creates the names not seen yet (in the caller's transaction).
+        Returns:
+            list: Names that were created, to forget() if the transaction fails
+        """
+        missing = {}
+        for name in names:
+            key = name.casefold()
+            if key not in self.ids and key not in missing:
+                missing[key] = name
+        if not missing:
+            return []
+        cursor.executemany(f"INSERT INTO {self.table} (name, status) VALUES (%s, 'Enable')",
+                           [(name,) for name in missing.values()])
+        placeholders = ', '.join(['%s'] * len(missing))
+        cursor.execute(f"SELECT {self.id_column}, name FROM {self.table} WHERE name IN ({placeholders})",
+                       list(missing.values()))
+        for row_id, name in cursor.fetchall():
+            self.ids.setdefault(name.strip().casefold(), row_id)
+        return list(missing)
+
+    def forget(self, keys):
+        for key in keys:
+            self.ids.pop(key, None)
+
+    def get(self, name):
+        return self.ids[name.casefold()]
+
+
+class BookImporter:
+    """
+    Imports books over one MySQLdb connection. progress is updated after
+    every batch and can be read from another thread.
+    """
+
+    def __init__(self, connection, batch_size=DEFAULT_BATCH_SIZE, on_progress=None):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.progress = {
+            'rows_read': 0,
+            'imported': 0,
+            'skipped': 0,
+            'failed': 0,
+            'rows_per_second': 0,
+            'elapsed': 0,
+            'done': False,
+            'error': None
+        }
+
+    def run(self, stream, fmt, error_file=None):
+        """
+        Args:
+            stream: Binary file object to import
+            fmt (str): 'csv' or 'json'
+            error_file: Text file object for rejected rows (CSV), or None
+        Returns:
+            dict: Final progress counts
+        """
+        started = time.monotonic()
+        errors = csv.writer(error_file) if error_file else None
+        if errors:
+            errors.writerow(['row', 'error', 'data'])
+
+        def reject(number, record, message, counter='failed'):
+            self.progress[counter] += 1
+            if errors:
+                errors.writerow([number, message, json.dumps(record, default=str)])
+
+        lookups = {table: LookupCache(self.connection, table) for table in LOOKUP_TABLES}
+        seen_isbns = self._existing_isbns()
+        batch = []
+        try:
+            for number, record in iter_records(stream, fmt):
+                self.progress['rows_read'] += 1
+                try:
+                    book = parse_record(record)
+                except RowError as e:
+                    reject(number, record, str(e))
+                    continue
+                isbn = normalize_isbn(book['isbn'])
+                if isbn in seen_isbns:
+                    reject(number, record, "Duplicate ISBN", counter='skipped')
+                    continue
+                seen_isbns.add(isbn)
+                batch.append((number, record, book))
+                if len(batch) >= self.batch_size:
+                    self._write_batch(batch, lookups, reject)
+                    batch = []
+                    self._report(started)
+            if batch:
+                self._write_batch(batch, lookups, reject)
+        except (ValueError, csv.Error) as e:
+            # The file itself is malformed; rows already committed stay imported
+            self.progress['error'] = str(e)
+        self.progress['done'] = True
+        self._report(started)
+        return self.progress
+
+    def _existing_isbns(self):
+        cursor = self.connection.cursor(MySQLdb.cursors.SSCursor)
+        try:
+            cursor.execute("SELECT isbn FROM book")
+            return {normalize_isbn(isbn) for (isbn,) in cursor}
+        finally:
+            cursor.close()
+
+    def _values(self, book, lookups):
+        return (book['name'], lookups['author'].get(book['author']), lookups['category'].get(book['category']),
+                lookups['publisher'].get(book['publisher']), book['isbn'], book['no_of_copy'], book['status'],
+                book['picture'], book['pdf_path'])
+
+    def _write_batch(self, batch, lookups, reject):
+        cursor = self.connection.cursor()
+        created = {}
+        try:
+            for table, lookup in lookups.items():
+                created[table] = lookup.resolve(cursor, [book[table] for _, _, book in batch])
+            cursor.executemany(INSERT_BOOK, [self._values(book, lookups) for _, _, book in batch])
+            self.connection.commit()
+        except MySQLdb.Error:
+            self.connection.rollback()
+            for table, keys in created.items():
+                lookups[table].forget(keys)
+            cursor.close()
+            # Something in the batch was rejected; find which rows one at a time
+            for number, record, book in batch:
+                self._write_one(number, record, book, lookups, reject)
+            return
+        cursor.close()
+        self.progress['imported'] += len(batch)
+
+    def _write_one(self, number, record, book, lookups, reject):
+        cursor = self.connection.cursor()
+        created = {}
+        try:
+            for table, lookup in lookups.items():
+                created[table] = lookup.resolve(cursor, [book[table]])
+            cursor.execute(INSERT_BOOK, self._values(book, lookups))
+            self.connection.commit()
+        except MySQLdb.Error as e:
+            self.connection.rollback()
+            for table, keys in created.items():
+                lookups[table].forget(keys)
+            reject(number, record, f"Database error: {e}")
+            return
+        finally:
+            cursor.close()
+        self.progress['imported'] += 1
+
+    def _report(self, started):
+        elapsed = time.monotonic() - started
+        self.progress['elapsed'] = round(elapsed, 2)
+        self.progress['rows_per_second'] = round(self.progress['rows_read'] / elapsed) if elapsed else 0
+        if self.on_progress:
+            self.on_progress(dict(self.progress))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import books from CSV or JSON")
+    parser.add_argument('file', help="CSV, JSON array or JSON Lines file ('-' for stdin)")
+    parser.add_argument('--format', choices=['csv', 'json'], help="Defaults to the file extension")
+    parser.add_argument('--errors', default='import_errors.csv', help="CSV file for rejected rows")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--db', default='library-system')
+    args = parser.parse_args()
+
+    connection = MySQLdb.connect(host=args.host, user=args.user, passwd=args.password, db=args.db,
+                                 charset='utf8mb4', use_unicode=True)
+
+    def show(progress):
+        print(f"\r{progress['rows_read']} read, {progress['imported']} imported, {progress['skipped']} duplicate, "
+              f"{progress['failed']} failed ({progress['rows_per_second']} rows/s)", end='', file=sys.stderr)
+
+    importer = BookImporter(connection, batch_size=args.batch_size, on_progress=show)
+    stream = sys.stdin.buffer if args.file == '-' else open(args.file, 'rb')
+    try:
+        with open(args.errors, 'w', newline='', encoding='utf-8') as error_file:
+            progress = importer.run(stream, args.format or detect_format(args.file), error_file)
+    finally:
+        stream.close()
+        connection.close()
+    print(file=sys.stderr)
+    if progress['error']:
+        print(f"Stopped early: {progress['error']}", file=sys.stderr)
+    if progress['skipped'] or progress['failed']:
+        print(f"Rejected rows written to {args.errors}", file=sys.stderr)
+    print("The running app picks up imported books within 10 minutes (or restart it).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
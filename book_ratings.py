@@ -0,0 +1,209 @@
+import heapq
+import threading
+import time
+
+import MySQLdb.cursors
+
+RATING_COLUMNS = ['rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+# One row per reviewed book, kept in step with `reviews` by update_summary
+SUMMARY_TABLE = """
+    CREATE TABLE IF NOT EXISTS `book_rating` (
+      `book_id` int(10) UNSIGNED NOT NULL,
+      `review_count` int(11) NOT NULL DEFAULT 0,
+      `rating_sum` int(11) NOT NULL DEFAULT 0,
+      `rating_1` int(11) NOT NULL DEFAULT 0,
+      `rating_2` int(11) NOT NULL DEFAULT 0,
+      `rating_3` int(11) NOT NULL DEFAULT 0,
+      `rating_4` int(11) NOT NULL DEFAULT 0,
+      `rating_5` int(11) NOT NULL DEFAULT 0,
+      PRIMARY KEY (`book_id`),
+      CONSTRAINT `book_rating_ibfk_1` FOREIGN KEY (`book_id`) REFERENCES `book` (`bookid`) ON DELETE CASCADE ON UPDATE CASCADE
+    ) ENGINE=InnoDB
+"""
+
+BACKFILL = """
+    INSERT INTO book_rating (book_id, review_count, rating_sum, rating_1, rating_2, rating_3, rating_4, rating_5)
+    SELECT book_id, COUNT(*), SUM(rating),
+           SUM(rating = 1), SUM(rating = 2), SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+    FROM reviews
+    GROUP BY book_id
+"""
+
+UPSERT = """
+    INSERT INTO book_rating (book_id, review_count, rating_sum, rating_1, rating_2, rating_3, rating_4, rating_5)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        review_count = review_count + VALUES(review_count),
+        rating_sum = rating_sum + VALUES(rating_sum),
+        rating_1 = rating_1 + VALUES(rating_1),
+        rating_2 = rating_2 + VALUES(rating_2),
+        rating_3 = rating_3 + VALUES(rating_3),
+        rating_4 = rating_4 + VALUES(rating_4),
+        rating_5 = rating_5 + VALUES(rating_5)
+"""
+
+# Leaderboard ranks by a Bayesian average: every book starts with this many
+# reviews at the library-wide mean, so one 5-star review does not top the list
+PRIOR_REVIEWS = 5
+
+
+def _delta(old_rating, new_rating):
+    # [review_count, rating_sum, rating_1 .. rating_5] change for one review
+    delta = [0] * 7
+    for rating, sign in ((old_rating, -1), (new_rating, 1)):
+        if rating:
+            delta[0] += sign
+            delta[1] += sign * rating
+            delta[1 + rating] += sign
+    return delta
+
+
+def update_summary(cursor, book_id, old_rating=None, new_rating=None):
+    """
+    Applies one review change to book_rating on the caller's cursor, so it
+    commits or rolls back together with the review itself.
+    Args:
+        cursor: Cursor inside the review's transaction
+        book_id (int): Reviewed book
+        old_rating (int): Rating before the change, or None for a new review
+        new_rating (int): Rating after the change, or None if it was deleted
+    """
+    cursor.execute(UPSERT, [book_id] + _delta(old_rating, new_rating))
+
+
+def remove_user_reviews(cursor, user_id):
+    """
+    Takes a user's reviews out of book_rating on the caller's cursor, before
+    the user is deleted (their reviews go with them, ON DELETE CASCADE).
+    Args:
+        cursor: DictCursor inside the transaction that deletes the user
+        user_id (int): User about to be deleted
+    Returns:
+        list: (book_id, rating) of each removed review, for rating_changed
+            once the transaction has committed
+    """
+    cursor.execute("SELECT book_id, rating FROM reviews WHERE user_id = %s FOR UPDATE", (user_id,))
+    reviews = [(row['book_id'], row['rating']) for row in cursor.fetchall()]
+    for book_id, rating in reviews:
+        update_summary(cursor, book_id, rating, None)
+    return reviews
+
+
+def summary_dict(book_id, summary):
+    count, total = summary[0], summary[1]
+    return {
+        'book_id': book_id,
+        'review_count': count,
+        'average': round(total / count, 2) if count else None,
+        'histogram': {str(stars): summary[1 + stars] for stars in range(1, 6)}
+    }
+
+
+class RatingStore:
+    """
+    In-memory copy of book_rating for reads (per-book stats, leaderboard,
+    chatbot answers) that cost no queries. Write routes update the table
+    with update_summary and then this copy with rating_changed; the copy is
+    reloaded every max_age seconds to pick up writes made outside the app.
+    """
+
+    def __init__(self, max_age=600):
+        self.max_age = max_age
+        self.loaded_at = None
+        self._changes = 0
+        self._summaries = {}  # book_id -> [review_count, rating_sum, rating_1 .. rating_5]
+        self._leaderboard = {}  # (limit, min_reviews) -> books, until the next change
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self, mysql):
+        if self.loaded_at is None or time.time() - self.loaded_at > self.max_age:
+            self.load(mysql)
+
+    def load(self, mysql):
+        changes = self._changes
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            cursor.execute("SHOW TABLES LIKE 'book_rating'")
+            if not cursor.fetchone():
+                # First run against a database created before book_rating existed
+                cursor.execute(SUMMARY_TABLE)
+                cursor.execute(BACKFILL)
+                mysql.connection.commit()
+            cursor.execute("SELECT book_id, review_count, rating_sum, " + ", ".join(RATING_COLUMNS) +
+                           " FROM book_rating WHERE review_count > 0")
+            summaries = {
+                int(row['book_id']): [int(row['review_count']), int(row['rating_sum'])] +
+                                     [int(row[column]) for column in RATING_COLUMNS]
+                for row in cursor.fetchall()
+            }
+        finally:
+            cursor.close()
+        with self._lock:
+            if self.loaded_at is not None and self._changes != changes:
+                # A review landed while reading and is already applied here;
+                # keep the current copy and try again after max_age
+                self.loaded_at = time.time()
+                return
+            self._summaries = summaries
+            self._leaderboard = {}
+            self.loaded_at = time.time()
+
+    def rating_changed(self, book_id, old_rating=None, new_rating=None):
+        """
+        Mirrors an update_summary call once its transaction has committed.
+        """
+        if self.loaded_at is None:
+            return
+        delta = _delta(old_rating, new_rating)
+        with self._lock:
+            summary = self._summaries.setdefault(int(book_id), [0] * 7)
+            for i, amount in enumerate(delta):
+                summary[i] += amount
+            if summary[0] <= 0:
+                del self._summaries[int(book_id)]
+            self._changes += 1
+            self._leaderboard = {}
+
+    def remove_book(self, book_id):
+        with self._lock:
+            if self._summaries.pop(int(book_id), None) is not None:
+                self._changes += 1
+                self._leaderboard = {}
+
+    def get(self, book_id):
+        """
+        Returns:
+            dict: review_count, average and histogram; zero reviews if the book has none
+        """
+        with self._lock:
+            summary = list(self._summaries.get(int(book_id), [0] * 7))
+        return summary_dict(int(book_id), summary)
+
+    def top_rated(self, limit=10, min_reviews=1):
+        """
+        Returns:
+            list: Summaries of the best-rated books, each with its ranking score
+        """
+        with self._lock:
+            if (limit, min_reviews) in self._leaderboard:
+                return self._leaderboard[(limit, min_reviews)]
+            total_reviews = sum(summary[0] for summary in self._summaries.values())
+            total_rating = sum(summary[1] for summary in self._summaries.values())
+            mean = total_rating / total_reviews if total_reviews else 0
+            prior = PRIOR_REVIEWS * mean
+
+            def score(item):
+                return (item[1][1] + prior) / (item[1][0] + PRIOR_REVIEWS)
+
+            eligible = [item for item in self._summaries.items() if item[1][0] >= min_reviews]
+            best = heapq.nlargest(limit, eligible, key=lambda item: (score(item), item[1][0]))
+            books = []
+            for book_id, summary in best:
+                book = summary_dict(book_id, summary)
+                book['score'] = round(score((book_id, summary)), 3)
+                books.append(book)
+            if len(self._leaderboard) >= 64:
+                self._leaderboard = {}
+            self._leaderboard[(limit, min_reviews)] = books  # Cleared by the next change
+            return books
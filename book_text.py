@@ -0,0 +1,412 @@
+"""
+Full-text search inside the books' PDFs. A background thread extracts
+text page by page into a local SQLite table (cache/book_text.sqlite),
+indexed by book and page and full-text indexed with FTS5, so searches
+return the books and pages a passage appears on. Indexing resumes where
+it stopped after a restart, and a book is only re-read when its PDF
+changes. Uploads just queue the book; nothing here runs on the request.
+
+    python book_text.py search "photosynthesis"
+"""
+import argparse
+import importlib.util
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from file_delivery import book_file_path
+
+INDEX_PATH = os.path.join('cache', 'book_text.sqlite')
+
+# Pages written per SQLite transaction; also how much work a restart can lose
+PAGES_PER_COMMIT = 20
+
+# Longest text kept per page, so a malformed PDF cannot bloat the index
+MAX_PAGE_CHARS = 20000
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS documents (
+        bookid INTEGER PRIMARY KEY,
+        pdf_path TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        pages INTEGER,
+        next_page INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL,
+        error TEXT,
+        updated_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS page_text (
+        id INTEGER PRIMARY KEY,
+        bookid INTEGER NOT NULL,
+        page INTEGER NOT NULL,
+        text TEXT NOT NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS page_text_book ON page_text (bookid, page);
+    -- Full-text index over page_text (external content: the text is stored once)
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+        text, content = 'page_text', content_rowid = 'id',
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS page_text_insert AFTER INSERT ON page_text BEGIN
+        INSERT INTO pages (rowid, text) VALUES (new.id, new.text);
+    END;
+    CREATE TRIGGER IF NOT EXISTS page_text_delete AFTER DELETE ON page_text BEGIN
+        INSERT INTO pages (pages, rowid, text) VALUES ('delete', old.id, old.text);
+    END;
+"""
+
+# Bumped when SCHEMA changes incompatibly; older index files are rebuilt from the PDFs
+SCHEMA_VERSION = 2
+
+# Version 1 kept bookid and page in the FTS table itself, where they cannot be indexed
+DROP_OLD_SCHEMA = """
+    DROP TABLE IF EXISTS pages;
+    DROP TABLE IF EXISTS documents;
+"""
+
+# Snippet highlight markers, replaced after HTML-escaping the snippet
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+
+def fingerprint(pdf_path, path):
+    """
+    Returns:
+        str: Changes whenever the book's PDF does
+    """
+    stat = os.stat(path)
+    return f"{pdf_path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def fts_query(text, match_all=True):
+    """
+    Turns free text into an FTS5 query: every word quoted (so no word is
+    read as an operator), all required or any one.
+    """
+    words = re.findall(r'\w+', text.lower())
+    return (' ' if match_all else ' OR ').join(f'"{word}"' for word in words)
+
+
+def extract_pages(path, start=0):
+    """
+    Returns:
+        tuple: (number of pages, iterator of (page index, text) from start on)
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+
+    def pages():
+        for index in range(start, len(reader.pages)):
+            try:
+                text = reader.pages[index].extract_text() or ''
+            except Exception as e:
+                # One unreadable page should not lose the rest of the book
+                logging.warning(f"Could not read page {index + 1} of {path}: {str(e)}")
+                text = ''
+            yield index, ' '.join(text.split())[:MAX_PAGE_CHARS]
+
+    return len(reader.pages), pages()
+
+
+class BookTextIndex:
+    """
+    Page-level full-text index of the book PDFs. The indexing thread is the
+    only writer; searches open their own read connection per thread.
+    """
+
+    def __init__(self, path=INDEX_PATH, on_indexed=None):
+        """
+        Args:
+            path (str): SQLite file
+            on_indexed (callable): Called with (mysql, bookid) after every book
+                the indexer processes, e.g. to re-embed it with its text
+        """
+        self.path = path
+        self.on_indexed = on_indexed
+        self.running = False  # Set by start_indexer
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+        self._current = None
+        self._schema_ready = False
+        self.error = None
+
+    def is_available(self):
+        return importlib.util.find_spec('pypdf') is not None
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            if not self._schema_ready:
+                connection.execute('PRAGMA journal_mode = WAL')  # Searches are not blocked by the writer
+                if connection.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                    connection.executescript(DROP_OLD_SCHEMA)
+                    connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                connection.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.connection = connection
+        return connection
+
+    # Queue
+
+    def enqueue(self, bookid):
+        """
+        Queues a book to be (re)indexed, or dropped from the index if it was
+        deleted or lost its PDF. Returns at once.
+        """
+        bookid = int(bookid)
+        with self._queued_lock:
+            if bookid in self._queued:
+                return
+            self._queued.add(bookid)
+        self._queue.put(bookid)
+
+    def _next(self, timeout):
+        try:
+            bookid = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._queued_lock:
+            self._queued.discard(bookid)
+        return bookid
+
+    def sync(self, mysql):
+        """
+        Queues every book whose PDF is new, changed, unfinished or gone.
+        """
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute("SELECT bookid, pdf_path FROM book")
+            books = {int(bookid): (pdf_path or '').strip() for bookid, pdf_path in cursor.fetchall()}
+        finally:
+            cursor.close()
+        mysql.release()  # Checking files and indexing need no database connection
+
+        documents = {row['bookid']: row for row in self._connection().execute(
+            "SELECT bookid, pdf_path, fingerprint, status FROM documents")}
+        for bookid in documents.keys() - books.keys():
+            self.enqueue(bookid)
+        for bookid, pdf_path in books.items():
+            document = documents.get(bookid)
+            if not pdf_path:
+                if document:
+                    self.enqueue(bookid)
+                continue
+            path = book_file_path(pdf_path)
+            if path is None or not os.path.isfile(path):
+                continue
+            if (document is None or document['status'] == 'indexing'
+                    or document['fingerprint'] != fingerprint(pdf_path, path)):
+                self.enqueue(bookid)
+
+    # Indexing
+
+    def index_book(self, mysql, bookid):
+        cursor = mysql.connection.cursor()
+        try:
+            cursor.execute("SELECT pdf_path FROM book WHERE bookid = %s", (bookid,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        mysql.release()  # Extraction can take a while
+
+        pdf_path = (row[0] or '').strip() if row else ''
+        path = book_file_path(pdf_path) if pdf_path else None
+        if path is None or not os.path.isfile(path):
+            self._delete(bookid)
+            self._indexed(mysql, bookid)
+            return
+
+        db = self._connection()
+        current = fingerprint(pdf_path, path)
+        document = db.execute("SELECT fingerprint, next_page, status FROM documents WHERE bookid = ?",
+                              (bookid,)).fetchone()
+        if document and document['fingerprint'] == current and document['status'] in ('done', 'failed'):
+            self._indexed(mysql, bookid)  # Same file; the book's other details may have changed
+            return
+        if document and document['fingerprint'] == current:
+            start = document['next_page']  # Resume an interrupted book
+        else:
+            with db:
+                db.execute("DELETE FROM page_text WHERE bookid = ?", (bookid,))
+                db.execute("""
+                    INSERT OR REPLACE INTO documents (bookid, pdf_path, fingerprint, next_page, status, updated_at)
+                    VALUES (?, ?, ?, 0, 'indexing', ?)
+                """, (bookid, pdf_path, current, time.time()))
+            start = 0
+
+        self._current = bookid
+        try:
+            total, pages = extract_pages(path, start)
+            batch = []
+            for index, text in pages:
+                if text:
+                    batch.append((text, bookid, index + 1))
+                if (index + 1 - start) % PAGES_PER_COMMIT == 0:
+                    self._write_pages(db, bookid, batch, index + 1)
+                    batch = []
+            with db:
+                db.executemany("INSERT INTO page_text (text, bookid, page) VALUES (?, ?, ?)", batch)
+                db.execute("""
+                    UPDATE documents SET pages = ?, next_page = ?, status = 'done', error = NULL, updated_at = ?
+                    WHERE bookid = ?
+                """, (total, total, time.time(), bookid))
+        except Exception as e:
+            # Not a readable PDF: remembered so it is not retried until the file changes
+            with db:
+                db.execute("UPDATE documents SET status = 'failed', error = ?, updated_at = ? WHERE bookid = ?",
+                           (str(e)[:500], time.time(), bookid))
+            logging.warning(f"Could not extract text from book {bookid}: {str(e)}")
+        finally:
+            self._current = None
+        self._indexed(mysql, bookid)
+
+    def _write_pages(self, db, bookid, batch, next_page):
+        with db:
+            db.executemany("INSERT INTO page_text (text, bookid, page) VALUES (?, ?, ?)", batch)
+            db.execute("UPDATE documents SET next_page = ?, updated_at = ? WHERE bookid = ?",
+                       (next_page, time.time(), bookid))
+
+    def _delete(self, bookid):
+        db = self._connection()
+        with db:
+            db.execute("DELETE FROM page_text WHERE bookid = ?", (bookid,))
+            deleted = db.execute("DELETE FROM documents WHERE bookid = ?", (bookid,)).rowcount
+        return deleted > 0
+
+    def _indexed(self, mysql, bookid):
+        if self.on_indexed:
+            try:
+                self.on_indexed(mysql, bookid)
+            except Exception as e:
+                logging.error(f"Follow-up after indexing book {bookid} failed: {str(e)}")
+
+    def run(self, app, mysql, interval=600):
+        """
+        Indexing loop: works through queued books and syncs with the
+        catalog every interval seconds (and once at start).
+        """
+        next_sync = 0
+        while True:
+            bookid = self._next(max(0, next_sync - time.monotonic()))
+            try:
+                with app.app_context():
+                    if bookid is not None:
+                        self.index_book(mysql, bookid)
+                    else:
+                        self.sync(mysql)
+                        next_sync = time.monotonic() + interval
+                self.error = None
+            except Exception as e:
+                self.error = str(e)
+                logging.error(f"Book text indexing failed: {str(e)}")
+                if bookid is None:
+                    next_sync = time.monotonic() + interval
+
+    # Queries
+
+    def search(self, query, limit=20, pages_per_book=3):
+        """
+        Books whose text matches the query, best first, with the best
+        matching pages of each. Falls back to matching any word when no
+        page contains them all.
+        Returns:
+            list: dicts with bookid, score and pages (page, snippet) where
+                the snippet marks matches with MARK_START / MARK_END
+        """
+        db = self._connection()
+        rows = []
+        for match_all in (True, False):
+            expression = fts_query(query, match_all)
+            if not expression:
+                return []
+            rows = db.execute("""
+                SELECT page_text.bookid, page_text.page, bm25(pages) AS score,
+                       snippet(pages, 0, ?, ?, '…', 16) AS snippet
+                FROM pages JOIN page_text ON page_text.id = pages.rowid
+                WHERE pages MATCH ?
+                ORDER BY score LIMIT ?
+            """, (MARK_START, MARK_END, expression, limit * pages_per_book * 4)).fetchall()
+            if rows:
+                break
+
+        books = {}
+        for row in rows:
+            book = books.setdefault(row['bookid'], {'bookid': row['bookid'], 'score': 0.0, 'pages': []})
+            if len(book['pages']) < pages_per_book:
+                book['pages'].append({'page': row['page'], 'snippet': row['snippet']})
+                book['score'] += -row['score']  # bm25() is lower for better matches
+        ranked = sorted(books.values(), key=lambda book: book['score'], reverse=True)[:limit]
+        for book in ranked:
+            book['score'] = round(book['score'], 4)
+        return ranked
+
+    def excerpt(self, bookid, chars=1000):
+        """
+        Returns:
+            str: Start of an indexed book's text (for the semantic index)
+        """
+        rows = self._connection().execute(
+            "SELECT text FROM page_text WHERE bookid = ? ORDER BY page LIMIT 5", (int(bookid),)).fetchall()
+        return ' '.join(row['text'] for row in rows)[:chars]
+
+    def status(self):
+        counts = {row['status']: row['books'] for row in self._connection().execute(
+            "SELECT status, COUNT(*) AS books FROM documents GROUP BY status")}
+        return {
+            'available': self.is_available(),
+            'books': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'queued': self._queue.qsize(),
+            'indexing': self._current,
+            'error': self.error
+        }
+
+
+def start_indexer(app, mysql, index, interval=600):
+    """
+    Starts index.run on a daemon thread, if pypdf is installed.
+    """
+    # Spawned inference workers re-import the app; only the web process indexes
+    if multiprocessing.parent_process() is not None or not index.is_available():
+        return
+    index.running = True
+    threading.Thread(target=index.run, args=(app, mysql, interval), name="book-text-index", daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the text of the indexed book PDFs")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    search = subparsers.add_parser('search', help="Books and pages matching a query")
+    search.add_argument('query')
+    search.add_argument('--limit', type=int, default=10)
+    subparsers.add_parser('status', help="How many books are indexed")
+    args = parser.parse_args()
+
+    index = BookTextIndex()
+    if args.command == 'status':
+        print(index.status())
+        return
+    started = time.perf_counter()
+    results = index.search(args.query, limit=args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    for book in results:
+        pages = ', '.join(str(page['page']) for page in book['pages'])
+        print(f"Book {book['bookid']} (score {book['score']}): pages {pages}")
+        for page in book['pages']:
+            print(f"  p.{page['page']}: {page['snippet'].replace(MARK_START, '[').replace(MARK_END, ']')}")
+    print(f"{len(results)} books in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
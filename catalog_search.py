@@ -0,0 +1,258 @@
+import bisect
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+import MySQLdb.cursors
+
+# Relative weight of a match in each indexed field
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'author': 2.0,
+    'category': 1.5,
+    'publisher': 1.0,
+    'isbn': 3.0
+}
+
+# Document columns loaded for every book, shared by /search and the chatbot
+CATALOG_QUERY = """
+    SELECT b.bookid, b.name, b.isbn, b.no_of_copy, b.status, b.pdf_path, b.picture,
+           a.name AS author_name, c.name AS genre_name, p.name AS publisher_name
+    FROM book b
+    LEFT JOIN author a ON b.authorid = a.authorid
+    LEFT JOIN category c ON b.categoryid = c.categoryid
+    LEFT JOIN publisher p ON b.publisherid = p.publisherid
+"""
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Weight of a prefix or fuzzy expansion relative to an exact term match
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.7
+FUZZY_MIN_SIMILARITY = 0.35
+MAX_EXPANSIONS = 20
+
+
+def tokenize(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def trigrams(term):
+    padded = f"$${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CatalogSearchIndex:
+    """
+    In-memory inverted index over book title, author, category, publisher
+    and ISBN with BM25F ranking, prefix matching and trigram typo tolerance.
+    Loaded from MySQL on first use, then kept current by refresh_book()
+    and remove_book() as the catalog changes.
+    """
+
+    def __init__(self, max_age=600):
+        """
+        Args:
+            max_age (int): Seconds before a full reload, which also picks up
+                changes made outside this process
+        """
+        self.max_age = max_age
+        self.loaded_at = None
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.docs = {}
+        self._doc_terms = {}
+        self._field_lengths = {}
+        self._total_field_lengths = defaultdict(int)
+        self._postings = defaultdict(dict)
+        self._sorted_terms = []
+        self._trigrams = defaultdict(set)
+
+    # Loading and incremental updates
+
+    def ensure_loaded(self, mysql):
+        if self.loaded_at is None or time.time() - self.loaded_at > self.max_age:
+            self.load(mysql)
+
+    def load(self, mysql):
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            cursor.execute(CATALOG_QUERY)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row, keep_sorted=False)
+            self._sorted_terms = sorted(self._postings)
+            self.loaded_at = time.time()
+
+    def mark_stale(self):
+        """Forces a full reload on the next search (e.g. after an author rename)."""
+        self.loaded_at = None
+
+    def refresh_book(self, mysql, bookid):
+        """
+        Re-reads one book after it was added or edited.
+        """
+        if self.loaded_at is None:
+            return  # Nothing loaded yet; the first search loads everything
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            cursor.execute(CATALOG_QUERY + " WHERE b.bookid = %s", (bookid,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        with self._lock:
+            self._remove(int(bookid))
+            if row:
+                self._add(row)
+
+    def remove_book(self, bookid):
+        with self._lock:
+            self._remove(int(bookid))
+
+    def _field_terms(self, row):
+        isbn = (row.get('isbn') or '').replace('-', '').replace(' ', '').lower()
+        return {
+            'name': tokenize(row.get('name')),
+            'author': tokenize(row.get('author_name')),
+            'category': tokenize(row.get('genre_name')),
+            'publisher': tokenize(row.get('publisher_name')),
+            'isbn': [isbn] if isbn else []
+        }
+
+    def _add(self, row, keep_sorted=True):
+        bookid = int(row['bookid'])
+        fields = self._field_terms(row)
+        self.docs[bookid] = dict(row)
+        self._doc_terms[bookid] = fields
+        self._field_lengths[bookid] = {field: len(terms) for field, terms in fields.items()}
+        for field, terms in fields.items():
+            self._total_field_lengths[field] += len(terms)
+            for term in terms:
+                if term not in self._postings:
+                    if keep_sorted:
+                        bisect.insort(self._sorted_terms, term)
+                    if not term.isdigit():  # ISBNs only match exactly or by prefix
+                        for gram in trigrams(term):
+                            self._trigrams[gram].add(term)
+                field_counts = self._postings[term].setdefault(bookid, {})
+                field_counts[field] = field_counts.get(field, 0) + 1
+
+    def _remove(self, bookid):
+        fields = self._doc_terms.pop(bookid, None)
+        if fields is None:
+            return
+        self.docs.pop(bookid, None)
+        self._field_lengths.pop(bookid, None)
+        for field, terms in fields.items():
+            self._total_field_lengths[field] -= len(terms)
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(bookid, None)
+                if not postings:
+                    del self._postings[term]
+                    position = bisect.bisect_left(self._sorted_terms, term)
+                    if position < len(self._sorted_terms) and self._sorted_terms[position] == term:
+                        del self._sorted_terms[position]
+                    for gram in trigrams(term):
+                        self._trigrams[gram].discard(term)
+
+    # Querying
+
+    def _expansions(self, token, allow_prefix):
+        """
+        Returns:
+            dict: Indexed term to match weight for one query token
+        """
+        expansions = {}
+        if token in self._postings:
+            expansions[token] = 1.0
+        if allow_prefix and len(token) >= 2:
+            position = bisect.bisect_left(self._sorted_terms, token)
+            while (position < len(self._sorted_terms)
+                   and self._sorted_terms[position].startswith(token)
+                   and len(expansions) < MAX_EXPANSIONS):
+                expansions.setdefault(self._sorted_terms[position], PREFIX_WEIGHT)
+                position += 1
+        if not expansions and len(token) >= 3:
+            query_grams = trigrams(token)
+            shared = defaultdict(int)
+            for gram in query_grams:
+                for term in self._trigrams.get(gram, ()):
+                    shared[term] += 1
+            for term, count in shared.items():
+                similarity = count / (len(query_grams) + len(trigrams(term)) - count)
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    expansions[term] = FUZZY_WEIGHT * similarity
+            if len(expansions) > MAX_EXPANSIONS:
+                best = sorted(expansions.items(), key=lambda item: -item[1])[:MAX_EXPANSIONS]
+                expansions = dict(best)
+        return expansions
+
+    def _term_score(self, term, bookid, field_counts, fields):
+        # BM25F: length-normalised, weighted term frequency across the fields
+        document_count = len(self._doc_terms)
+        weighted_tf = 0.0
+        for field in fields:
+            tf = field_counts.get(field)
+            if not tf:
+                continue
+            average_length = self._total_field_lengths[field] / document_count or 1
+            length = self._field_lengths[bookid][field]
+            weighted_tf += FIELD_WEIGHTS[field] * tf / (1 - B + B * length / average_length)
+        if weighted_tf == 0:
+            return 0.0
+        df = len(self._postings[term])
+        idf = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+        return idf * weighted_tf * (K1 + 1) / (weighted_tf + K1)
+
+    def search(self, query, fields=None, limit=20, require_all=True):
+        """
+        Args:
+            query (str): Free-text query
+            fields (list): Fields to match in (all fields by default)
+            limit (int): Maximum number of results
+            require_all (bool): Every query word must match (exactly, by
+                prefix or fuzzily)
+        Returns:
+            list: Book rows (dicts) with a 'score' key, best first
+        """
+        fields = fields or list(FIELD_WEIGHTS)
+        # ISBNs are indexed without hyphens
+        tokens = tokenize(re.sub(r'(?<=\d)-(?=\d)', '', query or ''))
+        if not tokens:
+            return []
+
+        with self._lock:
+            scores = defaultdict(float)
+            matched_tokens = defaultdict(int)
+            for position, token in enumerate(tokens):
+                # The last word may still be being typed, so it also matches as a prefix
+                expansions = self._expansions(token, allow_prefix=position == len(tokens) - 1)
+                best_for_token = {}
+                for term, weight in expansions.items():
+                    for bookid, field_counts in self._postings[term].items():
+                        score = weight * self._term_score(term, bookid, field_counts, fields)
+                        if score > best_for_token.get(bookid, 0):
+                            best_for_token[bookid] = score
+                for bookid, score in best_for_token.items():
+                    scores[bookid] += score
+                    matched_tokens[bookid] += 1
+
+            if require_all:
+                candidates = [bookid for bookid in scores if matched_tokens[bookid] == len(tokens)]
+            else:
+                candidates = list(scores)
+            ranked = sorted(candidates, key=lambda bookid: -scores[bookid])[:limit]
+            return [dict(self.docs[bookid], score=round(scores[bookid], 4)) for bookid in ranked]
@@ -0,0 +1,181 @@
+"""
+Cover thumbnails for the catalog pages. /covers/<picture>?w=<width> serves
+book.picture scaled down to one of a few width buckets, as WebP when the
+browser accepts it and JPEG otherwise. Each variant is rendered once and
+kept in cache/thumbnails, which is trimmed least recently used first when
+it grows past its size limit.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+from file_delivery import book_file_path
+
+IMAGES_DIR = os.path.join('static', 'images')
+DEFAULT_COVER = 'book.jpg'  # In static/images, used when a book has no picture
+CACHE_DIR = os.path.join('cache', 'thumbnails')
+
+# Requested widths are rounded up to one of these, so few variants exist per cover
+WIDTHS = (64, 128, 256, 512)
+
+# Pillow format, file extension, mimetype and save options per output format
+FORMATS = {
+    'webp': ('WEBP', '.webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', '.jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+
+GENERATION_LOCKS = 64
+
+
+def width_bucket(width):
+    """
+    Returns:
+        int: Smallest bucket at least width wide (the largest for anything wider)
+    """
+    for bucket in WIDTHS:
+        if width <= bucket:
+            return bucket
+    return WIDTHS[-1]
+
+
+def cover_source(picture):
+    """
+    Returns:
+        str: File for a book.picture value: under static/books (uploads), else
+            static/images (covers the templates used to point at), else the
+            default cover
+    """
+    picture = (picture or '').strip()
+    if picture:
+        path = book_file_path(picture)
+        if path and os.path.isfile(path):
+            return path
+        root = os.path.abspath(IMAGES_DIR)
+        path = os.path.abspath(os.path.join(root, picture.replace('\\', '/')))
+        if os.path.commonpath([root, path]) == root and os.path.isfile(path):
+            return path
+    return os.path.abspath(os.path.join(IMAGES_DIR, DEFAULT_COVER))
+
+
+class CoverThumbnails:
+    """
+    Disk cache of resized covers. Which variants exist, and in what order
+    they were last used, is kept in memory (rebuilt from the directory on
+    first use) so the size limit is enforced without scanning the disk.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = None  # variant file name -> size, least recently used first
+        self._total = 0
+        self._lock = threading.Lock()
+        # Concurrent requests for the same variant render it once
+        self._generation_locks = [threading.Lock() for _ in range(GENERATION_LOCKS)]
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name[:2], name)
+
+    def _ensure_loaded(self):
+        # Called with self._lock held
+        if self._entries is not None:
+            return
+        found = []
+        for directory, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                stat = os.stat(os.path.join(directory, filename))
+                found.append((stat.st_mtime, filename, stat.st_size))
+        found.sort()
+        self._entries = OrderedDict((filename, size) for _, filename, size in found)
+        self._total = sum(self._entries.values())
+
+    def variant(self, source, width, fmt):
+        """
+        Returns the cached variant of a cover, rendering it on first use.
+        Args:
+            source (str): Original image, from cover_source
+            width (int): A WIDTHS bucket
+            fmt (str): Key of FORMATS
+        Returns:
+            str: Path of the variant
+        Raises:
+            OSError: The source is missing or is not an image Pillow can read
+        """
+        stat = os.stat(source)
+        # A replaced source gets new variants; the old ones age out of the cache
+        digest = hashlib.sha1(f"{source}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+        name = f"{digest}-{width}{FORMATS[fmt][1]}"
+        path = self._path(name)
+
+        with self._lock:
+            self._ensure_loaded()
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                hit = True
+            else:
+                hit = False
+        if hit:
+            try:
+                os.utime(path)  # Keeps the use order across restarts
+                return path
+            except FileNotFoundError:
+                pass  # Removed behind our back: render it again
+
+        with self._generation_locks[int(digest[:8], 16) % GENERATION_LOCKS]:
+            if not os.path.exists(path):
+                self._render(source, width, fmt, path)
+                with self._lock:
+                    self.misses += 1
+            size = os.path.getsize(path)
+        with self._lock:
+            self._total += size - self._entries.get(name, 0)
+            self._entries[name] = size
+            self._evict(keep=name)
+        return path
+
+    def _render(self, source, width, fmt, path):
+        pillow_format, _, _, options = FORMATS[fmt]
+        with Image.open(source) as image:
+            # JPEGs decode straight at a reduced scale, far faster than full size
+            image.draft('RGB', (width * 2, width * 4))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, width * 4), Image.LANCZOS)
+            if pillow_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f"{path}.{threading.get_ident()}.tmp"
+            image.save(partial, pillow_format, **options)
+        os.replace(partial, path)
+
+    def _evict(self, keep):
+        # Called with self._lock held
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                break
+            del self._entries[name]
+            self._total -= size
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'variants': len(self._entries or ()),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,201 @@
+import logging
+import multiprocessing
+import threading
+import time
+from collections import Counter
+
+import MySQLdb.cursors
+
+
+class DashboardCounters:
+    """
+    Dashboard totals (books, available, issued, returned) kept in memory and
+    updated by the routes that change books or issues, so reading them costs
+    no queries. reconcile() recounts from the database to catch drift from
+    writes made outside the app.
+    """
+
+    def __init__(self):
+        self.loaded_at = None
+        self.version = 0
+        self._book_ids = set()
+        self._issues_per_book = Counter()  # Active 'issued' rows per book
+        self._status_counts = Counter()
+        self._issued_titles = 0  # Existing books with at least one active issue
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # Requests wait here for the first load
+
+    def add_listener(self, listener):
+        """
+        Calls listener(stats) after every change, in the order changes happen.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self):
+        # Called with the lock held so listeners never see stats out of order
+        stats = self._stats()
+        for listener in self._listeners:
+            listener(stats)
+
+    # Loading and reconciliation
+
+    def _count(self, mysql):
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            cursor.execute("SELECT bookid FROM book")
+            book_ids = {int(row['bookid']) for row in cursor.fetchall()}
+            cursor.execute("SELECT bookid, status, COUNT(*) AS issues FROM issued_book GROUP BY bookid, status")
+            issues_per_book = Counter()
+            status_counts = Counter()
+            for row in cursor.fetchall():
+                status = (row['status'] or '').lower()
+                status_counts[status] += row['issues']
+                if status == 'issued':
+                    issues_per_book[int(row['bookid'])] += row['issues']
+        finally:
+            cursor.close()
+        return book_ids, issues_per_book, status_counts
+
+    def ensure_loaded(self, mysql, attempts=3):
+        """
+        Blocks until the counters have been loaded once, so partial totals
+        are never served.
+        """
+        if self.loaded_at is not None:
+            return
+        with self._load_lock:
+            if self.loaded_at is None:
+                self.reconcile(mysql, attempts)
+
+    def reconcile(self, mysql, attempts=1):
+        """
+        Recounts everything from the database and replaces the counters.
+        Args:
+            attempts (int): Counts to try when writes keep landing meanwhile;
+                the first load uses the last one regardless
+        Returns:
+            dict: Stat name to (counted, stored) for every stat that had drifted
+        """
+        for attempt in range(1, attempts + 1):
+            version = self.version
+            book_ids, issues_per_book, status_counts = self._count(mysql)
+            with self._lock:
+                if self.version == version or (self.loaded_at is None and attempt == attempts):
+                    return self._replace(book_ids, issues_per_book, status_counts)
+        # A write landed while counting; its update is already applied
+        # to the counters, so try again on the next run
+        return {}
+
+    def _replace(self, book_ids, issues_per_book, status_counts):
+        # Called with the lock held
+        before = self._stats()
+        self._book_ids = book_ids
+        self._issues_per_book = issues_per_book
+        self._status_counts = status_counts
+        self._issued_titles = sum(1 for bookid in issues_per_book if bookid in book_ids)
+        after = self._stats()
+        first_load = self.loaded_at is None
+        self.loaded_at = time.time()
+        if before != after:
+            self.version += 1
+            self._notify()
+        drift = {name: (after[name], before[name]) for name in after if after[name] != before[name]}
+        if drift and not first_load:
+            logging.warning(f"Dashboard counters drifted, corrected: {drift}")
+        return drift
+
+    # Updates from the write routes (after their commit). Before the first
+    # load they only bump the version: the load counts them from the database
+
+    def book_added(self, bookid):
+        with self._lock:
+            if self.loaded_at is None:
+                self.version += 1
+                return
+            bookid = int(bookid)
+            if bookid not in self._book_ids:
+                self._book_ids.add(bookid)
+                if bookid in self._issues_per_book:
+                    self._issued_titles += 1
+            self.version += 1
+            self._notify()
+
+    def book_removed(self, bookid):
+        with self._lock:
+            if self.loaded_at is None:
+                self.version += 1
+                return
+            bookid = int(bookid)
+            if bookid in self._book_ids:
+                self._book_ids.discard(bookid)
+                if bookid in self._issues_per_book:
+                    self._issued_titles -= 1
+            self.version += 1
+            self._notify()
+
+    def issue_changed(self, old=None, new=None):
+        """
+        Args:
+            old (tuple): (bookid, status) of the issue before the write, or None
+            new (tuple): (bookid, status) after the write, or None if deleted
+        """
+        with self._lock:
+            if self.loaded_at is None:
+                self.version += 1
+                return
+            if old is not None:
+                self._apply(old, -1)
+            if new is not None:
+                self._apply(new, 1)
+            self.version += 1
+            self._notify()
+
+    def _apply(self, issue, amount):
+        bookid, status = issue
+        status = (status or '').lower()
+        self._status_counts[status] += amount
+        if status != 'issued':
+            return
+        bookid = int(bookid)
+        was_issued = bookid in self._issues_per_book
+        self._issues_per_book[bookid] += amount
+        if self._issues_per_book[bookid] <= 0:
+            del self._issues_per_book[bookid]
+        is_issued = bookid in self._issues_per_book
+        if bookid in self._book_ids and was_issued != is_issued:
+            self._issued_titles += 1 if is_issued else -1
+
+    # Reading
+
+    def _stats(self):
+        return {
+            'total_books': len(self._book_ids),
+            'available_books': len(self._book_ids) - self._issued_titles,
+            'issued_books': self._status_counts['issued'],
+            'returned_books': self._status_counts['returned']
+        }
+
+    def stats(self):
+        with self._lock:
+            return self._stats()
+
+
+def start_reconciler(app, mysql, counters, interval=300):
+    """
+    Runs counters.reconcile every interval seconds on a daemon thread.
+    """
+    # Spawned inference workers re-import the app; only the web process reconciles
+    if multiprocessing.parent_process() is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    counters.reconcile(mysql)
+            except Exception as e:
+                logging.error(f"Dashboard counter reconciliation failed: {str(e)}")
+
+    threading.Thread(target=run, name="dashboard-reconcile", daemon=True).start()
@@ -0,0 +1,65 @@
+import json
+import threading
+
+
+class StatsBroadcaster:
+    """
+    Single in-process source of dashboard stats. Publishing wakes every
+    waiting SSE stream and long-poll at once; nothing is published when the
+    stats did not change. Each waiting client holds a server thread, so at
+    most max_waiters may wait at a time (see try_hold).
+    """
+
+    def __init__(self, max_waiters=2):
+        self.version = 0
+        self.stats = None
+        self.max_waiters = max_waiters
+        self._condition = threading.Condition()
+        self._waiters = threading.BoundedSemaphore(max_waiters)
+
+    def try_hold(self):
+        """
+        Reserves a waiting slot for an SSE stream or long-poll.
+        Returns:
+            bool: False if max_waiters clients are already waiting
+        """
+        return self._waiters.acquire(blocking=False)
+
+    def release(self):
+        self._waiters.release()
+
+    def publish(self, stats):
+        with self._condition:
+            if stats == self.stats:
+                return
+            self.stats = dict(stats)
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait(self, since_version, timeout):
+        """
+        Blocks until the stats move past since_version or timeout passes.
+        Returns:
+            tuple: (version, stats) current when the wait ended
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != since_version, timeout)
+            return self.version, self.stats
+
+    def stream(self, heartbeat=15):
+        """
+        Yields server-sent events: the full stats first ('stats'), then only
+        the fields that changed ('delta'). Comments are sent while idle so
+        closed connections are noticed.
+        """
+        version, sent = self.wait(None, 0)
+        yield f"retry: 3000\nid: {version}\nevent: stats\ndata: {json.dumps(sent or {})}\n\n"
+        while True:
+            new_version, stats = self.wait(version, heartbeat)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+            delta = {name: value for name, value in stats.items() if (sent or {}).get(name) != value}
+            version, sent = new_version, stats
+            if delta:
+                yield f"id: {version}\nevent: delta\ndata: {json.dumps(delta)}\n\n"
@@ -0,0 +1,308 @@
+"""
+Pooled MySQL access for Flask. PooledMySQL is a drop-in replacement for
+flask_mysqldb.MySQL: `mysql.connection` still returns a connection for the
+current app context, but it is borrowed from a shared pool and handed back
+(with its cursors closed and any uncommitted work rolled back) when the
+context ends, instead of being opened and closed for every request.
+"""
+import collections
+import multiprocessing
+import threading
+import time
+
+import MySQLdb
+from MySQLdb import cursors
+from flask import g
+
+# Connection arguments taken from app.config, as flask_mysqldb reads them
+CONNECT_OPTIONS = {
+    'MYSQL_HOST': 'host',
+    'MYSQL_USER': 'user',
+    'MYSQL_PASSWORD': 'passwd',
+    'MYSQL_DB': 'db',
+    'MYSQL_PORT': 'port',
+    'MYSQL_UNIX_SOCKET': 'unix_socket',
+    'MYSQL_CONNECT_TIMEOUT': 'connect_timeout',
+    'MYSQL_READ_DEFAULT_FILE': 'read_default_file',
+    'MYSQL_USE_UNICODE': 'use_unicode',
+    'MYSQL_CHARSET': 'charset',
+    'MYSQL_SQL_MODE': 'sql_mode',
+    'MYSQL_AUTOCOMMIT': 'autocommit'
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time."""
+
+
+class PooledConnection:
+    """
+    Wraps a MySQLdb connection so every cursor opened on it is closed when
+    the connection goes back to the pool. Everything else is passed through.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self._cursors = []
+
+    def cursor(self, cursorclass=None):
+        cursor = self.raw.cursor(cursorclass)
+        self._cursors.append(cursor)
+        return cursor
+
+    def close_cursors(self):
+        for cursor in self._cursors:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections. Idle connections are reused most
+    recently used first; one that sat idle longer than pre_ping seconds is
+    pinged before use and replaced if the server dropped it.
+    """
+
+    def __init__(self, connect, size=10, timeout=5, pre_ping=30, recycle=3600):
+        """
+        Args:
+            connect (callable): Opens a new raw MySQLdb connection
+            size (int): Most connections open at once
+            timeout (float): Seconds a checkout waits for a free connection
+            pre_ping (float): Idle seconds after which a connection is pinged
+            recycle (float): Seconds after which a connection is replaced
+        """
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+
+        self._idle = []
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+
+        self.checkouts = 0
+        self.timeouts = 0
+        self.failed_pings = 0
+        self._latencies = collections.deque(maxlen=1000)
+
+    def checkout(self):
+        """
+        Returns:
+            PooledConnection: A live connection, for one caller at a time
+        Raises:
+            PoolTimeout: Every connection stayed busy for timeout seconds
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._condition:
+            if not self._idle and self._open >= self.size:
+                self._waiting += 1
+                try:
+                    while not self._idle and self._open >= self.size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                self._open += 1  # Reserve the slot, connect outside the lock
+            self._in_use += 1
+
+        try:
+            connection = self._validate(connection)
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self.checkouts += 1
+            self._latencies.append(time.monotonic() - started)
+        return connection
+
+    def _validate(self, connection):
+        now = time.monotonic()
+        if connection is not None and now - connection.created_at > self.recycle:
+            self._close(connection)
+            connection = None
+        if connection is not None and now - connection.last_used > self.pre_ping:
+            try:
+                connection.raw.ping()
+            except MySQLdb.Error:
+                self.failed_pings += 1
+                self._close(connection)
+                connection = None
+        if connection is None:
+            connection = PooledConnection(self.connect())
+        return connection
+
+    def checkin(self, connection):
+        """
+        Returns a connection, discarding it if it can no longer be used.
+        """
+        connection.close_cursors()
+        try:
+            connection.raw.rollback()  # End the transaction so the next user sees fresh data
+            reusable = True
+        except MySQLdb.Error:
+            reusable = False
+            self._close(connection)
+        with self._condition:
+            self._in_use -= 1
+            if reusable:
+                connection.last_used = time.monotonic()
+                self._idle.append(connection)
+            else:
+                self._open -= 1
+            self._condition.notify()
+
+    def discard(self, connection):
+        """
+        Closes a checked-out connection instead of returning it, e.g. one
+        left in the middle of an unbuffered result.
+        """
+        self._close(connection)
+        with self._condition:
+            self._in_use -= 1
+            self._open -= 1
+            self._condition.notify()
+
+    def _close(self, connection):
+        try:
+            connection.raw.close()
+        except Exception:
+            pass
+
+    def prefill(self, count):
+        """Opens up to count idle connections ahead of the first requests."""
+        opened = []
+        try:
+            for _ in range(min(count, self.size)):
+                opened.append(self.checkout())
+        finally:
+            for connection in opened:
+                self.checkin(connection)
+
+    def stats(self):
+        with self._condition:
+            latencies = sorted(self._latencies)
+            stats = {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'failed_pings': self.failed_pings
+            }
+        if latencies:
+            stats['checkout_ms'] = {
+                'p50': round(latencies[len(latencies) // 2] * 1000, 3),
+                'p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3)
+            }
+        return stats
+
+
+class PooledMySQL:
+    """
+    flask_mysqldb-compatible extension backed by a ConnectionPool. Pool
+    settings come from MYSQL_POOL_SIZE, MYSQL_POOL_TIMEOUT,
+    MYSQL_POOL_PRE_PING, MYSQL_POOL_RECYCLE and MYSQL_POOL_PREFILL.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.pool = None
+        self._prefill_count = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_CONNECT_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_USE_UNICODE', True)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8')
+        app.config.setdefault('MYSQL_CURSORCLASS', None)
+        app.config.setdefault('MYSQL_POOL_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_TIMEOUT', 5)
+        app.config.setdefault('MYSQL_POOL_PRE_PING', 30)
+        app.config.setdefault('MYSQL_POOL_RECYCLE', 3600)
+        app.config.setdefault('MYSQL_POOL_PREFILL', 2)
+
+        config = app.config
+
+        def connect():
+            kwargs = {option: config[key] for key, option in CONNECT_OPTIONS.items() if config.get(key)}
+            if config['MYSQL_CURSORCLASS']:
+                kwargs['cursorclass'] = getattr(cursors, config['MYSQL_CURSORCLASS'])
+            return MySQLdb.connect(**kwargs)
+
+        self.pool = ConnectionPool(
+            connect,
+            size=config['MYSQL_POOL_SIZE'],
+            timeout=config['MYSQL_POOL_TIMEOUT'],
+            pre_ping=config['MYSQL_POOL_PRE_PING'],
+            recycle=config['MYSQL_POOL_RECYCLE']
+        )
+        self._prefill_count = config['MYSQL_POOL_PREFILL']
+        app.teardown_appcontext(self.teardown)
+
+    def start_prefill(self):
+        """
+        Opens MYSQL_POOL_PREFILL connections in the background so early
+        requests skip the handshake. Called by the serving process at startup.
+        """
+        # Spawned inference workers re-import the app and skip this
+        if self._prefill_count and multiprocessing.parent_process() is None:
+            threading.Thread(target=self._prefill, args=(self._prefill_count,),
+                             name="mysql-pool-prefill", daemon=True).start()
+
+    def _prefill(self, count):
+        try:
+            self.pool.prefill(count)
+        except Exception as e:
+            print(f"Could not prefill the MySQL pool: {str(e)}")
+
+    @property
+    def connection(self):
+        """
+        Connection for the current app context, checked out on first use.
+        """
+        if 'mysql_connection' not in g:
+            g.mysql_connection = self.pool.checkout()
+        return g.mysql_connection
+
+    def release(self):
+        """
+        Hands the current context's connection back early (e.g. before a
+        long streaming response). Later use checks out a new one.
+        """
+        connection = g.pop('mysql_connection', None)
+        if connection is not None:
+            self.pool.checkin(connection)
+
+    def teardown(self, exception):
+        self.release()
@@ -0,0 +1,136 @@
+"""
+Exports the chat model to ONNX Runtime and checks the local backends.
+
+    python export_model.py                 # export to models/gpt2-onnx and verify
+    python export_model.py --benchmark     # also compare tokens/sec and memory per backend
+
+Select the backend used by the app with SMARTSHELF_MODEL_BACKEND
+('pytorch', 'pytorch-int8' or 'onnx').
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+from model_backends import BACKENDS, ONNX_MODEL_DIR, load_model
+
+# Prompts used to check that every backend continues text the same way
+VERIFY_PROMPTS = [
+    "tell me a story about a library",
+    "what should i read next",
+    "python is a programming language"
+]
+
+# Share of greedy tokens the ONNX graph must reproduce
+ONNX_MIN_AGREEMENT = 0.95
+
+
+def export_onnx(model_name, output_dir):
+    """
+    Exports GPT-2 with past key/values so generation reuses the KV-cache.
+    """
+    from optimum.onnxruntime import ORTModelForCausalLM
+    from transformers import GPT2Tokenizer
+
+    print(f"Exporting {model_name} to {output_dir} ...")
+    model = ORTModelForCausalLM.from_pretrained(model_name, export=True, use_cache=True)
+    model.save_pretrained(output_dir)
+    GPT2Tokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    print("Export finished.")
+
+
+def greedy_generate(model, tokenizer, prompt, max_new_tokens):
+    inputs = tokenizer(prompt, return_tensors="pt")
+    outputs = model.generate(
+        inputs["input_ids"],
+        attention_mask=inputs["attention_mask"],
+        max_new_tokens=max_new_tokens,
+        min_new_tokens=max_new_tokens,
+        do_sample=False,
+        pad_token_id=tokenizer.eos_token_id
+    )
+    return outputs[0][inputs["input_ids"].shape[1]:].tolist()
+
+
+def verify(model_name, backends, max_new_tokens=20):
+    """
+    Compares greedy output of each backend against full-precision PyTorch.
+    Returns:
+        bool: True if the ONNX graph agrees on at least ONNX_MIN_AGREEMENT of
+            the tokens (int8 is only reported)
+    """
+    reference_model, tokenizer = load_model('pytorch', model_name)
+    expected = [greedy_generate(reference_model, tokenizer, p, max_new_tokens) for p in VERIFY_PROMPTS]
+
+    ok = True
+    for backend in backends:
+        if backend == 'pytorch':
+            continue
+        model, tokenizer = load_model(backend, model_name)
+        matching_tokens = 0
+        for prompt, reference in zip(VERIFY_PROMPTS, expected):
+            tokens = greedy_generate(model, tokenizer, prompt, max_new_tokens)
+            matching_tokens += sum(1 for a, b in zip(tokens, reference) if a == b)
+        total = len(VERIFY_PROMPTS) * max_new_tokens
+        print(f"{backend}: {matching_tokens}/{total} greedy tokens match pytorch")
+        # Quantization legitimately changes some tokens; the ONNX graph should only
+        # differ where float rounding flips a near-tie
+        if backend == 'onnx' and matching_tokens < ONNX_MIN_AGREEMENT * total:
+            ok = False
+    return ok
+
+
+def benchmark_backend(backend, model_name, max_new_tokens):
+    """
+    Runs in its own process so the peak memory belongs to one backend only.
+    """
+    started = time.perf_counter()
+    model, tokenizer = load_model(backend, model_name)
+    load_seconds = time.perf_counter() - started
+
+    greedy_generate(model, tokenizer, VERIFY_PROMPTS[0], 5)  # warm-up
+    started = time.perf_counter()
+    for prompt in VERIFY_PROMPTS:
+        greedy_generate(model, tokenizer, prompt, max_new_tokens)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'backend': backend,
+        'load_seconds': round(load_seconds, 2),
+        'tokens_per_second': round(len(VERIFY_PROMPTS) * max_new_tokens / elapsed, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def benchmark(model_name, backends, max_new_tokens=50):
+    context = multiprocessing.get_context('spawn')
+    print(f"{'backend':<14}{'load s':>8}{'tokens/s':>10}{'peak RSS MB':>13}")
+    for backend in backends:
+        with context.Pool(1) as pool:
+            result = pool.apply(benchmark_backend, (backend, model_name, max_new_tokens))
+        print(f"{result['backend']:<14}{result['load_seconds']:>8}"
+              f"{result['tokens_per_second']:>10}{result['peak_rss_mb']:>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and verify the chat model backends")
+    parser.add_argument('--model', default='gpt2', help="Hugging Face model name or local path")
+    parser.add_argument('--skip-export', action='store_true', help="Reuse an existing ONNX export")
+    parser.add_argument('--benchmark', action='store_true', help="Measure tokens/sec and peak memory")
+    args = parser.parse_args()
+
+    if not args.skip_export:
+        export_onnx(args.model, ONNX_MODEL_DIR)
+
+    backends = list(BACKENDS)
+    if not verify(args.model, backends):
+        print("ONNX output differs from PyTorch; do not deploy this export.")
+        raise SystemExit(1)
+    print("Verification passed.")
+
+    if args.benchmark:
+        benchmark(args.model, backends)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Shared by every chat request; sources that run past their deadline finish here
+# without holding up the request thread
+fanout_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="chat-fanout")
+
+
+class FanOut:
+    """
+    Runs independent answer sources concurrently under one latency budget.
+    Each source may have its own, shorter deadline; results that are not
+    ready in time are treated as missing.
+    """
+
+    def __init__(self, budget, executor=None):
+        """
+        Args:
+            budget (float): Seconds the whole request may spend waiting
+            executor: Thread pool to run sources on (shared pool by default)
+        """
+        self.executor = executor or fanout_executor
+        self.ends_at = time.monotonic() + budget
+        self.futures = {}
+        self.deadlines = {}
+
+    def submit(self, name, function, *args, deadline=None):
+        """
+        Starts a source on the thread pool.
+        Args:
+            name (str): Source name used with result()
+            function (callable): Produces the source's answer
+            deadline (float): Seconds this source may take, within the budget
+        """
+        self.add(name, self.executor.submit(function, *args), deadline)
+
+    def add(self, name, future, deadline=None):
+        """
+        Tracks a future started elsewhere (for example by the inference scheduler).
+        """
+        self.futures[name] = future
+        self.deadlines[name] = time.monotonic() + deadline if deadline is not None else self.ends_at
+
+    def result(self, name, default=None):
+        """
+        Waits for a source until its deadline or the end of the budget.
+        Returns:
+            The source's answer, or default if it failed or ran out of time
+        """
+        future = self.futures.get(name)
+        if future is None:
+            return default
+        remaining = min(self.ends_at, self.deadlines[name]) - time.monotonic()
+        try:
+            return future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            print(f"Chat source '{name}' missed its deadline")
+            return default
+        except Exception as e:
+            print(f"Chat source '{name}' failed: {str(e)}")
+            return default
+
+    def cancel(self):
+        """Cancels every source that has not started yet."""
+        for future in self.futures.values():
+            future.cancel()
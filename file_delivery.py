@@ -0,0 +1,187 @@
+"""
+Book file delivery for /download_pdf: identifier (book id or ISBN) to file
+lookups remembered in memory, byte ranges (206) so PDF viewers fetch only
+the pages they show, strong ETags answered with 304, and an optional
+offload mode where nginx (X-Accel-Redirect) or Apache (X-Sendfile) sends
+the file instead of a Python worker.
+"""
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from urllib.parse import quote
+
+from flask import Response, request
+from werkzeug.http import http_date
+from werkzeug.wsgi import wrap_file
+
+BOOKS_DIR = os.path.join('static', 'books')
+CHUNK_SIZE = 64 * 1024
+
+# Offload modes: nginx needs an internal location mapped to static/books, e.g.
+#   location /protected/books/ { internal; alias /path/to/smartshelf/static/books/; }
+OFFLOAD_ACCEL = 'x-accel-redirect'
+OFFLOAD_SENDFILE = 'x-sendfile'
+ACCEL_PREFIX = '/protected/books/'
+
+
+def book_file_path(stored_path):
+    """
+    Returns:
+        str: Path under static/books for a pdf_path/picture value, or None if
+            it points outside that directory
+    """
+    relative = (stored_path or '').strip().replace('\\', '/')
+    prefix = BOOKS_DIR.replace('\\', '/') + '/'
+    if relative.startswith(prefix):
+        relative = relative[len(prefix):]  # save_book stored paths with the directory
+    root = os.path.abspath(BOOKS_DIR)
+    path = os.path.abspath(os.path.join(root, relative))
+    if not relative or os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+class PdfLocator:
+    """
+    identifier -> PDF path for the most recently downloaded books, so repeat
+    downloads (and every range request of a PDF viewer) skip the database.
+    Entries are dropped by forget_book when a book is edited or deleted.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._paths = OrderedDict()  # identifier -> (bookid, pdf_path, book name)
+        self._identifiers = defaultdict(set)  # bookid -> identifiers mapped to it
+        self._lock = threading.Lock()
+
+    def resolve(self, mysql, identifier):
+        """
+        Returns:
+            tuple: (pdf_path, book name) of the book with this id or, failing
+                that, this ISBN; (None, None) if there is no such book or it has no PDF
+        """
+        with self._lock:
+            entry = self._paths.get(identifier)
+            if entry is not None:
+                self._paths.move_to_end(identifier)
+                return entry[1:]
+
+        cursor = mysql.connection.cursor()
+        try:
+            row = None
+            if identifier.isdigit():
+                cursor.execute("SELECT bookid, pdf_path, name FROM book WHERE bookid = %s", (identifier,))
+                row = cursor.fetchone()
+            if not row or not row[1]:
+                cursor.execute("SELECT bookid, pdf_path, name FROM book WHERE isbn = %s", (identifier,))
+                row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if not row or not row[1]:
+            return None, None
+
+        bookid, pdf_path, name = int(row[0]), row[1].strip(), row[2]
+        with self._lock:
+            self._paths[identifier] = (bookid, pdf_path, name)
+            self._identifiers[bookid].add(identifier)
+            while len(self._paths) > self.max_entries:
+                old_identifier, (old_bookid, _, _) = self._paths.popitem(last=False)
+                self._identifiers[old_bookid].discard(old_identifier)
+                if not self._identifiers[old_bookid]:
+                    del self._identifiers[old_bookid]
+        return pdf_path, name
+
+    def forget_book(self, bookid):
+        with self._lock:
+            for identifier in self._identifiers.pop(int(bookid), ()):
+                self._paths.pop(identifier, None)
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+            self._identifiers.clear()
+
+
+def _content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    fallback = filename.encode('ascii', 'replace').decode('ascii').replace('"', '')
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def _read_range(path, start, stop):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            data = f.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def send_book_file(path, mimetype='application/pdf', as_attachment=True, offload=None, download_name=None,
+                   etag=None):
+    """
+    Sends a file from static/books for the current request.
+    Args:
+        path (str): Path returned by book_file_path
+        mimetype (str): Content type
+        as_attachment (bool): Download instead of showing in the browser
+        offload (str): OFFLOAD_ACCEL or OFFLOAD_SENDFILE to let the front-end
+            server send the file (it then handles ranges and caching itself)
+        download_name (str): File name offered to the browser (the stored name by default)
+        etag (str): Validator for the file's content, e.g. its content hash;
+            derived from size and modification time by default
+    Raises:
+        FileNotFoundError: The file is missing
+    """
+    stat = os.stat(path)
+    headers = {'Content-Disposition': _content_disposition(download_name or os.path.basename(path), as_attachment)}
+
+    if offload == OFFLOAD_ACCEL:
+        relative = os.path.relpath(path, os.path.abspath(BOOKS_DIR)).replace(os.sep, '/')
+        headers['X-Accel-Redirect'] = ACCEL_PREFIX + quote(relative)
+        return Response(status=200, headers=headers, mimetype=mimetype)
+    if offload == OFFLOAD_SENDFILE:
+        headers['X-Sendfile'] = os.path.abspath(path)
+        return Response(status=200, headers=headers, mimetype=mimetype)
+
+    # Size and modification time change whenever the file is replaced
+    etag = f'"{etag}"' if etag else f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    headers.update({
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'no-cache'  # Cache, but revalidate: the URL may point at a new file after an edit
+    })
+    if request.if_none_match.contains(etag.strip('"')):
+        return Response(status=304, headers=headers)
+
+    size = stat.st_size
+    start, stop, status = 0, size, 200
+    if_range = request.if_range
+    if if_range.etag:
+        range_applies = if_range.etag == etag.strip('"')
+    elif if_range.date:
+        range_applies = int(stat.st_mtime) <= if_range.date.timestamp()
+    else:
+        range_applies = True
+    range_applies = range_applies and request.range is not None
+    if range_applies and len(request.range.ranges) == 1:
+        span = request.range.range_for_length(size)
+        if span is None:
+            headers['Content-Range'] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        start, stop = span
+        status = 206
+        headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+    # Several ranges in one request are answered with the whole file
+    headers['Content-Length'] = str(stop - start)
+
+    if status == 200:
+        # Lets the WSGI server send the file its own way (e.g. waitress' file buffer)
+        body = wrap_file(request.environ, open(path, 'rb'), CHUNK_SIZE)
+    else:
+        body = _read_range(path, start, stop)
+    return Response(body, status=status, headers=headers, mimetype=mimetype, direct_passthrough=True)
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from response_cache import ResponseCache, MISS
+
+GOOGLE_BOOKS_URL = "https://www.googleapis.com/books/v1"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing upstream for a while. After failure_threshold
+    consecutive failures the circuit opens; once reset_timeout has passed a
+    single trial call is let through, and its outcome closes or reopens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class GoogleBooksClient:
+    """
+    Google Books volumes search over a pooled keep-alive session, with
+    connect/read deadlines, a response cache and a circuit breaker.
+    Point base_url at a local fake server in tests.
+    """
+
+    def __init__(self, api_key=None, base_url=GOOGLE_BOOKS_URL, connect_timeout=2, read_timeout=3,
+                 cache_size=256, cache_ttl=3600, failure_threshold=5, reset_timeout=30, pool_size=16):
+        """
+        Args:
+            api_key (str): Google Books API key
+            base_url (str): API root, without a trailing slash
+            connect_timeout (float): Seconds to establish a connection
+            read_timeout (float): Seconds to wait for response data
+            cache_size (int): Queries kept in the response cache
+            cache_ttl (int): Seconds a cached response stays valid
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (int): Seconds the circuit stays open before a trial call
+            pool_size (int): Keep-alive connections kept per host
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = ResponseCache(max_entries=cache_size, default_ttl=cache_ttl)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def search(self, query):
+        """
+        Args:
+            query (str): Free-text volumes query
+        Returns:
+            list: 'items' from the API response (empty if nothing matched)
+        Raises:
+            CircuitOpenError: The API is being skipped after repeated failures
+            requests.exceptions.RequestException: The call failed or timed out
+        """
+        key = query.strip().lower()
+        cached = self.cache.get('volumes', key)
+        if cached is not MISS:
+            return cached
+
+        if not self.breaker.allow():
+            raise CircuitOpenError("Google Books is unavailable, skipping the API for now")
+
+        params = {'q': query}
+        if self.api_key:
+            params['key'] = self.api_key
+        try:
+            response = self.session.get(f"{self.base_url}/volumes", params=params, timeout=self.timeout)
+            response.raise_for_status()
+            items = response.json().get('items', [])
+        except (requests.exceptions.RequestException, ValueError):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+        self.cache.set('volumes', key, items)
+        return items
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class InferenceScheduler:
+    """
+    Collects GPT-2 prompts from concurrent requests for a few milliseconds
+    and runs them through one batched model.generate call.
+    """
+
+    def __init__(self, model_manager, generation_kwargs, max_batch_size=8, max_wait_ms=10):
+        """
+        Args:
+            model_manager: ModelManager that owns the model and tokenizer
+            generation_kwargs (dict): Keyword arguments passed to model.generate
+            max_batch_size (int): Largest number of prompts per generate call
+            max_wait_ms (int): How long the first prompt waits for others to join
+        """
+        self.model_manager = model_manager
+        self.generation_kwargs = generation_kwargs
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="gpt2-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, prompt):
+        """
+        Queues a prompt for the next batch.
+        Args:
+            prompt (str): Text to continue
+        Returns:
+            Future: Resolves to the decoded generated text
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((prompt, future))
+        return future
+
+    def generate(self, prompt, timeout=None):
+        """
+        Queues a prompt and waits for its result.
+        Args:
+            prompt (str): Text to continue
+            timeout (float): Seconds to wait before giving up
+        Returns:
+            str: Decoded generated text
+        """
+        return self.submit(prompt).result(timeout=timeout)
+
+    def _collect_batch(self):
+        # Block for the first prompt, then gather more until the batch is full or the wait is over
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # Skip callers that already gave up
+            batch = [(prompt, future) for prompt, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                texts = self._generate_batch([prompt for prompt, _ in batch])
+                for (_, future), text in zip(batch, texts):
+                    future.set_result(text)
+            except Exception as e:
+                print(f"GPT-2 batch generation error: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def _generate_batch(self, prompts):
+        model, tokenizer = self.model_manager.get()
+        if model is None:
+            raise RuntimeError("GPT-2 model is not loaded yet")
+
+        # GPT-2 continues from the right, so pad the batch on the left
+        tokenizer.padding_side = "left"
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True, truncation=True)
+        outputs = model.generate(
+            inputs["input_ids"],
+            attention_mask=inputs["attention_mask"],
+            pad_token_id=tokenizer.eos_token_id,
+            **self.generation_kwargs
+        )
+        return [tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
+
+    def stream(self, prompt, timeout=None):
+        """
+        Generates for a single prompt outside the batch, yielding decoded
+        text as each new token is produced.
+        Args:
+            prompt (str): Text to continue
+            timeout (float): Seconds to wait for each token
+        Yields:
+            str: Newly generated text
+        """
+        from transformers import TextIteratorStreamer
+
+        model, tokenizer = self.model_manager.get()
+        if model is None:
+            raise RuntimeError("GPT-2 model is not loaded yet")
+
+        inputs = tokenizer(prompt, return_tensors="pt", truncation=True)
+        streamer = TextIteratorStreamer(
+            tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=timeout)
+
+        generation_thread = threading.Thread(
+            target=model.generate,
+            kwargs=dict(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                pad_token_id=tokenizer.eos_token_id,
+                streamer=streamer,
+                **self.generation_kwargs
+            ),
+            daemon=True
+        )
+        generation_thread.start()
+        for piece in streamer:
+            if piece:
+                yield piece
+        generation_thread.join()
@@ -0,0 +1,299 @@
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+def _worker_main(worker_id, model_name, backend, generation_kwargs, max_batch_size, max_wait_ms,
+                 threads, request_queue, result_queue):
+    """
+    Entry point of a worker process: loads its own model, then serves
+    'generate' requests through a local batching scheduler and 'stream'
+    requests token by token.
+    """
+    # Imported in the child so the web process never loads the model
+    from model_manager import ModelManager
+    from inference_scheduler import InferenceScheduler
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    manager = ModelManager(model_name, backend=backend)
+    ready = manager.load()
+    result_queue.put(('ready', worker_id, ready, manager.error))
+    if not ready:
+        return
+
+    scheduler = InferenceScheduler(manager, generation_kwargs, max_batch_size=max_batch_size,
+                                   max_wait_ms=max_wait_ms)
+
+    def send_result(request_id, future):
+        try:
+            result_queue.put(('result', request_id, future.result()))
+        except Exception as e:
+            result_queue.put(('error', request_id, str(e)))
+
+    def run_stream(request_id, prompt, timeout):
+        try:
+            for piece in scheduler.stream(prompt, timeout=timeout):
+                result_queue.put(('token', request_id, piece))
+            result_queue.put(('end', request_id, None))
+        except Exception as e:
+            result_queue.put(('error', request_id, str(e)))
+
+    while True:
+        message = request_queue.get()
+        if message is None:
+            break
+        kind, request_id, prompt, timeout = message
+        if kind == 'generate':
+            future = scheduler.submit(prompt)
+            future.add_done_callback(lambda f, rid=request_id: send_result(rid, f))
+        elif kind == 'stream':
+            threading.Thread(target=run_stream, args=(request_id, prompt, timeout), daemon=True).start()
+
+
+class InferenceWorkerPool:
+    """
+    Runs GPT-2 in separate worker processes so generation never holds the
+    web process's GIL. Each worker has its own request queue; the web
+    process counts the requests each worker has in flight, refuses new ones
+    once every worker is full, and fails a worker's requests at once if its
+    process dies. Offers the same submit/generate/stream calls as
+    InferenceScheduler and the same readiness calls as ModelManager.
+    """
+
+    def __init__(self, model_name, backend, generation_kwargs, workers=2, max_queue=64,
+                 max_batch_size=8, max_wait_ms=10, threads_per_worker=None, restart_delay=5,
+                 max_restart_delay=600):
+        """
+        Args:
+            model_name (str): Hugging Face model name or local path
+            backend (str): Inference backend, see model_backends.BACKENDS
+            generation_kwargs (dict): Keyword arguments passed to model.generate
+            workers (int): Number of worker processes
+            max_queue (int): Prompts allowed in flight (across all workers)
+                before new ones are refused
+            max_batch_size (int): Largest batch each worker runs at once
+            max_wait_ms (int): How long a worker waits to fill a batch
+            threads_per_worker (int): torch threads per worker (default: torch's choice)
+            restart_delay (float): Seconds before a worker that failed to load
+                is started again, doubled after each failure
+            max_restart_delay (float): Longest wait between restarts
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.generation_kwargs = generation_kwargs
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_in_flight = max(1, -(-max_queue // workers))  # Per worker, rounded up
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.threads_per_worker = threads_per_worker
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+
+        self._context = multiprocessing.get_context('spawn')
+        self._started = False
+        self._results = None
+        self._processes = {}
+        self._queues = {}  # worker id -> its request queue
+        self._in_flight = {}  # worker id -> request ids sent to it and not answered yet
+        self._owners = {}  # request id -> worker id
+        self._load_failures = {}  # worker id -> failed loads in a row
+        self._restart_at = {}  # worker id -> when a failed worker is started again
+        self._ready_workers = set()
+        self._errors = {}
+        self._pending = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    # Readiness, mirroring ModelManager
+
+    def warm_up(self):
+        """
+        Starts the worker processes if they are not running. Returns immediately.
+        """
+        # Spawned children re-import the app; only the web process starts workers
+        if multiprocessing.parent_process() is not None:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._results = self._context.Queue()
+            for worker_id in range(self.workers):
+                self._start_worker(worker_id)
+        threading.Thread(target=self._dispatch, name="gpt2-pool-results", daemon=True).start()
+
+    def _start_worker(self, worker_id):
+        # Called with self._lock held. A fresh queue, so nothing sent to a dead worker is replayed
+        requests = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.model_name, self.backend, self.generation_kwargs,
+                  self.max_batch_size, self.max_wait_ms, self.threads_per_worker,
+                  requests, self._results),
+            name=f"gpt2-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._processes[worker_id] = process
+        self._queues[worker_id] = requests
+        self._in_flight[worker_id] = set()
+
+    def is_ready(self):
+        return bool(self._ready_workers)
+
+    def status(self):
+        return {
+            'model': self.model_name,
+            'backend': self.backend,
+            'mode': 'worker-pool',
+            'ready': self.is_ready(),
+            'workers': self.workers,
+            'ready_workers': len(self._ready_workers),
+            'pending': len(self._pending),
+            'in_flight': {worker_id: len(ids) for worker_id, ids in self._in_flight.items()},
+            'errors': self._errors
+        }
+
+    # Requests, mirroring InferenceScheduler
+
+    def _send(self, kind, prompt, waiter, timeout=None):
+        self.warm_up()
+        with self._lock:
+            # Least busy live worker, ready ones first (others answer once they have loaded)
+            candidates = [worker_id for worker_id, process in self._processes.items()
+                          if process.is_alive() and len(self._in_flight[worker_id]) < self.max_in_flight]
+            if not candidates:
+                raise RuntimeError("GPT-2 inference queue is full")
+            worker_id = min(candidates, key=lambda w: (w not in self._ready_workers, len(self._in_flight[w])))
+            request_id = next(self._ids)
+            self._pending[request_id] = waiter
+            self._in_flight[worker_id].add(request_id)
+            self._owners[request_id] = worker_id
+            self._queues[worker_id].put((kind, request_id, prompt, timeout))
+        return request_id
+
+    def _finish(self, request_id):
+        # Called with self._lock held: the worker has answered this request for good
+        worker_id = self._owners.pop(request_id, None)
+        if worker_id is not None:
+            self._in_flight[worker_id].discard(request_id)
+
+    def submit(self, prompt):
+        """
+        Returns:
+            Future: Resolves to the decoded generated text
+        """
+        future = Future()
+        try:
+            self._send('generate', prompt, future)
+        except RuntimeError as e:
+            future.set_exception(e)
+        return future
+
+    def generate(self, prompt, timeout=None):
+        return self.submit(prompt).result(timeout=timeout)
+
+    def stream(self, prompt, timeout=None):
+        """
+        Yields:
+            str: Newly generated text, as the worker produces it
+        """
+        tokens = queue.Queue()
+        request_id = self._send('stream', prompt, tokens, timeout)
+        try:
+            while True:
+                kind, value = tokens.get(timeout=timeout)
+                if kind == 'token':
+                    yield value
+                elif kind == 'end':
+                    return
+                else:
+                    raise RuntimeError(value)
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _dispatch(self):
+        # Routes worker messages back to the waiting web threads
+        next_check = time.monotonic() + 1
+        while True:
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + 1
+            try:
+                kind, key, *payload = self._results.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            if kind == 'ready':
+                ready, error = payload
+                with self._lock:
+                    if ready:
+                        self._ready_workers.add(key)
+                        self._errors.pop(key, None)
+                        self._load_failures.pop(key, None)
+                    else:
+                        self._errors[key] = error
+                continue
+
+            with self._lock:
+                if kind in ('result', 'error', 'end'):
+                    self._finish(key)
+                waiter = self._pending.get(key)
+                if isinstance(waiter, Future):
+                    self._pending.pop(key, None)
+            if waiter is None:
+                continue
+            self._deliver(waiter, kind, payload[0])
+
+    def _deliver(self, waiter, kind, value):
+        if isinstance(waiter, Future):
+            if waiter.done():
+                return
+            if kind == 'result':
+                waiter.set_result(value)
+            else:
+                waiter.set_exception(RuntimeError(value))
+        else:
+            waiter.put((kind, value))
+
+    def _check_workers(self):
+        """
+        Fails the requests of workers that died and starts them again: at
+        once if the worker had loaded its model, with a growing delay if it
+        never got that far.
+        """
+        failed = []
+        with self._lock:
+            now = time.monotonic()
+            for worker_id, process in list(self._processes.items()):
+                if process.is_alive():
+                    continue
+                if worker_id not in self._restart_at:
+                    was_ready = worker_id in self._ready_workers
+                    self._ready_workers.discard(worker_id)
+                    for request_id in self._in_flight[worker_id]:
+                        self._owners.pop(request_id, None)
+                        waiter = self._pending.pop(request_id, None)
+                        if waiter is not None:
+                            failed.append(waiter)
+                    self._in_flight[worker_id] = set()
+                    delay = 0
+                    if not was_ready:
+                        # Failed to load (or crashed while loading): back off instead of looping
+                        failures = self._load_failures.get(worker_id, 0) + 1
+                        self._load_failures[worker_id] = failures
+                        delay = min(self.restart_delay * 2 ** (failures - 1), self.max_restart_delay)
+                    self._restart_at[worker_id] = now + delay
+                if now >= self._restart_at[worker_id]:
+                    del self._restart_at[worker_id]
+                    print(f"GPT-2 worker {worker_id} exited, restarting it")
+                    self._start_worker(worker_id)
+        for waiter in failed:
+            self._deliver(waiter, 'error', "GPT-2 worker exited")
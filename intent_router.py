@@ -0,0 +1,205 @@
+import ast
+import string
+from collections import deque, namedtuple
+
+# Result of routing a message: intent name, extracted slots and, for
+# greetings, the canned response
+RouteMatch = namedtuple('RouteMatch', ['intent', 'slots', 'response'])
+
+# Characters trimmed from each token before matching
+TOKEN_PUNCTUATION = string.punctuation + '¿¡…“”‘’'
+
+
+def load_phrase_table(path):
+    """
+    Reads a phrase table written as the body of a Python dict
+    ('phrase': "response", ...), with or without the surrounding braces.
+    Args:
+        path (str): File to read
+    Returns:
+        dict: Phrase to response, empty if the file is missing or invalid
+    """
+    try:
+        with open(path, encoding='utf-8') as table_file:
+            text = table_file.read().strip()
+        if not text.startswith('{'):
+            text = '{' + text
+        if not text.endswith('}'):
+            text = text + '}'
+        return ast.literal_eval(text)
+    except (OSError, ValueError, SyntaxError) as e:
+        print(f"Could not load phrase table {path}: {str(e)}")
+        return {}
+
+
+def tokenize(text):
+    """
+    Splits on whitespace and trims punctuation from each token. Regex \\w
+    is avoided because it does not match Tamil vowel signs.
+    Returns:
+        list: (raw_token, normalized_token) pairs
+    """
+    tokens = []
+    for raw in text.split():
+        normalized = raw.strip(TOKEN_PUNCTUATION).lower()
+        if normalized:
+            tokens.append((raw, normalized))
+    return tokens
+
+
+def _deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class IntentRouter:
+    """
+    Matches a message against every phrase table in one pass, using an
+    Aho-Corasick automaton over whole tokens, and returns the intent plus
+    its slot (author, title, genre, ...). Tokens of trigger phrases get
+    one-edit typo tolerance.
+    """
+
+    def __init__(self, greetings, intent_phrases, slot_names=None, prefix_intents=(),
+                 context_words=None, min_typo_length=5):
+        """
+        Args:
+            greetings (dict): Whole-message phrase to canned response
+            intent_phrases (dict): Intent to trigger phrases, in priority order
+            slot_names (dict): Intent to the name of the slot it extracts;
+                intents without one take no slot
+            prefix_intents (iterable): Intents that only match at the start
+            context_words (dict): Intent to words one of which must also be in
+                the message, for triggers too common to stand alone ('by')
+            min_typo_length (int): Shortest token that typo correction applies to
+        """
+        self.slot_names = dict(slot_names or {})
+        self.prefix_intents = set(prefix_intents)
+        self.context_words = {intent: set(words) for intent, words in (context_words or {}).items()}
+        self.min_typo_length = min_typo_length
+        self.priority = {intent: rank for rank, intent in enumerate(intent_phrases)}
+
+        self.greetings = {}
+        for phrase, response in greetings.items():
+            key = ' '.join(token for _, token in tokenize(phrase))
+            self.greetings.setdefault(key, response)
+
+        self._greeting_vocabulary = {word for key in self.greetings for word in key.split()}
+
+        # Automaton state: goto transitions, failure links and outputs per node
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._vocabulary = set()
+        for intent, phrases in intent_phrases.items():
+            for phrase in phrases:
+                self._add_phrase([token for _, token in tokenize(phrase)], intent)
+        self._build_failure_links()
+        for words in self.context_words.values():
+            self._vocabulary |= words
+
+        # Typo index: every word and its one-deletion variants point back to the
+        # word, so a token within one edit is found with a few dict lookups
+        self._typo_index = {}
+        for word in self._vocabulary | self._greeting_vocabulary:
+            if len(word) >= self.min_typo_length:
+                for variant in _deletions(word) | {word}:
+                    self._typo_index.setdefault(variant, set()).add(word)
+
+    def _add_phrase(self, tokens, intent):
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            self._vocabulary.add(token)
+            if token not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][token] = len(self._goto) - 1
+            node = self._goto[node][token]
+        self._output[node].append((intent, len(tokens)))
+
+    def _build_failure_links(self):
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for token, child in self._goto[node].items():
+                pending.append(child)
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def correct(self, token, vocabulary):
+        """
+        Returns the vocabulary word within one edit of token, or token itself
+        if it is known, too short, or the correction is ambiguous.
+        """
+        if token in vocabulary or len(token) < self.min_typo_length:
+            return token
+        candidates = set(self._typo_index.get(token, ()))
+        for variant in _deletions(token):
+            candidates |= self._typo_index.get(variant, set())
+        candidates &= vocabulary
+        if len(candidates) == 1:
+            return candidates.pop()
+        return token
+
+    def _find_triggers(self, tokens):
+        """
+        Runs the automaton once over the tokens.
+        Returns:
+            list: (intent, start, end) token spans of every trigger phrase
+        """
+        matches = []
+        node = 0
+        for position, token in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for intent, length in self._output[node]:
+                matches.append((intent, position + 1 - length, position + 1))
+        return matches
+
+    def route(self, message):
+        """
+        Args:
+            message (str): User message
+        Returns:
+            RouteMatch: Best intent for the message, or None to fall through
+        """
+        tokens = tokenize(message)
+        if not tokens:
+            return None
+        raw_tokens = [raw for raw, _ in tokens]
+        words = [token for _, token in tokens]
+
+        # 1. Whole-message greetings and small talk
+        key = ' '.join(words)
+        if key not in self.greetings:
+            key = ' '.join(self.correct(word, self._greeting_vocabulary) for word in words)
+        if key in self.greetings:
+            return RouteMatch('greeting', {}, self.greetings[key])
+
+        # 2. Trigger phrases anywhere in the message, on typo-corrected tokens
+        corrected = [self.correct(word, self._vocabulary) for word in words]
+        matches = self._find_triggers(corrected)
+        # Highest-priority intent first, then the earliest and longest phrase
+        matches.sort(key=lambda m: (self.priority[m[0]], m[1], m[1] - m[2]))
+
+        for intent, start, end in matches:
+            if intent in self.prefix_intents and start != 0:
+                continue
+            if intent in self.context_words and not self.context_words[intent] & set(corrected):
+                continue
+            slot_name = self.slot_names.get(intent)
+            if slot_name is None:
+                return RouteMatch(intent, {}, None)
+            # The slot is the text after the trigger, or before it if nothing follows
+            slot_tokens = raw_tokens[end:] or raw_tokens[:start]
+            slot_value = ' '.join(slot_tokens).strip(' ?!.').strip()
+            if slot_value:
+                return RouteMatch(intent, {slot_name: slot_value}, None)
+        return None
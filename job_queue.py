@@ -0,0 +1,246 @@
+"""
+Durable background jobs. Request handlers enqueue a job (a kind plus a
+JSON payload) into a local SQLite file and return; a small pool of worker
+threads runs it inside an app context, retrying failures with exponential
+backoff. Queued jobs survive a restart, and a job whose worker died is
+picked up again once its lease runs out.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import threading
+import time
+
+QUEUE_PATH = os.path.join('cache', 'jobs.sqlite')
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        run_at REAL NOT NULL,
+        lease_until REAL,
+        created_at REAL NOT NULL,
+        finished_at REAL,
+        last_error TEXT,
+        result TEXT
+    );
+    CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at);
+"""
+
+# Backoff before retry n is BACKOFF_BASE * 2 ** (n - 1) seconds (with jitter), at most BACKOFF_MAX
+BACKOFF_BASE = 2
+BACKOFF_MAX = 600
+
+# Finished jobs are kept this long for the status API
+KEEP_FINISHED_SECONDS = 7 * 86400
+PURGE_INTERVAL = 3600
+
+
+class UnknownJobError(Exception):
+    """Raised when a job kind has no registered handler."""
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue with a worker pool. Handlers are registered per
+    kind with task() and called with the job's payload; their return value
+    (anything JSON-serialisable) is stored as the job's result.
+    """
+
+    def __init__(self, path=QUEUE_PATH, workers=2):
+        """
+        Args:
+            path (str): SQLite file
+            workers (int): Worker threads started by start()
+        """
+        self.path = path
+        self.workers = workers
+        self._handlers = {}  # kind -> (handler, max_attempts, lease seconds)
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._started = False
+        self._schema_ready = False
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # isolation_level=None: transactions are opened explicitly (BEGIN IMMEDIATE to claim a job)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            if not self._schema_ready:
+                connection.execute('PRAGMA journal_mode = WAL')
+                connection.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.connection = connection
+        return connection
+
+    def task(self, kind, max_attempts=5, lease=300):
+        """
+        Decorator registering the handler of a job kind.
+        Args:
+            kind (str): Name jobs are enqueued under
+            max_attempts (int): Runs before the job is marked failed
+            lease (float): Seconds a run may take before the job is given to
+                another worker (e.g. after a crash)
+        """
+        def register(handler):
+            self._handlers[kind] = (handler, max_attempts, lease)
+            return handler
+        return register
+
+    def enqueue(self, kind, payload=None, delay=0):
+        """
+        Stores a job and wakes a worker. Returns at once.
+        Returns:
+            int: Job id, for status()
+        Raises:
+            UnknownJobError: No handler is registered for kind
+        """
+        if kind not in self._handlers:
+            raise UnknownJobError(f"No handler for job kind '{kind}'")
+        now = time.time()
+        cursor = self._connection().execute("""
+            INSERT INTO jobs (kind, payload, status, max_attempts, run_at, created_at)
+            VALUES (?, ?, 'queued', ?, ?, ?)
+        """, (kind, json.dumps(payload), self._handlers[kind][1], now + delay, now))
+        with self._wakeup:
+            self._wakeup.notify()
+        return cursor.lastrowid
+
+    def _claim(self):
+        """
+        Returns:
+            sqlite3.Row: A due job, marked running under a lease; None if none is due
+        """
+        db = self._connection()
+        now = time.time()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            job = db.execute("""
+                SELECT * FROM jobs
+                WHERE (status = 'queued' AND run_at <= ?) OR (status = 'running' AND lease_until < ?)
+                ORDER BY run_at, id LIMIT 1
+            """, (now, now)).fetchone()
+            if job is not None:
+                lease = self._handlers.get(job['kind'], (None, None, 300))[2]
+                db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ? WHERE id = ?",
+                           (now + lease, job['id']))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return job
+
+    def _next_due(self):
+        row = self._connection().execute(
+            "SELECT MIN(run_at) FROM jobs WHERE status = 'queued'").fetchone()
+        return row[0]
+
+    def _run(self, app, job):
+        attempt = job['attempts'] + 1
+        try:
+            handler = self._handlers.get(job['kind'], (None,))[0]
+            if handler is None:
+                raise UnknownJobError(f"No handler for job kind '{job['kind']}'")
+            with app.app_context():
+                result = handler(json.loads(job['payload']))
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"[:1000]
+            if attempt >= job['max_attempts'] or isinstance(e, UnknownJobError):
+                self._connection().execute("""
+                    UPDATE jobs SET status = 'failed', last_error = ?, finished_at = ?, lease_until = NULL
+                    WHERE id = ?
+                """, (error, time.time(), job['id']))
+                logging.error(f"Job {job['id']} ({job['kind']}) failed after {attempt} attempts: {error}")
+            else:
+                delay = min(BACKOFF_BASE * 2 ** (attempt - 1), BACKOFF_MAX) * random.uniform(0.5, 1)
+                self._connection().execute("""
+                    UPDATE jobs SET status = 'queued', last_error = ?, run_at = ?, lease_until = NULL
+                    WHERE id = ?
+                """, (error, time.time() + delay, job['id']))
+            return
+        self._connection().execute("""
+            UPDATE jobs SET status = 'done', result = ?, last_error = NULL, finished_at = ?, lease_until = NULL
+            WHERE id = ?
+        """, (json.dumps(result, default=str), time.time(), job['id']))
+
+    def _worker(self, app):
+        next_purge = 0
+        while True:
+            try:
+                job = self._claim()
+                if job is not None:
+                    self._run(app, job)
+                    continue
+                if time.monotonic() >= next_purge:
+                    self.purge()
+                    next_purge = time.monotonic() + PURGE_INTERVAL
+                next_due = self._next_due()
+                # Also wake up now and then for expired leases and jobs enqueued by other processes
+                timeout = 5 if next_due is None else min(max(next_due - time.time(), 0.05), 5)
+            except sqlite3.Error as e:
+                logging.error(f"Job queue error: {str(e)}")
+                timeout = 5
+            with self._wakeup:
+                self._wakeup.wait(timeout)
+
+    def start(self, app):
+        """
+        Starts the worker threads (once, and only in the web process).
+        """
+        # Spawned inference workers re-import the app; only the web process runs jobs
+        if self._started or multiprocessing.parent_process() is not None:
+            return
+        self._started = True
+        for number in range(self.workers):
+            threading.Thread(target=self._worker, args=(app,), name=f"job-worker-{number}", daemon=True).start()
+
+    def purge(self, older_than=KEEP_FINISHED_SECONDS):
+        """Deletes finished jobs older than older_than seconds."""
+        self._connection().execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                                   (time.time() - older_than,))
+
+    def status(self, job_id):
+        """
+        Returns:
+            dict: The job's state, attempts, timestamps, last error and
+                result; None if there is no such job
+        """
+        job = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        return {
+            'id': job['id'],
+            'kind': job['kind'],
+            'status': job['status'],
+            'attempts': job['attempts'],
+            'max_attempts': job['max_attempts'],
+            'created_at': job['created_at'],
+            'run_at': job['run_at'],
+            'finished_at': job['finished_at'],
+            'last_error': job['last_error'],
+            'result': json.loads(job['result']) if job['result'] else None
+        }
+
+    def stats(self):
+        counts = {row['status']: row['jobs'] for row in self._connection().execute(
+            "SELECT status, COUNT(*) AS jobs FROM jobs GROUP BY status")}
+        oldest = self._connection().execute(
+            "SELECT MIN(created_at) FROM jobs WHERE status = 'queued' AND run_at <= ?", (time.time(),)).fetchone()[0]
+        return {
+            'workers': self.workers if self._started else 0,
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_due_seconds': round(time.time() - oldest, 1) if oldest else 0,
+            'kinds': sorted(self._handlers)
+        }
@@ -53,6 +53,7 @@ CREATE TABLE `book` (
   `categoryid` int(11) NOT NULL,
   `authorid` int(11) NOT NULL,
   `name` text NOT NULL,
+  `name_sort` varchar(255) GENERATED ALWAYS AS (left(`name`, 255)) VIRTUAL,
   `picture` varchar(250) NOT NULL,
   `publisherid` int(11) NOT NULL,
   `isbn` varchar(30) NOT NULL,
@@ -75,6 +76,23 @@ INSERT INTO `book` (`bookid`, `categoryid`, `authorid`, `name`, `picture`, `publ
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `book_rating`
+--
+
+CREATE TABLE `book_rating` (
+  `book_id` int(10) UNSIGNED NOT NULL,
+  `review_count` int(11) NOT NULL DEFAULT 0,
+  `rating_sum` int(11) NOT NULL DEFAULT 0,
+  `rating_1` int(11) NOT NULL DEFAULT 0,
+  `rating_2` int(11) NOT NULL DEFAULT 0,
+  `rating_3` int(11) NOT NULL DEFAULT 0,
+  `rating_4` int(11) NOT NULL DEFAULT 0,
+  `rating_5` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `category`
 --
@@ -185,6 +203,27 @@ INSERT INTO `reviews` (`id`, `user_id`, `book_id`, `review`, `rating`, `created_
 (14, 1, 11, 'awesome', 5, '2025-02-20 03:25:46'),
 (15, 2, 18, 'ok', 3, '2025-03-03 06:15:12');
 
+--
+-- Rating summaries for the reviews above
+--
+
+INSERT INTO `book_rating` (`book_id`, `review_count`, `rating_sum`, `rating_1`, `rating_2`, `rating_3`, `rating_4`, `rating_5`)
+SELECT `book_id`, COUNT(*), SUM(`rating`), SUM(`rating` = 1), SUM(`rating` = 2), SUM(`rating` = 3), SUM(`rating` = 4), SUM(`rating` = 5)
+FROM `reviews` GROUP BY `book_id`;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `stored_file`
+--
+
+CREATE TABLE `stored_file` (
+  `file_key` varchar(100) NOT NULL,
+  `size` bigint(20) UNSIGNED NOT NULL,
+  `refcount` int(11) NOT NULL DEFAULT 0,
+  `created_on` datetime NOT NULL DEFAULT current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 -- --------------------------------------------------------
 
 --
@@ -220,31 +259,51 @@ INSERT INTO `user` (`id`, `first_name`, `last_name`, `email`, `password`, `role`
 -- Indexes for table `author`
 --
 ALTER TABLE `author`
-  ADD PRIMARY KEY (`authorid`);
+  ADD PRIMARY KEY (`authorid`),
+  ADD KEY `name` (`name`),
+  ADD KEY `status` (`status`);
 
 --
 -- Indexes for table `book`
 --
 ALTER TABLE `book`
-  ADD PRIMARY KEY (`bookid`);
+  ADD PRIMARY KEY (`bookid`),
+  ADD KEY `name_sort` (`name_sort`),
+  ADD KEY `isbn` (`isbn`),
+  ADD KEY `status` (`status`),
+  ADD KEY `added_on` (`added_on`),
+  ADD KEY `updated_on` (`updated_on`);
+
+--
+-- Indexes for table `book_rating`
+--
+ALTER TABLE `book_rating`
+  ADD PRIMARY KEY (`book_id`);
 
 --
 -- Indexes for table `category`
 --
 ALTER TABLE `category`
-  ADD PRIMARY KEY (`categoryid`);
+  ADD PRIMARY KEY (`categoryid`),
+  ADD KEY `name` (`name`),
+  ADD KEY `status` (`status`);
 
 --
 -- Indexes for table `issued_book`
 --
 ALTER TABLE `issued_book`
-  ADD PRIMARY KEY (`issuebookid`);
+  ADD PRIMARY KEY (`issuebookid`),
+  ADD KEY `issue_date_time` (`issue_date_time`),
+  ADD KEY `expected_return_date` (`expected_return_date`),
+  ADD KEY `status` (`status`);
 
 --
 -- Indexes for table `publisher`
 --
 ALTER TABLE `publisher`
-  ADD PRIMARY KEY (`publisherid`);
+  ADD PRIMARY KEY (`publisherid`),
+  ADD KEY `name` (`name`),
+  ADD KEY `status` (`status`);
 
 --
 -- Indexes for table `queries`
@@ -258,13 +317,24 @@ ALTER TABLE `queries`
 ALTER TABLE `reviews`
   ADD PRIMARY KEY (`id`),
   ADD KEY `user_id` (`user_id`),
-  ADD KEY `book_id` (`book_id`);
+  ADD KEY `book_id` (`book_id`),
+  ADD KEY `created_on` (`created_on`),
+  ADD KEY `rating` (`rating`);
+
+--
+-- Indexes for table `stored_file`
+--
+ALTER TABLE `stored_file`
+  ADD PRIMARY KEY (`file_key`);
 
 --
 -- Indexes for table `user`
 --
 ALTER TABLE `user`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `first_name` (`first_name`),
+  ADD KEY `email` (`email`),
+  ADD KEY `role` (`role`);
 
 --
 -- AUTO_INCREMENT for dumped tables
@@ -322,6 +392,12 @@ ALTER TABLE `user`
 -- Constraints for dumped tables
 --
 
+--
+-- Constraints for table `book_rating`
+--
+ALTER TABLE `book_rating`
+  ADD CONSTRAINT `book_rating_ibfk_1` FOREIGN KEY (`book_id`) REFERENCES `book` (`bookid`) ON DELETE CASCADE ON UPDATE CASCADE;
+
 --
 -- Constraints for table `reviews`
 --
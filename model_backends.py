@@ -0,0 +1,89 @@
+import os
+
+# Where export_model.py writes the ONNX Runtime graph
+ONNX_MODEL_DIR = os.path.join('models', 'gpt2-onnx')
+
+
+def load_tokenizer(model_name):
+    from transformers import GPT2Tokenizer
+
+    tokenizer = GPT2Tokenizer.from_pretrained(model_name)
+    tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
+def load_pytorch(model_name):
+    """
+    Full-precision PyTorch model (the original behaviour).
+    """
+    from transformers import GPT2LMHeadModel
+
+    model = GPT2LMHeadModel.from_pretrained(model_name)
+    model.eval()
+    return model
+
+
+def conv1d_to_linear(model):
+    """
+    GPT-2 uses transformers' Conv1D for its projections, which dynamic
+    quantization does not recognise. Swaps each one for an equivalent
+    nn.Linear (Conv1D stores its weight transposed).
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for parent in list(model.modules()):
+        for child_name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(parent, child_name, linear)
+    return model
+
+
+def load_pytorch_int8(model_name):
+    """
+    PyTorch model with int8 dynamic quantization of every linear layer.
+    """
+    import torch
+
+    model = conv1d_to_linear(load_pytorch(model_name))
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return model
+
+
+def load_onnx(model_name, model_dir=ONNX_MODEL_DIR):
+    """
+    ONNX Runtime graph with KV-cache, exported by export_model.py. Exposes
+    the same generate() API as the PyTorch model.
+    """
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    if not os.path.isdir(model_dir):
+        raise FileNotFoundError(
+            f"No ONNX model in '{model_dir}'. Run 'python export_model.py' first.")
+    return ORTModelForCausalLM.from_pretrained(model_dir, use_cache=True, provider="CPUExecutionProvider")
+
+
+# Backends selectable with SMARTSHELF_MODEL_BACKEND
+BACKENDS = {
+    'pytorch': load_pytorch,
+    'pytorch-int8': load_pytorch_int8,
+    'onnx': load_onnx
+}
+
+
+def load_model(backend, model_name):
+    """
+    Args:
+        backend (str): One of BACKENDS
+        model_name (str): Hugging Face model name or local path
+    Returns:
+        tuple: (model, tokenizer)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](model_name), load_tokenizer(model_name)
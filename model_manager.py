@@ -0,0 +1,98 @@
+import threading
+import time
+from model_backends import load_model
+
+# Readiness states reported by the model manager
+STATE_IDLE = "idle"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+
+class ModelManager:
+    """
+    Loads the GPT-2 model and tokenizer lazily, either on first use or on a
+    background warm-up thread, so importing the app never blocks on it.
+    """
+
+    def __init__(self, model_name="gpt2", backend="pytorch"):
+        """
+        Args:
+            model_name (str): Hugging Face model name or local path
+            backend (str): Inference backend, see model_backends.BACKENDS
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.model = None
+        self.tokenizer = None
+        self.state = STATE_IDLE
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def load(self):
+        """
+        Loads the model in the calling thread. Safe to call from several
+        threads at once; only the first call does the work.
+        Returns:
+            bool: True if the model is ready
+        """
+        with self._lock:
+            if self.state == STATE_READY:
+                return True
+            self.state = STATE_LOADING
+            started = time.time()
+            try:
+                # Backends import transformers lazily so the web process starts without it
+                model, tokenizer = load_model(self.backend, self.model_name)
+
+                self.model = model
+                self.tokenizer = tokenizer
+                self.error = None
+                self.state = STATE_READY
+            except Exception as e:
+                print(f"GPT-2 load error: {str(e)}")
+                self.error = str(e)
+                self.state = STATE_FAILED
+            self.load_seconds = round(time.time() - started, 2)
+            return self.state == STATE_READY
+
+    def warm_up(self):
+        """
+        Starts loading the model on a daemon thread if it is not loaded or
+        already loading. Returns immediately.
+        """
+        if self.state in (STATE_READY, STATE_LOADING):
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.load, name="gpt2-warmup", daemon=True)
+        self._thread.start()
+
+    def is_ready(self):
+        return self.state == STATE_READY
+
+    def get(self):
+        """
+        Returns the loaded model and tokenizer without blocking.
+        Returns:
+            tuple: (model, tokenizer), or (None, None) while not ready
+        """
+        if self.state != STATE_READY:
+            return None, None
+        return self.model, self.tokenizer
+
+    def status(self):
+        """
+        Returns:
+            dict: Readiness information for health checks
+        """
+        return {
+            'model': self.model_name,
+            'backend': self.backend,
+            'state': self.state,
+            'ready': self.state == STATE_READY,
+            'load_seconds': self.load_seconds,
+            'error': self.error
+        }
@@ -0,0 +1,161 @@
+import base64
+import json
+from collections import namedtuple
+
+import MySQLdb.cursors
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# select: query without WHERE/ORDER BY; key: (unique tie-breaker column, its row key);
+# sorts: sort name -> (indexed SQL column, row key holding its value);
+# access: 'admin', 'user' (logged in) or 'public'
+ListSpec = namedtuple('ListSpec', ['select', 'key', 'sorts', 'default_sort', 'default_direction', 'access'])
+
+LISTS = {
+    'books': ListSpec(
+        select="""
+            SELECT b.bookid, b.name, b.authorid, b.categoryid, b.status, b.isbn, b.added_on, b.updated_on,
+                   a.name as author_name, c.name as category_name, p.name as publisher_name, b.pdf_path, b.picture,
+                   b.name_sort
+            FROM book b
+            LEFT JOIN author a ON b.authorid = a.authorid
+            LEFT JOIN category c ON b.categoryid = c.categoryid
+            LEFT JOIN publisher p ON b.publisherid = p.publisherid
+        """,
+        key=('b.bookid', 'bookid'),
+        sorts={'id': ('b.bookid', 'bookid'), 'name': ('b.name_sort', 'name_sort'), 'isbn': ('b.isbn', 'isbn'), 'status': ('b.status', 'status'), 'added_on': ('b.added_on', 'added_on'), 'updated_on': ('b.updated_on', 'updated_on')},
+        default_sort='id', default_direction='asc', access='admin'),
+    'users': ListSpec(
+        select="SELECT u.id, u.first_name, u.last_name, u.email, u.role FROM user u",
+        key=('u.id', 'id'),
+        sorts={'id': ('u.id', 'id'), 'name': ('u.first_name', 'first_name'), 'email': ('u.email', 'email'), 'role': ('u.role', 'role')},
+        default_sort='id', default_direction='asc', access='admin'),
+    'issue_books': ListSpec(
+        select="""
+            SELECT issued_book.issuebookid, issued_book.issue_date_time, issued_book.expected_return_date,
+                   issued_book.return_date_time, issued_book.status, book.name AS book_name, book.isbn,
+                   user.first_name, user.last_name
+            FROM issued_book
+            LEFT JOIN book ON book.bookid = issued_book.bookid
+            LEFT JOIN user ON user.id = issued_book.userid
+        """,
+        key=('issued_book.issuebookid', 'issuebookid'),
+        sorts={'id': ('issued_book.issuebookid', 'issuebookid'), 'issued': ('issued_book.issue_date_time', 'issue_date_time'), 'expected': ('issued_book.expected_return_date', 'expected_return_date'), 'status': ('issued_book.status', 'status')},
+        default_sort='id', default_direction='desc', access='admin'),
+    'categories': ListSpec(
+        select="SELECT categoryid, name, status FROM category",
+        key=('categoryid', 'categoryid'),
+        sorts={'id': ('categoryid', 'categoryid'), 'name': ('name', 'name'), 'status': ('status', 'status')},
+        default_sort='id', default_direction='asc', access='admin'),
+    'authors': ListSpec(
+        select="SELECT authorid, name, status FROM author",
+        key=('authorid', 'authorid'),
+        sorts={'id': ('authorid', 'authorid'), 'name': ('name', 'name'), 'status': ('status', 'status')},
+        default_sort='id', default_direction='asc', access='admin'),
+    'publishers': ListSpec(
+        select="SELECT publisherid, name, status FROM publisher",
+        key=('publisherid', 'publisherid'),
+        sorts={'id': ('publisherid', 'publisherid'), 'name': ('name', 'name'), 'status': ('status', 'status')},
+        default_sort='id', default_direction='asc', access='admin'),
+    'queries': ListSpec(
+        select="SELECT id, book_request, description FROM queries",
+        key=('id', 'id'),
+        sorts={'id': ('id', 'id')},
+        default_sort='id', default_direction='desc', access='user'),
+    'reviews': ListSpec(
+        select="""
+            SELECT r.id, r.review, r.rating, r.created_on, u.first_name, b.name as book_name
+            FROM reviews r
+            JOIN user u ON r.user_id = u.id
+            JOIN book b ON r.book_id = b.bookid
+        """,
+        key=('r.id', 'id'),
+        sorts={'id': ('r.id', 'id'), 'created_on': ('r.created_on', 'created_on'), 'rating': ('r.rating', 'rating')},
+        default_sort='created_on', default_direction='desc', access='public')
+}
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid page cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("Invalid page cursor")
+    return values
+
+
+def fetch_page(mysql, name, sort=None, direction=None, after=None, limit=None):
+    """
+    Reads one page of a list, continuing after the row a cursor points at
+    (keyset pagination: no OFFSET, so every page costs the same).
+    Args:
+        mysql: MySQL database connection
+        name (str): Key of LISTS
+        sort (str): Sort name from the list's sorts (default sort if unknown)
+        direction (str): 'asc' or 'desc'
+        after (str): next_cursor of the previous page, or None for the first page
+        limit (int): Rows per page, capped at MAX_PAGE_SIZE
+    Returns:
+        dict: items, next_cursor (None on the last page), has_more, sort,
+            direction and limit
+    Raises:
+        ValueError: The cursor is malformed
+    """
+    spec = LISTS[name]
+    sort = sort if sort in spec.sorts else spec.default_sort
+    direction = direction if direction in ('asc', 'desc') else spec.default_direction
+    limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    sort_expression, sort_column = spec.sorts[sort]
+    key_expression, key_column = spec.key
+    operator = '>' if direction == 'asc' else '<'
+
+    query = spec.select
+    params = []
+    if after:
+        sort_value, key_value = decode_cursor(after)
+        if sort_expression == key_expression:
+            query += f" WHERE {key_expression} {operator} %s"
+            params.append(key_value)
+        elif sort_value is None:
+            # MySQL sorts NULL first: ascending, the non-null values follow; descending, nothing does
+            following = f" OR {sort_expression} IS NOT NULL" if direction == 'asc' else ''
+            query += (f" WHERE (({sort_expression} IS NULL AND {key_expression} {operator} %s)"
+                      f"{following})")
+            params.append(key_value)
+        else:
+            # Rows past (sort_value, key_value) in (sort, key) order; descending, the NULLs come last
+            following = '' if direction == 'asc' else f" OR {sort_expression} IS NULL"
+            query += (f" WHERE ({sort_expression} {operator} %s"
+                      f" OR ({sort_expression} = %s AND {key_expression} {operator} %s){following})")
+            params.extend([sort_value, sort_value, key_value])
+    query += (f" ORDER BY {sort_expression} {direction.upper()}, {key_expression} {direction.upper()}"
+              f" LIMIT %s")
+    params.append(limit + 1)  # One extra row tells whether another page exists
+
+    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    try:
+        cursor.execute(query, params)
+        rows = list(cursor.fetchall())
+    finally:
+        cursor.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([last[sort_column], last[key_column]])
+    return {
+        'items': rows,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'sort': sort,
+        'direction': direction,
+        'limit': limit
+    }
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by get() when there is no fresh entry (None is a valid cached value)
+MISS = object()
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache for chatbot answers, keyed on (intent, normalized query)
+    with a separate time-to-live for each intent.
+    """
+
+    def __init__(self, max_entries=512, ttls=None, default_ttl=60, catalog_intents=()):
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used is evicted
+            ttls (dict): Seconds to keep an answer, per intent
+            default_ttl (int): Seconds for intents missing from ttls
+            catalog_intents (iterable): Intents built from the book tables,
+                dropped by invalidate_catalog()
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.catalog_intents = set(catalog_intents)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, intent, key):
+        """
+        Returns:
+            The cached value, or MISS if absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get((intent, key))
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[(intent, key)]
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end((intent, key))
+            self.hits += 1
+            return entry[1]
+
+    def set(self, intent, key, value):
+        ttl = self.ttls.get(intent, self.default_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[(intent, key)] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end((intent, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, intent, key, compute, cacheable=None):
+        """
+        Returns the cached value or computes and stores it.
+        Args:
+            intent (str): Intent the answer belongs to
+            key (str): Normalized query for that intent
+            compute (callable): Produces the value on a miss
+            cacheable (callable): Optional check; values it rejects are not stored
+        Returns:
+            The cached or freshly computed value
+        """
+        value = self.get(intent, key)
+        if value is not MISS:
+            return value
+        value = compute()
+        if cacheable is None or cacheable(value):
+            self.set(intent, key, value)
+        return value
+
+    def invalidate(self, intents=None):
+        """
+        Drops cached answers.
+        Args:
+            intents (iterable): Intents to drop; all entries if None
+        """
+        with self._lock:
+            if intents is None:
+                self._entries.clear()
+                return
+            intents = set(intents)
+            for cache_key in [k for k in self._entries if k[0] in intents]:
+                del self._entries[cache_key]
+
+    def invalidate_catalog(self):
+        """Drops every answer that was built from the book tables."""
+        self.invalidate(self.catalog_intents)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,438 @@
+"""
+Semantic book search: sentence embeddings of each book's metadata (and,
+where available, extracted text) kept in one NumPy matrix, searched with a
+single matrix-vector product on CPU.
+
+The embedding model is read from a local directory only. Fetch it once with
+
+    python semantic_search.py download-model
+
+and measure query latency on a synthetic catalog with
+
+    python semantic_search.py benchmark --books 100000
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import MySQLdb.cursors
+import numpy as np
+
+from catalog_search import CATALOG_QUERY
+
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+EMBEDDING_MODEL_DIR = os.path.join('models', 'all-MiniLM-L6-v2')
+EMBEDDINGS_PATH = os.path.join('cache', 'book_embeddings.npz')
+
+# Characters of extracted book text added to the metadata before embedding
+EXTRA_TEXT_CHARS = 1000
+
+
+class Embedder:
+    """
+    Mean-pooled, L2-normalised sentence embeddings from a local
+    transformers model, loaded on first use.
+    """
+
+    def __init__(self, model_dir=EMBEDDING_MODEL_DIR, batch_size=64, max_length=256):
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.error = None
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return os.path.isdir(self.model_dir)
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from transformers import AutoModel, AutoTokenizer
+
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_dir, local_files_only=True)
+                model = AutoModel.from_pretrained(self.model_dir, local_files_only=True)
+                model.eval()
+                self._model = model
+        return self._model, self._tokenizer
+
+    def encode(self, texts):
+        """
+        Args:
+            texts (list): Strings to embed
+        Returns:
+            numpy.ndarray: float32 matrix, one unit-length row per text
+        """
+        import torch
+
+        model, tokenizer = self._load()
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            inputs = tokenizer(texts[start:start + self.batch_size], padding=True, truncation=True,
+                               max_length=self.max_length, return_tensors='pt')
+            with torch.no_grad():
+                hidden = model(**inputs).last_hidden_state
+            mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            batches.append(torch.nn.functional.normalize(pooled, dim=1).numpy())
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(batches).astype(np.float32, copy=False)
+
+
+def book_text(row, extra_text=''):
+    """
+    Text embedded for one book.
+    """
+    parts = [row.get('name') or '']
+    if row.get('author_name'):
+        parts.append(f"by {row['author_name']}")
+    if row.get('genre_name'):
+        parts.append(f"Genre: {row['genre_name']}")
+    if row.get('publisher_name'):
+        parts.append(f"Publisher: {row['publisher_name']}")
+    if extra_text:
+        parts.append(extra_text[:EXTRA_TEXT_CHARS])
+    return '. '.join(parts)
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SemanticIndex:
+    """
+    Book embeddings in a contiguous float32 matrix (one unit-length row per
+    book), so a query is one matrix-vector product plus argpartition.
+    Books are re-embedded only when their text changes; the matrix is saved
+    as float16 between restarts.
+    """
+
+    def __init__(self, embedder, path=EMBEDDINGS_PATH, max_age=600, extra_text=None):
+        """
+        Args:
+            embedder (Embedder): Produces the vectors
+            path (str): File the embeddings are saved to
+            max_age (int): Seconds between checks of the catalog for changes
+            extra_text (callable): bookid -> extra text to embed (e.g. PDF text)
+        """
+        self.embedder = embedder
+        self.path = path
+        self.max_age = max_age
+        self.extra_text = extra_text
+        self.synced_at = None
+        self.docs = {}
+        self._vectors = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hashes = []
+        self._count = 0
+        self._positions = {}
+        self._dirty = False
+        self._syncing = False
+        self._lock = threading.RLock()
+        self._file_loaded = False
+
+    def is_available(self):
+        return self.embedder.is_available()
+
+    def status(self):
+        return {
+            'available': self.is_available(),
+            'books': self._count,
+            'syncing': self._syncing,
+            'error': self.embedder.error
+        }
+
+    # Matrix maintenance
+
+    def _put(self, bookid, vector, digest):
+        position = self._positions.get(bookid)
+        if position is None:
+            if self._vectors is None:
+                self._vectors = np.zeros((64, vector.shape[0]), dtype=np.float32)
+                self._ids = np.zeros(64, dtype=np.int64)
+            elif self._count == self._vectors.shape[0]:
+                # Grow by doubling so appends stay amortised O(1)
+                self._vectors = np.resize(self._vectors, (self._count * 2, self._vectors.shape[1]))
+                self._ids = np.resize(self._ids, self._count * 2)
+            position = self._count
+            self._count += 1
+            self._positions[bookid] = position
+            self._hashes.append(digest)
+        else:
+            self._hashes[position] = digest
+        self._vectors[position] = vector
+        self._ids[position] = bookid
+        self._dirty = True
+
+    def _delete(self, bookid):
+        # Move the last row into the gap so the matrix stays contiguous
+        position = self._positions.pop(bookid, None)
+        if position is None:
+            return
+        last = self._count - 1
+        if position != last:
+            moved = int(self._ids[last])
+            self._vectors[position] = self._vectors[last]
+            self._ids[position] = moved
+            self._hashes[position] = self._hashes[last]
+            self._positions[moved] = position
+        self._hashes.pop()
+        self._count -= 1
+        self.docs.pop(bookid, None)
+        self._dirty = True
+
+    def _text_for(self, row):
+        extra = self.extra_text(int(row['bookid'])) if self.extra_text else ''
+        return book_text(row, extra or '')
+
+    def _embed_rows(self, rows, texts=None):
+        if not rows:
+            return
+        if texts is None:
+            texts = [self._text_for(row) for row in rows]
+        vectors = self.embedder.encode(texts)
+        with self._lock:
+            for row, text, vector in zip(rows, texts, vectors):
+                bookid = int(row['bookid'])
+                self.docs[bookid] = dict(row)
+                self._put(bookid, vector, text_hash(text))
+
+    # Persistence
+
+    def _load_file(self):
+        self._file_loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                if str(data['model']) != self.embedder.model_dir:
+                    return  # Vectors from another model are not comparable
+                vectors = data['vectors'].astype(np.float32)
+                ids = data['ids']
+                hashes = list(data['hashes'])
+                # Book rows, one per id, so search works before the first sync
+                docs = json.loads(str(data['docs'])) if 'docs' in data.files else [None] * len(ids)
+        except Exception as e:
+            print(f"Could not read saved embeddings: {str(e)}")
+            return
+        with self._lock:
+            self._vectors = vectors
+            self._ids = ids.astype(np.int64)
+            self._hashes = [str(digest) for digest in hashes]
+            self._count = len(ids)
+            self._positions = {int(bookid): position for position, bookid in enumerate(ids)}
+            self.docs = {int(bookid): doc for bookid, doc in zip(ids, docs) if doc is not None}
+            self._dirty = False
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or self._vectors is None:
+                return
+            vectors = self._vectors[:self._count].astype(np.float16)
+            ids = self._ids[:self._count].copy()
+            hashes = np.array(self._hashes, dtype='U40')
+            docs = json.dumps([self.docs.get(int(bookid)) for bookid in ids], default=str)
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = self.path + '.tmp.npz'
+        np.savez(temporary_path, vectors=vectors, ids=ids, hashes=hashes, docs=np.array(docs),
+                 model=np.array(self.embedder.model_dir))
+        os.replace(temporary_path, self.path)
+
+    # Catalog synchronisation
+
+    def ensure_loaded(self, mysql):
+        """
+        Reads the catalog when it has not been checked for max_age seconds
+        and embeds new or changed books on a background thread. Searches keep
+        using the current vectors meanwhile.
+        """
+        if not self._file_loaded:
+            with self._lock:
+                if not self._file_loaded:
+                    self._load_file()
+        if self._syncing or (self.synced_at is not None and time.time() - self.synced_at <= self.max_age):
+            return
+        if not self.is_available():
+            return
+        # The query runs here because the connection belongs to this request
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            cursor.execute(CATALOG_QUERY)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        self.synced_at = time.time()
+        self._syncing = True
+        threading.Thread(target=self._sync, args=(rows,), name="semantic-sync", daemon=True).start()
+
+    def _sync(self, rows):
+        try:
+            # Texts are built before taking the lock: extra_text may query the database per book
+            texts = [self._text_for(row) for row in rows]
+            changed = []
+            changed_texts = []
+            with self._lock:
+                current = set()
+                for row, text in zip(rows, texts):
+                    bookid = int(row['bookid'])
+                    current.add(bookid)
+                    position = self._positions.get(bookid)
+                    if position is not None and self._hashes[position] == text_hash(text):
+                        if bookid not in self.docs:
+                            self._dirty = True  # Saved before rows were kept with the vectors
+                        self.docs[bookid] = dict(row)
+                    else:
+                        changed.append(row)
+                        changed_texts.append(text)
+                for bookid in list(self._positions):
+                    if bookid not in current:
+                        self._delete(bookid)
+            for start in range(0, len(changed), 512):
+                self._embed_rows(changed[start:start + 512], changed_texts[start:start + 512])
+            self.save()
+            if changed:
+                print(f"Semantic index: embedded {len(changed)} books")
+        except Exception as e:
+            self.embedder.error = str(e)
+            print(f"Semantic index sync error: {str(e)}")
+        finally:
+            self._syncing = False
+
+    def refresh_book(self, mysql, bookid):
+        """
+        Re-embeds one book after it was added or edited.
+        """
+        if self._count == 0 or not self.is_available():
+            return  # The next sync embeds everything
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            cursor.execute(CATALOG_QUERY + " WHERE b.bookid = %s", (bookid,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if row is None:
+            self.remove_book(bookid)
+            return
+        try:
+            self._embed_rows([row])
+        except Exception as e:
+            print(f"Semantic index update error: {str(e)}")
+
+    def remove_book(self, bookid):
+        with self._lock:
+            self._delete(int(bookid))
+
+    def mark_stale(self):
+        """Re-checks the whole catalog on the next search."""
+        self.synced_at = None
+
+    # Querying
+
+    def top_k(self, query_vector, k=10):
+        """
+        Returns:
+            list: (bookid, cosine similarity) pairs, best first
+        """
+        with self._lock:
+            if self._count == 0:
+                return []
+            scores = self._vectors[:self._count] @ query_vector
+            k = min(k, self._count)
+            if k < self._count:
+                best = np.argpartition(-scores, k - 1)[:k]
+            else:
+                best = np.arange(self._count)
+            best = best[np.argsort(-scores[best])]
+            return [(int(self._ids[position]), float(scores[position])) for position in best]
+
+    def search(self, query, k=10, min_score=0.2):
+        """
+        Args:
+            query (str): Free-text description of what the reader wants
+            k (int): Maximum number of results
+            min_score (float): Lowest cosine similarity returned
+        Returns:
+            list: Book rows (dicts) with a 'score' key, best first
+        """
+        if not query or not query.strip() or self._count == 0:
+            return []
+        query_vector = self.embedder.encode([query.strip()])[0]
+        results = []
+        for bookid, score in self.top_k(query_vector, k):
+            if score < min_score:
+                break
+            doc = self.docs.get(bookid)
+            if doc is not None:
+                results.append(dict(doc, score=round(score, 4)))
+        return results
+
+
+def benchmark(books, queries, dimensions, k, embedder=None):
+    index = SemanticIndex(Embedder(model_dir=''), path='')
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((books, dimensions), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    started = time.perf_counter()
+    for bookid, vector in enumerate(vectors, 1):
+        index._put(bookid, vector, '')
+    print(f"Inserted {books} vectors in {time.perf_counter() - started:.2f}s "
+          f"({index._vectors[:index._count].nbytes / 1e6:.0f} MB float32, "
+          f"{index._count * dimensions * 2 / 1e6:.0f} MB on disk as float16)")
+
+    query_vectors = rng.standard_normal((queries, dimensions), dtype=np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    timings = []
+    for query_vector in query_vectors:
+        started = time.perf_counter()
+        index.top_k(query_vector, k)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"Top-{k} search over {books} books: p50 {timings[len(timings) // 2]:.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)]:.2f} ms")
+
+    started = time.perf_counter()
+    for bookid in range(1, 1001):
+        index._delete(bookid)
+    print(f"Removed 1000 books in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    if embedder is not None and embedder.is_available():
+        embedder.encode(["warm up"])
+        started = time.perf_counter()
+        for _ in range(20):
+            embedder.encode(["beginner coding book"])
+        print(f"Query embedding: {(time.perf_counter() - started) / 20 * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic book search tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    download = subparsers.add_parser('download-model', help="Save the embedding model locally")
+    download.add_argument('--model', default=EMBEDDING_MODEL, help="Hugging Face model name")
+    download.add_argument('--output', default=EMBEDDING_MODEL_DIR, help="Directory to write")
+    bench = subparsers.add_parser('benchmark', help="Measure top-k latency on random vectors")
+    bench.add_argument('--books', type=int, default=100000)
+    bench.add_argument('--queries', type=int, default=200)
+    bench.add_argument('--dimensions', type=int, default=384)
+    bench.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == 'download-model':
+        from transformers import AutoModel, AutoTokenizer
+
+        AutoTokenizer.from_pretrained(args.model).save_pretrained(args.output)
+        AutoModel.from_pretrained(args.model).save_pretrained(args.output)
+        print(f"Saved {args.model} to {args.output}")
+    elif args.command == 'benchmark':
+        benchmark(args.books, args.queries, args.dimensions, args.k, embedder=Embedder())
+
+
+if __name__ == "__main__":
+    main()
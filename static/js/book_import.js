@@ -0,0 +1,52 @@
+// Bulk import form on the books page: uploads the file to /api/import/books
+// and polls the import's progress until it finishes.
+function showImportProgress(text) {
+    document.getElementById('importProgress').textContent = text;
+}
+
+function pollImport(statusUrl) {
+    fetch(statusUrl, { cache: 'no-store' })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                showImportProgress(data.error);
+                return;
+            }
+            const progress = data.progress;
+            let text = `${progress.imported} imported, ${progress.skipped} duplicate, ${progress.failed} failed`;
+            if (!progress.done) {
+                showImportProgress(`${text} (${progress.rows_read} read)...`);
+                setTimeout(() => pollImport(statusUrl), 1000);
+                return;
+            }
+            if (progress.error) {
+                text += ` - stopped: ${progress.error}`;
+            }
+            showImportProgress(text);
+            if (progress.errors_url) {
+                const link = document.createElement('a');
+                link.href = progress.errors_url;
+                link.textContent = ' Download rejected rows';
+                document.getElementById('importProgress').appendChild(link);
+            }
+        })
+        .catch(error => console.error('Error checking import:', error));
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.getElementById('importForm');
+    form.addEventListener('submit', event => {
+        event.preventDefault();
+        showImportProgress('Uploading...');
+        fetch('/api/import/books', { method: 'POST', body: new FormData(form) })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    pollImport(data.status_url);
+                } else {
+                    showImportProgress(data.error);
+                }
+            })
+            .catch(error => console.error('Error starting import:', error));
+    });
+});
@@ -1,31 +1,64 @@
-function updateDashboardStats() {
-    fetch('/api/dashboard-stats')
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                const stats = data.stats;
-                
-                // Update the dashboard numbers with animation
-                updateNumberWithAnimation('.total-books', stats.total_books);
-                updateNumberWithAnimation('.available-books', stats.available_books);
-                updateNumberWithAnimation('.returned-books', stats.returned_books);
-                updateNumberWithAnimation('.issued-books', stats.issued_books);
-            } else {
-                console.error('Error fetching stats:', data.error);
-                if (data.error === 'Unauthorized access') {
-                    window.location.href = '/';
-                }
+function applyStats(stats) {
+    // Deltas only carry the counts that changed
+    if ('total_books' in stats) updateNumberWithAnimation('.total-books', stats.total_books);
+    if ('available_books' in stats) updateNumberWithAnimation('.available-books', stats.available_books);
+    if ('returned_books' in stats) updateNumberWithAnimation('.returned-books', stats.returned_books);
+    if ('issued_books' in stats) updateNumberWithAnimation('.issued-books', stats.issued_books);
+}
+
+function updateDashboardStats(etag) {
+    // Long-poll fallback: the server holds the request until the stats change
+    const headers = etag ? { 'If-None-Match': etag } : {};
+    fetch('/api/dashboard-stats?wait=25', { headers: headers, cache: 'no-store' })
+        .then(response => {
+            // Sent when the server has no thread to spare for waiting
+            const retryAfter = parseInt(response.headers.get('Retry-After')) || 0;
+            if (response.status === 304) {
+                setTimeout(() => updateDashboardStats(etag), retryAfter * 1000);
+                return;
             }
+            const newEtag = response.headers.get('ETag');
+            return response.json().then(data => {
+                if (data.success) {
+                    applyStats(data.stats);
+                    setTimeout(() => updateDashboardStats(newEtag), retryAfter * 1000);
+                } else {
+                    console.error('Error fetching stats:', data.error);
+                    if (data.error === 'Unauthorized access') {
+                        window.location.href = '/';
+                        return;
+                    }
+                    setTimeout(() => updateDashboardStats(), 30000);
+                }
+            });
         })
         .catch(error => {
             console.error('Error updating dashboard:', error);
+            setTimeout(() => updateDashboardStats(etag), 30000);
         });
 }
 
+function connectDashboardStream() {
+    if (!window.EventSource) {
+        updateDashboardStats();
+        return;
+    }
+
+    const source = new EventSource('/api/dashboard-stream');
+    source.addEventListener('stats', event => applyStats(JSON.parse(event.data)));
+    source.addEventListener('delta', event => applyStats(JSON.parse(event.data)));
+    source.onerror = () => {
+        // EventSource retries on its own; fall back to long-polling if it gave up
+        if (source.readyState === EventSource.CLOSED) {
+            updateDashboardStats();
+        }
+    };
+}
+
 function updateNumberWithAnimation(selector, newValue) {
     const element = document.querySelector(selector);
     const oldValue = parseInt(element.textContent) || 0;
-    
+
     if (oldValue !== newValue) {
         element.classList.add('number-updated');
         element.textContent = newValue;
@@ -33,8 +66,5 @@ function updateNumberWithAnimation(selector, newValue) {
     }
 }
 
-// Update stats every 30 seconds
-setInterval(updateDashboardStats, 30000);
-
-// Initial update when page loads
-document.addEventListener('DOMContentLoaded', updateDashboardStats);
\ No newline at end of file
+// Stats are pushed by the server when they change
+document.addEventListener('DOMContentLoaded', connectDashboardStream);
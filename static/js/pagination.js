@@ -0,0 +1,35 @@
+// "Load more" buttons from the load_more macro in templates/pagination.html.
+// Each click fetches the next page of rows from /api/list/<name>, already
+// rendered, and appends it to the element named by data-target.
+function loadMore(button) {
+    const params = new URLSearchParams({
+        after: button.dataset.cursor,
+        sort: button.dataset.sort,
+        direction: button.dataset.direction,
+        limit: button.dataset.limit,
+        format: 'html'
+    });
+    button.disabled = true;
+    fetch(`/api/list/${button.dataset.list}?${params}`, { cache: 'no-store' })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                console.error('Error loading page:', data.error);
+                return;
+            }
+            document.getElementById(button.dataset.target).insertAdjacentHTML('beforeend', data.html);
+            if (data.next_cursor) {
+                button.dataset.cursor = data.next_cursor;
+            } else {
+                button.parentNode.remove();
+            }
+        })
+        .catch(error => console.error('Error loading page:', error))
+        .finally(() => { button.disabled = false; });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('.load-more').forEach(button => {
+        button.addEventListener('click', () => loadMore(button));
+    });
+});
@@ -0,0 +1,34 @@
+// Typeahead for text inputs with a data-suggest-type attribute.
+// Suggestions come from /api/suggest into the input's <datalist>; when one is
+// picked, its id goes into the hidden input named by data-target.
+$(document).ready(function(){
+
+	$('input[data-suggest-type]').each(function(){
+		var input = $(this);
+		var list = $('#' + input.attr('list'));
+		var target = $('#' + input.data('target'));
+		var ids = {};
+		var timer = null;
+
+		input.on('input', function(){
+			var value = input.val();
+			// A picked suggestion matches one of the labels exactly
+			target.val(ids[value] || '');
+			clearTimeout(timer);
+			if (!value.trim() || ids[value]) {
+				return;
+			}
+			timer = setTimeout(function(){
+				$.getJSON('/api/suggest', {q: value, type: input.data('suggest-type'), limit: 10}, function(suggestions){
+					ids = {};
+					list.empty();
+					$.each(suggestions, function(i, suggestion){
+						var label = suggestion.detail ? suggestion.label + ' (' + suggestion.detail + ')' : suggestion.label;
+						ids[label] = suggestion.id;
+						list.append($('<option>').attr('value', label));
+					});
+				});
+			}, 150);
+		});
+	});
+});
@@ -0,0 +1,208 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+
+import MySQLdb.cursors
+
+# Rows loaded for each suggestion type: id, label and a popularity count
+SUGGEST_QUERIES = {
+    'book': ("""
+        SELECT b.bookid AS id, b.name AS label, COUNT(i.issuebookid) AS popularity
+        FROM book b
+        LEFT JOIN issued_book i ON i.bookid = b.bookid
+        {where}
+        GROUP BY b.bookid, b.name
+    """, "WHERE b.bookid = %s"),
+    'author': ("""
+        SELECT a.authorid AS id, a.name AS label, COUNT(b.bookid) AS popularity
+        FROM author a
+        LEFT JOIN book b ON b.authorid = a.authorid
+        {where}
+        GROUP BY a.authorid, a.name
+    """, "WHERE a.authorid = %s"),
+    'user': ("""
+        SELECT u.id AS id, CONCAT_WS(' ', u.first_name, u.last_name) AS label,
+               u.email AS detail, COUNT(i.issuebookid) AS popularity
+        FROM user u
+        LEFT JOIN issued_book i ON i.userid = u.id
+        {where}
+        GROUP BY u.id, u.first_name, u.last_name, u.email
+    """, "WHERE u.id = %s")
+}
+
+# Prefixes up to this length have many matches, so their top-N is memoised
+MEMO_PREFIX_LENGTH = 3
+
+# Sorts after every character a key can contain
+KEY_END = '\U0010ffff'
+
+
+def suggest_keys(label, detail=None):
+    """
+    Keys a suggestion is reachable from: the whole label and each word in it
+    ("rowling" finds "J. K. Rowling"), plus the detail (e.g. a user's email).
+    """
+    text = (label or '').lower().strip()
+    keys = {text} if text else set()
+    keys.update(re.findall(r'\w+', text))
+    if detail:
+        keys.add(detail.lower())
+    return keys
+
+
+class SuggestIndex:
+    """
+    Typeahead suggestions from a sorted array of (key, id) pairs per type.
+    A prefix lookup is two bisections; the matching range is ranked by
+    popularity with a bounded heap, and short prefixes are memoised.
+    """
+
+    def __init__(self, max_age=600):
+        """
+        Args:
+            max_age (int): Seconds before a full reload, which also picks up
+                changes made outside this process
+        """
+        self.max_age = max_age
+        self.loaded_at = None
+        self._lock = threading.RLock()
+        self._entries = {kind: {} for kind in SUGGEST_QUERIES}
+        self._keys = {kind: [] for kind in SUGGEST_QUERIES}
+        self._memo = {}
+
+    # Loading and incremental updates
+
+    def ensure_loaded(self, mysql):
+        if self.loaded_at is None or time.time() - self.loaded_at > self.max_age:
+            self.load(mysql)
+
+    def _fetch(self, mysql, kind, item_id=None):
+        query, where = SUGGEST_QUERIES[kind]
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            if item_id is None:
+                cursor.execute(query.format(where=''))
+            else:
+                cursor.execute(query.format(where=where), (item_id,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def load(self, mysql):
+        rows = {kind: self._fetch(mysql, kind) for kind in SUGGEST_QUERIES}
+        with self._lock:
+            for kind, kind_rows in rows.items():
+                entries = {}
+                keys = []
+                for row in kind_rows:
+                    entries[int(row['id'])] = (row['label'], row.get('detail'), int(row['popularity']))
+                    keys.extend((key, int(row['id'])) for key in suggest_keys(row['label'], row.get('detail')))
+                keys.sort()
+                self._entries[kind] = entries
+                self._keys[kind] = keys
+            self._memo.clear()
+            self.loaded_at = time.time()
+
+    def mark_stale(self):
+        """Forces a full reload on the next lookup."""
+        self.loaded_at = None
+
+    def refresh(self, mysql, kind, item_id):
+        """
+        Re-reads one book, author or user after it was added or edited.
+        """
+        if self.loaded_at is None or not item_id:
+            return  # Nothing loaded yet; the first lookup loads everything
+        rows = self._fetch(mysql, kind, item_id)
+        with self._lock:
+            self._remove(kind, int(item_id))
+            for row in rows:
+                self._add(kind, int(row['id']), row['label'], row.get('detail'), int(row['popularity']))
+
+    def remove(self, kind, item_id):
+        with self._lock:
+            self._remove(kind, int(item_id))
+
+    def bump(self, kind, item_id, amount=1):
+        """Raises an item's popularity (e.g. when a book is issued)."""
+        with self._lock:
+            entry = self._entries[kind].get(int(item_id))
+            if entry is not None:
+                label, detail, popularity = entry
+                self._entries[kind][int(item_id)] = (label, detail, popularity + amount)
+                self._merge_into_memo(kind, int(item_id))
+
+    def _add(self, kind, item_id, label, detail, popularity):
+        self._entries[kind][item_id] = (label, detail, popularity)
+        for key in suggest_keys(label, detail):
+            bisect.insort(self._keys[kind], (key, item_id))
+        self._merge_into_memo(kind, item_id)
+
+    def _remove(self, kind, item_id):
+        entry = self._entries[kind].pop(item_id, None)
+        if entry is None:
+            return
+        keys = self._keys[kind]
+        for key in suggest_keys(entry[0], entry[1]):
+            position = bisect.bisect_left(keys, (key, item_id))
+            if position < len(keys) and keys[position] == (key, item_id):
+                del keys[position]
+        # Lists that held the item are recomputed on their next lookup
+        for memo_key in [memo_key for memo_key, best in self._memo.items()
+                         if memo_key[0] == kind and item_id in best]:
+            del self._memo[memo_key]
+
+    def _rank(self, kind):
+        entries = self._entries[kind]
+        return lambda item_id: (-entries[item_id][2], entries[item_id][0])
+
+    def _merge_into_memo(self, kind, item_id):
+        # An added or more popular item can only enter a memoised top-N list
+        label, detail, _ = self._entries[kind][item_id]
+        keys = suggest_keys(label, detail)
+        for memo_key, best in list(self._memo.items()):
+            memo_kind, prefix, limit = memo_key
+            if memo_kind == kind and any(key.startswith(prefix) for key in keys):
+                candidates = set(best)
+                candidates.add(item_id)
+                self._memo[memo_key] = heapq.nsmallest(limit, candidates, key=self._rank(kind))
+
+    # Querying
+
+    def _top(self, kind, prefix, limit):
+        memo_key = (kind, prefix, limit)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+        keys = self._keys[kind]
+        start = bisect.bisect_left(keys, (prefix,))
+        end = bisect.bisect_left(keys, (prefix + KEY_END,), start)
+        matches = {item_id for _, item_id in keys[start:end]}
+        best = heapq.nsmallest(limit, matches, key=self._rank(kind))
+        if len(prefix) <= MEMO_PREFIX_LENGTH:
+            self._memo[memo_key] = best
+        return best
+
+    def suggest(self, prefix, kinds=None, limit=10):
+        """
+        Args:
+            prefix (str): What the user has typed so far
+            kinds (list): Any of 'book', 'author', 'user' (default: all)
+            limit (int): Maximum suggestions per type
+        Returns:
+            list: {'type', 'id', 'label', 'popularity'} dicts, most popular first
+        """
+        prefix = (prefix or '').lower().strip()
+        if not prefix:
+            return []
+        suggestions = []
+        with self._lock:
+            for kind in list(SUGGEST_QUERIES) if kinds is None else kinds:
+                for item_id in self._top(kind, prefix, limit):
+                    label, detail, popularity = self._entries[kind][item_id]
+                    suggestion = {'type': kind, 'id': item_id, 'label': label, 'popularity': popularity}
+                    if detail:
+                        suggestion['detail'] = detail
+                    suggestions.append(suggestion)
+        return suggestions
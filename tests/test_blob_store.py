@@ -0,0 +1,100 @@
+import io
+import os
+
+import pytest
+
+pytest.importorskip('MySQLdb')
+pytest.importorskip('flask')
+
+import blob_store
+from blob_store import BlobStore, is_key
+
+
+class FakeCursor:
+    def __init__(self, rowcount=0):
+        self.executed = []
+        self.rowcount = rowcount
+
+    def execute(self, query, params=()):
+        self.executed.append((query, params))
+
+    def close(self):
+        pass
+
+
+class FakeMySQL:
+    def __init__(self, cursor):
+        self.fake_cursor = cursor
+        self.connection = self
+        self.commits = 0
+
+    def cursor(self, cursorclass=None):
+        return self.fake_cursor
+
+    def commit(self):
+        self.commits += 1
+
+
+class Upload:
+    # The parts of werkzeug's FileStorage that put() uses
+    def __init__(self, data, filename):
+        self.stream = io.BytesIO(data)
+        self.filename = filename
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, 'BOOKS_DIR', str(tmp_path))
+    monkeypatch.setattr(blob_store, 'STORE_DIR', str(tmp_path / 'cas'))
+    monkeypatch.setattr(blob_store, 'TMP_DIR', str(tmp_path / 'cas' / 'tmp'))
+    return BlobStore()
+
+
+def test_put_stores_content_under_its_hash(store):
+    cursor = FakeCursor()
+    key = store.put(cursor, Upload(b'%PDF-1.4 book', 'Book.PDF'))
+
+    assert is_key(key)
+    assert key.endswith('.pdf')
+    with open(store.path(key), 'rb') as f:
+        assert f.read() == b'%PDF-1.4 book'
+    query, params = cursor.executed[0]
+    assert 'refcount = refcount + 1' in query
+    assert params == (key, len(b'%PDF-1.4 book'))
+
+
+def test_identical_uploads_share_one_file(store):
+    cursor = FakeCursor()
+    first = store.put(cursor, Upload(b'same', 'a.pdf'))
+    second = store.put(cursor, Upload(b'same', 'b.pdf'))
+    assert first == second
+    assert len(cursor.executed) == 2  # Two references to one file
+
+
+def test_stored_files_are_readable_by_the_web_server(store):
+    key = store.put(FakeCursor(), Upload(b'cover', 'cover.jpg'))
+    mode = os.stat(store.path(key)).st_mode & 0o777
+    assert mode == 0o644
+
+
+def test_collect_deletes_unreferenced_files(store):
+    key = store.put(FakeCursor(), Upload(b'gone', 'gone.pdf'))
+    mysql = FakeMySQL(FakeCursor(rowcount=1))
+    store.collect(mysql, [key, 'old/path.pdf'])
+
+    assert not os.path.exists(store.path(key))
+    assert mysql.fake_cursor.executed == [
+        ("DELETE FROM stored_file WHERE file_key = %s AND refcount <= 0", (key,))]
+    assert mysql.commits == 1
+
+
+def test_collect_keeps_referenced_files(store):
+    key = store.put(FakeCursor(), Upload(b'kept', 'kept.pdf'))
+    store.collect(FakeMySQL(FakeCursor(rowcount=0)), [key])
+    assert os.path.exists(store.path(key))
+
+
+def test_release_ignores_paths_from_before_the_store(store):
+    cursor = FakeCursor()
+    store.release(cursor, 'uploads/book.pdf')
+    assert cursor.executed == []
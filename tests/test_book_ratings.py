@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+pytest.importorskip('MySQLdb')
+
+from book_ratings import RatingStore, UPSERT, remove_user_reviews
+
+
+class FakeCursor:
+    """Returns the given rows for SELECTs and records every statement."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, params=()):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+def loaded_store(summaries):
+    store = RatingStore()
+    store._summaries = {book_id: list(summary) for book_id, summary in summaries.items()}
+    store.loaded_at = time.time()
+    return store
+
+
+def test_remove_user_reviews_subtracts_each_review():
+    cursor = FakeCursor([{'book_id': 1, 'rating': 5}, {'book_id': 2, 'rating': 3}])
+    reviews = remove_user_reviews(cursor, 7)
+
+    assert reviews == [(1, 5), (2, 3)]
+    select, upserts = cursor.executed[0], cursor.executed[1:]
+    assert 'FOR UPDATE' in select[0] and select[1] == (7,)
+    assert all(query == UPSERT for query, _ in upserts)
+    assert [params for _, params in upserts] == [
+        [1, -1, -5, 0, 0, 0, 0, -1],
+        [2, -1, -3, 0, 0, -1, 0, 0],
+    ]
+
+
+def test_deleted_reviews_update_the_summaries():
+    # Book 1: a 5 and a 4; book 2: only the deleted user's 3
+    store = loaded_store({1: [2, 9, 0, 0, 0, 1, 1], 2: [1, 3, 0, 0, 1, 0, 0]})
+    for book_id, rating in remove_user_reviews(FakeCursor([{'book_id': 1, 'rating': 5},
+                                                           {'book_id': 2, 'rating': 3}]), 7):
+        store.rating_changed(book_id, rating, None)
+
+    assert store.get(1)['review_count'] == 1
+    assert store.get(1)['average'] == 4
+    assert store.get(1)['histogram']['5'] == 0
+    assert store.get(2)['review_count'] == 0
+    assert [book['book_id'] for book in store.top_rated()] == [1]
@@ -0,0 +1,75 @@
+import pytest
+
+flask = pytest.importorskip('flask')
+
+from file_delivery import send_book_file
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def app():
+    return flask.Flask(__name__)
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = tmp_path / 'book.pdf'
+    path.write_bytes(CONTENT)
+    return str(path)
+
+
+def send(app, path, headers=None):
+    with app.test_request_context('/download_pdf', headers=headers or {}):
+        response = send_book_file(path)
+        response.direct_passthrough = False
+        return response, response.get_data()
+
+
+def test_whole_file(app, book):
+    response, body = send(app, book)
+    assert response.status_code == 200
+    assert body == CONTENT
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Length'] == str(len(CONTENT))
+
+
+def test_byte_range(app, book):
+    response, body = send(app, book, {'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert body == CONTENT[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(CONTENT)}'
+    assert response.headers['Content-Length'] == '10'
+
+
+def test_suffix_range(app, book):
+    response, body = send(app, book, {'Range': 'bytes=-5'})
+    assert response.status_code == 206
+    assert body == CONTENT[-5:]
+
+
+def test_unsatisfiable_range(app, book):
+    response, _ = send(app, book, {'Range': f'bytes={len(CONTENT) + 10}-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(CONTENT)}'
+
+
+def test_matching_etag_is_not_modified(app, book):
+    etag = send(app, book)[0].headers['ETag']
+    response, body = send(app, book, {'If-None-Match': etag})
+    assert response.status_code == 304
+    assert body == b''
+
+
+def test_stale_if_range_sends_the_whole_file(app, book):
+    etag = send(app, book)[0].headers['ETag']
+    response, body = send(app, book, {'Range': 'bytes=0-9', 'If-Range': etag})
+    assert response.status_code == 206
+    response, body = send(app, book, {'Range': 'bytes=0-9', 'If-Range': '"other"'})
+    assert response.status_code == 200
+    assert body == CONTENT
+
+
+def test_explicit_etag(app, book):
+    with app.test_request_context('/download_pdf', headers={'If-None-Match': '"abc"'}):
+        assert send_book_file(book, etag='abc').status_code == 304
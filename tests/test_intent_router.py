@@ -0,0 +1,106 @@
+import pytest
+
+pytest.importorskip('MySQLdb')
+pytest.importorskip('requests')
+pytest.importorskip('numpy')
+
+import gpt2
+from intent_router import IntentRouter
+
+
+def baseline_route(message):
+    """
+    The substring if-chain generate_response used before IntentRouter.
+    Returns:
+        tuple: (intent, slot value), or None where it fell through to GPT-2
+    """
+    message = message.lower().strip()
+    if message in gpt2.predefined_responses:
+        return ('greeting', None)
+    if any(keyword in message for keyword in ['available books', 'show books', 'list books']):
+        return ('available_books', None)
+    if 'by' in message and 'books' in message:
+        return ('books_by_author', message.split('by')[-1].strip())
+    if 'find book' in message or 'search book' in message:
+        return ('book_details', message.replace('find book', '').replace('search book', '').strip())
+    if 'books in' in message:
+        return ('books_by_genre', message.replace('books in', '').strip())
+    if message.startswith(('tell me about ', 'what is ')):
+        return ('wikipedia', None)
+    if 'feedback' in message and message.replace('feedback', '').strip():
+        return ('feedback', None)
+    return None
+
+
+def route(message):
+    match = gpt2.intent_router.route(message.lower().strip())
+    if match is None:
+        return None
+    return (match.intent, next(iter(match.slots.values()), None))
+
+
+# Messages the old if-chain routed; the router must agree on the intent and slot
+BASELINE_SAMPLES = [
+    'hello',
+    'available books',
+    'show books',
+    'list books by orwell',
+    'books by george orwell',
+    'what books are by orwell',
+    'are there any books by tolkien?',
+    'books in french by dumas',
+    'find book dune',
+    'search book the hobbit',
+    'books in fantasy',
+    'tell me about python',
+    'what is machine learning',
+    'feedback the search is slow',
+]
+
+# Messages the old if-chain sent to GPT-2 and that must still fall through
+FALL_THROUGH_SAMPLES = [
+    'what are you doing',
+    'what are your opening hours',
+    'stand by me',
+    'can you write a poem',
+]
+
+
+@pytest.mark.parametrize('message', BASELINE_SAMPLES)
+def test_router_matches_baseline(message):
+    expected = baseline_route(message)
+    assert expected is not None
+    intent, slot = route(message)
+    assert intent == expected[0]
+    if expected[1] is not None:
+        assert slot.lower() == expected[1].strip(' ?!.')
+
+
+@pytest.mark.parametrize('message', FALL_THROUGH_SAMPLES)
+def test_router_falls_through_like_baseline(message):
+    assert baseline_route(message) is None
+    assert route(message) is None
+
+
+def test_author_question_goes_to_the_catalog():
+    # Used to fall through; must not be taken for a Wikipedia 'who is' question
+    assert route('who is the author of python book') == ('book_details', 'python book')
+
+
+def test_author_trigger_beats_question_prefix():
+    assert route('what is the newest book by orwell') == ('books_by_author', 'orwell')
+
+
+def test_who_is_goes_to_wikipedia():
+    assert route('who is alan turing') == ('wikipedia', 'alan turing')
+
+
+def test_typo_in_trigger_is_tolerated():
+    assert route('avialable books') == ('available_books', None)
+
+
+def test_trigger_inside_a_word_does_not_match():
+    router = IntentRouter({}, {'books_by_author': ['by']}, {'books_by_author': 'author'},
+                          context_words={'books_by_author': ['books']})
+    assert router.route('baby books') is None
+    assert router.route('books by le guin').slots == {'author': 'le guin'}
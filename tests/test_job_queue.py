@@ -0,0 +1,102 @@
+import contextlib
+import time
+
+import pytest
+
+import job_queue
+from job_queue import JobQueue, UnknownJobError
+
+
+class FakeApp:
+    def app_context(self):
+        return contextlib.nullcontext()
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return JobQueue(path=str(tmp_path / 'jobs.sqlite'))
+
+
+def run_next(jobs):
+    job = jobs._claim()
+    assert job is not None
+    jobs._run(FakeApp(), job)
+    return job['id']
+
+
+def make_due(jobs, job_id):
+    jobs._connection().execute("UPDATE jobs SET run_at = ? WHERE id = ?", (time.time(), job_id))
+
+
+def test_successful_job_stores_its_result(jobs):
+    jobs.task('add')(lambda payload: payload['a'] + payload['b'])
+    job_id = jobs.enqueue('add', {'a': 1, 'b': 2})
+    run_next(jobs)
+
+    status = jobs.status(job_id)
+    assert status['status'] == 'done'
+    assert status['attempts'] == 1
+    assert status['result'] == 3
+
+
+def test_failed_job_is_retried_with_backoff(jobs):
+    calls = []
+
+    @jobs.task('flaky', max_attempts=3)
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) < 3:
+            raise RuntimeError('try again')
+        return 'ok'
+
+    job_id = jobs.enqueue('flaky', {'n': 1})
+    before = time.time()
+    run_next(jobs)
+    status = jobs.status(job_id)
+    assert status['status'] == 'queued'
+    assert status['last_error'] == 'RuntimeError: try again'
+    # First retry waits BACKOFF_BASE seconds, less up to half for jitter
+    assert status['run_at'] >= before + job_queue.BACKOFF_BASE * 0.5
+    assert jobs._claim() is None  # Not due yet
+
+    make_due(jobs, job_id)
+    run_next(jobs)
+    make_due(jobs, job_id)
+    run_next(jobs)
+    status = jobs.status(job_id)
+    assert status['status'] == 'done'
+    assert status['attempts'] == 3
+    assert status['last_error'] is None
+    assert len(calls) == 3
+
+
+def test_job_fails_after_max_attempts(jobs):
+    @jobs.task('broken', max_attempts=2)
+    def broken(payload):
+        raise ValueError('bad payload')
+
+    job_id = jobs.enqueue('broken')
+    run_next(jobs)
+    make_due(jobs, job_id)
+    run_next(jobs)
+
+    status = jobs.status(job_id)
+    assert status['status'] == 'failed'
+    assert status['attempts'] == 2
+    assert status['last_error'] == 'ValueError: bad payload'
+    assert jobs._claim() is None
+
+
+def test_expired_lease_is_claimed_again(jobs):
+    jobs.task('slow', lease=60)(lambda payload: None)
+    job_id = jobs.enqueue('slow')
+    assert jobs._claim()['id'] == job_id
+    assert jobs._claim() is None  # Leased to the first worker
+
+    jobs._connection().execute("UPDATE jobs SET lease_until = ? WHERE id = ?", (time.time() - 1, job_id))
+    assert jobs._claim()['id'] == job_id
+
+
+def test_unknown_kind_is_refused(jobs):
+    with pytest.raises(UnknownJobError):
+        jobs.enqueue('missing')
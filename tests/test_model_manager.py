@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import model_manager
+from model_manager import ModelManager, STATE_FAILED, STATE_IDLE, STATE_LOADING, STATE_READY
+
+
+class FakeLoader:
+    """Replaces model_backends.load_model; blocks until released."""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.error = error
+
+    def __call__(self, backend, model_name):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        if self.error:
+            raise RuntimeError(self.error)
+        return f'model:{model_name}', 'tokenizer'
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    loader = FakeLoader()
+    monkeypatch.setattr(model_manager, 'load_model', loader)
+    return loader
+
+
+def test_nothing_is_loaded_until_asked(loader):
+    manager = ModelManager('gpt2')
+    assert manager.state == STATE_IDLE
+    assert not manager.is_ready()
+    assert manager.get() == (None, None)
+    assert loader.calls == 0
+
+
+def test_warm_up_loads_in_the_background(loader):
+    manager = ModelManager('gpt2')
+    manager.warm_up()  # Returns while the load is still running
+    assert loader.started.wait(5)
+    assert manager.state == STATE_LOADING
+    assert manager.get() == (None, None)
+
+    manager.warm_up()  # Already loading: no second thread
+    loader.release.set()
+    manager._thread.join(5)
+
+    assert loader.calls == 1
+    assert manager.is_ready()
+    assert manager.get() == ('model:gpt2', 'tokenizer')
+    status = manager.status()
+    assert status['state'] == STATE_READY and status['ready'] and status['error'] is None
+    assert status['load_seconds'] is not None
+
+
+def test_concurrent_loads_load_once(loader):
+    manager = ModelManager('gpt2')
+    loader.release.set()
+    threads = [threading.Thread(target=manager.load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert loader.calls == 1
+    assert manager.is_ready()
+
+
+def test_failed_load_is_reported_and_retried(monkeypatch):
+    loader = FakeLoader(error='no weights')
+    loader.release.set()
+    monkeypatch.setattr(model_manager, 'load_model', loader)
+    manager = ModelManager('gpt2')
+
+    assert manager.load() is False
+    assert manager.state == STATE_FAILED
+    assert manager.status()['error'] == 'no weights'
+    assert manager.get() == (None, None)
+
+    loader.error = None
+    manager.warm_up()  # A failed model may be warmed up again
+    manager._thread.join(5)
+    assert manager.is_ready()
+    assert loader.calls == 2
+
+
+def test_importing_the_app_starts_no_model_load():
+    for module in ('flask', 'MySQLdb', 'requests', 'numpy', 'waitress', 'PIL'):
+        pytest.importorskip(module)
+    # A fresh interpreter, so nothing imported by other tests counts
+    script = ("import threading, app, gpt2; "
+              "print(gpt2.model_manager.state, sorted(t.name for t in threading.enumerate()))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True,
+                            timeout=60, check=True).stdout.split()
+    assert output[0] == STATE_IDLE
+    assert ' '.join(output[1:]) == "['MainThread']"
@@ -0,0 +1,118 @@
+import pytest
+
+pytest.importorskip('MySQLdb')
+
+from pagination import decode_cursor, encode_cursor, fetch_page
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, params=()):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeMySQL:
+    """Stands in for PooledMySQL: every cursor returns the same rows."""
+
+    def __init__(self, rows):
+        self.fake_cursor = FakeCursor(rows)
+        self.connection = self
+
+    def cursor(self, cursorclass=None):
+        return self.fake_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(['Dune', 42])
+    assert decode_cursor(cursor) == ['Dune', 42]
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor({'a': 1}), encode_cursor([1, 2, 3])])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_first_page_reports_the_next_cursor():
+    rows = [{'bookid': i, 'name_sort': f'Book {i}'} for i in (1, 2, 3)]
+    mysql = FakeMySQL(rows)
+    page = fetch_page(mysql, 'books', sort='name', limit=2)
+
+    query, params = mysql.fake_cursor.executed[0]
+    assert 'WHERE' not in query
+    assert 'ORDER BY b.name_sort ASC, b.bookid ASC' in query
+    assert params == [3]  # One extra row to learn whether there is a next page
+    assert [row['bookid'] for row in page['items']] == [1, 2]
+    assert page['has_more']
+    assert decode_cursor(page['next_cursor']) == ['Book 2', 2]
+
+
+def test_next_page_continues_after_the_cursor():
+    mysql = FakeMySQL([{'bookid': 3, 'name_sort': 'Book 3'}])
+    page = fetch_page(mysql, 'books', sort='name', after=encode_cursor(['Book 2', 2]), limit=2)
+
+    query, params = mysql.fake_cursor.executed[0]
+    assert '(b.name_sort > %s OR (b.name_sort = %s AND b.bookid > %s))' in query
+    assert params == ['Book 2', 'Book 2', 2, 3]
+    assert not page['has_more']
+    assert page['next_cursor'] is None
+
+
+def test_descending_key_sort_compares_the_key_only():
+    mysql = FakeMySQL([])
+    fetch_page(mysql, 'issue_books', after=encode_cursor([10, 10]))
+
+    query, params = mysql.fake_cursor.executed[0]
+    assert 'WHERE issued_book.issuebookid < %s' in query
+    assert params[0] == 10
+
+
+def test_nullable_sort_uses_the_bare_column():
+    rows = [{'id': 1, 'first_name': None}, {'id': 2, 'first_name': 'Ann'}]
+    mysql = FakeMySQL(rows)
+    page = fetch_page(mysql, 'users', sort='name', limit=1)
+
+    query, _ = mysql.fake_cursor.executed[0]
+    assert 'COALESCE' not in query
+    assert 'ORDER BY u.first_name ASC, u.id ASC' in query
+    assert decode_cursor(page['next_cursor']) == [None, 1]
+
+
+def test_ascending_null_cursor_continues_into_the_non_null_values():
+    mysql = FakeMySQL([])
+    fetch_page(mysql, 'users', sort='name', direction='asc', after=encode_cursor([None, 1]))
+
+    query, params = mysql.fake_cursor.executed[0]
+    assert '((u.first_name IS NULL AND u.id > %s) OR u.first_name IS NOT NULL)' in query
+    assert params[0] == 1
+
+
+def test_descending_null_cursor_stays_among_the_nulls():
+    mysql = FakeMySQL([])
+    fetch_page(mysql, 'users', sort='email', direction='desc', after=encode_cursor([None, 5]))
+
+    query, params = mysql.fake_cursor.executed[0]
+    assert '((u.email IS NULL AND u.id < %s))' in query
+    assert params[0] == 5
+
+
+def test_descending_value_cursor_is_followed_by_the_nulls():
+    mysql = FakeMySQL([])
+    fetch_page(mysql, 'users', sort='email', direction='desc', after=encode_cursor(['b@x', 5]))
+
+    query, params = mysql.fake_cursor.executed[0]
+    assert '(u.email < %s OR (u.email = %s AND u.id < %s) OR u.email IS NULL)' in query
+    assert params[:3] == ['b@x', 'b@x', 5]
+
+
+def test_page_size_is_capped():
+    assert fetch_page(FakeMySQL([]), 'books', limit=10000)['limit'] == 200
@@ -0,0 +1,64 @@
+import pytest
+
+for module in ('flask', 'MySQLdb', 'requests', 'numpy', 'waitress', 'PIL'):
+    pytest.importorskip(module)
+
+import app as smartshelf
+from suggest_index import SuggestIndex
+
+
+class RecordingIndex:
+    def __init__(self):
+        self.kinds = None
+
+    def ensure_loaded(self, mysql):
+        pass
+
+    def suggest(self, prefix, kinds=None, limit=10):
+        self.kinds = kinds
+        return [{'type': kind, 'id': 1, 'label': prefix} for kind in kinds]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = RecordingIndex()
+    monkeypatch.setattr(smartshelf, 'suggest_index', index)
+    monkeypatch.setattr(smartshelf, 'initialized', True)  # No background threads in tests
+    return index
+
+
+def client(role=None):
+    test_client = smartshelf.app.test_client()
+    if role:
+        with test_client.session_transaction() as session:
+            session['loggedin'] = True
+            session['role'] = role
+    return test_client
+
+
+@pytest.mark.parametrize('role', [None, 'user'])
+def test_users_are_not_suggested_to_non_admins(index, role):
+    response = client(role).get('/api/suggest?q=an&type=book,user')
+    assert index.kinds == ['book']
+    assert [item['type'] for item in response.get_json()] == ['book']
+
+
+@pytest.mark.parametrize('role', [None, 'user'])
+def test_user_only_request_returns_nothing_for_non_admins(index, role):
+    response = client(role).get('/api/suggest?q=an&type=user')
+    assert response.get_json() == []
+    assert index.kinds is None  # The index is not asked at all
+
+
+def test_admins_get_user_suggestions(index):
+    response = client('admin').get('/api/suggest?q=an&type=user')
+    assert index.kinds == ['user']
+    assert response.get_json()[0]['type'] == 'user'
+
+
+def test_empty_kind_list_suggests_nothing():
+    suggest_index = SuggestIndex()
+    suggest_index._add('user', 1, 'Ann Lee', 'ann@example.com', 0)
+    suggest_index._add('book', 2, 'Anna Karenina', None, 0)
+    assert suggest_index.suggest('an', []) == []
+    assert [item['type'] for item in suggest_index.suggest('an', ['book'])] == ['book']
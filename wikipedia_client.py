@@ -0,0 +1,353 @@
+"""
+Cached, time-bounded Wikipedia lookups for the chatbot, with an optional
+offline backend that answers from a local SQLite full-text index.
+
+Build the local index from a JSON-lines article dump (one
+{"title": ..., "text": ...} object per line, e.g. WikiExtractor --json):
+
+    python wikipedia_client.py build-index articles.jsonl
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import closing
+
+CACHE_PATH = os.path.join('cache', 'wikipedia.sqlite3')
+LOCAL_INDEX_PATH = os.path.join('cache', 'wikipedia_index.sqlite3')
+
+# Characters of each article's lead section kept in the local index
+LOCAL_SUMMARY_CHARS = 2000
+
+
+class DiskCache:
+    """
+    Small persistent key/value cache in SQLite with a TTL per entry and a
+    cap on the number of entries (least recently used are pruned). Hits
+    only note the access time in memory; it is written with the next set.
+    """
+
+    def __init__(self, path, max_entries=20000):
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = 0
+        self._accessed = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            conn.commit()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key):
+        """
+        Returns:
+            The cached value, or None if absent or expired
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+        with self._lock:
+            self._accessed[key] = now
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, accessed_key) for accessed_key, accessed_at in accessed.items()]
+            )
+            conn.execute(
+                "REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            conn.commit()
+            if prune:
+                self._prune(conn, now)
+
+    def _prune(self, conn, now):
+        conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute("""
+                DELETE FROM cache WHERE key IN (
+                    SELECT key FROM cache ORDER BY accessed_at LIMIT ?
+                )
+            """, (count - self.max_entries,))
+        conn.commit()
+
+
+def split_sentences(text, sentences):
+    parts = re.split(r'(?<=[.!?])\s+', text.strip())
+    return ' '.join(parts[:sentences])
+
+
+class OnlineWikipedia:
+    """
+    The wikipedia package, with a deadline on every call (the package
+    itself never times out).
+    """
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="wikipedia")
+
+    def _call(self, function, *args, **kwargs):
+        future = self._executor.submit(function, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"Wikipedia did not answer within {self.timeout} seconds")
+
+    def search(self, query, results=5):
+        import wikipedia
+        return self._call(wikipedia.search, query, results=results)
+
+    def page_info(self, title):
+        """
+        Returns:
+            dict: {'categories': [...]}, {'disambiguation': [...]} or {'missing': True}
+        """
+        import wikipedia
+
+        def fetch():
+            try:
+                page = wikipedia.page(title, auto_suggest=False)
+                return {'categories': page.categories}
+            except wikipedia.exceptions.DisambiguationError as e:
+                return {'disambiguation': e.options}
+            except wikipedia.exceptions.PageError:
+                return {'missing': True}
+
+        return self._call(fetch)
+
+    def summary(self, title, sentences=3):
+        import wikipedia
+        return self._call(wikipedia.summary, title, sentences=sentences, auto_suggest=False)
+
+
+class LocalWikipediaIndex:
+    """
+    Answers from a pre-built SQLite index of article lead sections, so
+    lookups never leave the machine. Titles are looked up in the indexed
+    summaries table; the FTS5 index is only used for fuzzy search.
+    """
+
+    def __init__(self, path=LOCAL_INDEX_PATH):
+        self.path = path
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'summaries'").fetchone() is None:
+            conn.close()
+            raise LookupError(f"{self.path} was built by an older version; run build-index again")
+        return conn
+
+    def search(self, query, results=5):
+        terms = ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+        if not terms:
+            return []
+        with closing(self._connect()) as conn:
+            # Exact title first, then best full-text matches (bm25 weighs the title higher)
+            exact = conn.execute(
+                "SELECT title FROM summaries WHERE title = ? COLLATE NOCASE LIMIT 1", (query,)
+            ).fetchall()
+            ranked = conn.execute(
+                "SELECT title FROM articles WHERE articles MATCH ? ORDER BY bm25(articles, 10.0, 1.0) LIMIT ?",
+                (terms, results)
+            ).fetchall()
+        titles = []
+        for (title,) in exact + ranked:
+            if title not in titles:
+                titles.append(title)
+        return titles[:results]
+
+    def page_info(self, title):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT 1 FROM summaries WHERE title = ?", (title,)).fetchone()
+        return {'categories': []} if row else {'missing': True}
+
+    def summary(self, title, sentences=3):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT summary FROM summaries WHERE title = ?", (title,)).fetchone()
+        if row is None:
+            raise LookupError(f"'{title}' is not in the local Wikipedia index")
+        return split_sentences(row[0], sentences)
+
+
+class WikipediaClient:
+    """
+    Cached Wikipedia lookups over the online API, the local index, or the
+    local index with the API as fallback.
+    """
+
+    def __init__(self, backend='online', cache=None, ttl=7 * 86400, timeout=5,
+                 local_index_path=LOCAL_INDEX_PATH):
+        """
+        Args:
+            backend (str): 'online', 'local' or 'hybrid' (local first, then online)
+            cache (DiskCache): Persistent cache, or None to disable caching
+            ttl (int): Seconds to keep search results, pages and summaries
+            timeout (float): Deadline for each online call
+            local_index_path (str): SQLite FTS index built with build-index
+        """
+        if backend not in ('online', 'local', 'hybrid'):
+            raise ValueError(f"Unknown Wikipedia backend '{backend}'")
+        self.backend = backend
+        self.cache = cache
+        self.ttl = ttl
+        self.online = OnlineWikipedia(timeout=timeout)
+        self.local = LocalWikipediaIndex(local_index_path)
+
+    def _sources(self):
+        sources = []
+        if self.backend in ('local', 'hybrid') and self.local.available():
+            sources.append(self.local)
+        if self.backend in ('online', 'hybrid'):
+            sources.append(self.online)
+        return sources
+
+    def _lookup(self, kind, key, method, *args, **kwargs):
+        cache_key = f"{kind}:{key}"
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        result = None
+        for source in self._sources():
+            try:
+                result = getattr(source, method)(*args, **kwargs)
+            except LookupError:
+                continue
+            # An empty local answer should still give the API a chance
+            if result and result != {'missing': True}:
+                break
+        if result is None:
+            raise LookupError("No Wikipedia backend is available")
+
+        if self.cache is not None:
+            self.cache.set(cache_key, result, self.ttl)
+        return result
+
+    def search(self, query, results=5):
+        return self._lookup('search', f"{results}:{query}", 'search', query, results=results)
+
+    def page_info(self, title):
+        return self._lookup('page', title, 'page_info', title)
+
+    def summary(self, title, sentences=3):
+        return self._lookup('summary', f"{sentences}:{title}", 'summary', title, sentences=sentences)
+
+
+def build_local_index(source_path, index_path=LOCAL_INDEX_PATH, batch_size=1000):
+    """
+    Streams a JSON-lines dump into a SQLite table of lead sections, keyed
+    by title, with an FTS5 index over it.
+    Args:
+        source_path (str): File with one {"title": ..., "text": ...} per line
+        index_path (str): Index file to (re)create
+        batch_size (int): Rows per executemany call
+    Returns:
+        int: Number of articles indexed
+    """
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = index_path + '.building'
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    with closing(sqlite3.connect(temporary_path)) as conn:
+        conn.execute("""
+            CREATE TABLE summaries (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL UNIQUE,
+                summary TEXT NOT NULL
+            )
+        """)
+        # Exact-title lookups ignore case in search
+        conn.execute("CREATE INDEX summaries_title_nocase ON summaries (title COLLATE NOCASE)")
+        conn.execute("""
+            CREATE VIRTUAL TABLE articles USING fts5(
+                title, summary, content='summaries', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        batch = []
+        with open(source_path, encoding='utf-8') as source:
+            for line in source:
+                line = line.strip()
+                if not line:
+                    continue
+                article = json.loads(line)
+                title = article.get('title', '').strip()
+                text = article.get('text', '').strip()
+                if not title or not text:
+                    continue
+                # The lead section is what the chatbot shows
+                lead = text.split('\n\n', 1)[0] if len(text) > LOCAL_SUMMARY_CHARS else text
+                batch.append((title, lead[:LOCAL_SUMMARY_CHARS]))
+                if len(batch) >= batch_size:
+                    conn.executemany("INSERT OR IGNORE INTO summaries (title, summary) VALUES (?, ?)", batch)
+                    batch = []
+        if batch:
+            conn.executemany("INSERT OR IGNORE INTO summaries (title, summary) VALUES (?, ?)", batch)
+        count = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        # One pass over the finished table is faster than indexing row by row
+        conn.execute("INSERT INTO articles(articles) VALUES ('rebuild')")
+        conn.execute("INSERT INTO articles(articles) VALUES ('optimize')")
+        conn.commit()
+
+    os.replace(temporary_path, index_path)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wikipedia cache and local index tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build-index', help="Build the offline article index")
+    build.add_argument('source', help="JSON-lines file of {title, text} articles")
+    build.add_argument('--output', default=LOCAL_INDEX_PATH, help="Index file to write")
+    args = parser.parse_args()
+
+    if args.command == 'build-index':
+        started = time.time()
+        count = build_local_index(args.source, args.output)
+        print(f"Indexed {count} articles into {args.output} in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()